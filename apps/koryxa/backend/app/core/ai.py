@@ -20,6 +20,41 @@ logger = logging.getLogger(__name__)
 FALLBACK_REPLY = "Je rencontre un problème technique pour le moment. Merci de réessayer plus tard."
 
 
+class StopGeneration(Exception):
+    """Raised by an `on_token` callback that has everything it needs; ends the stream early."""
+
+
+def _emit(on_token: Optional[Callable[[str], None]], text: str) -> None:
+    if not on_token:
+        return
+    try:
+        on_token(text)
+    except StopGeneration:
+        pass
+
+
+def _stream_cohere_chat(client: Any, model: str, message: str, on_token: Callable[[str], None]) -> str:
+    chunks: List[str] = []
+    stream = client.chat_stream(model=model, message=message)
+    try:
+        for event in stream:
+            if getattr(event, "event_type", None) != "text-generation":
+                continue
+            token = getattr(event, "text", "") or ""
+            if not token:
+                continue
+            chunks.append(token)
+            try:
+                on_token(token)
+            except StopGeneration:
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if callable(close):
+            close()
+    return "".join(chunks)
+
+
 def _hash_to_float32(seed: bytes) -> float:
     h = int.from_bytes(seed[:8], byteorder="big", signed=False)
     return (h % 2_000_000) / 1_000_000.0 - 1.0
@@ -102,29 +137,25 @@ def generate_answer(
                 last_user = effective_prompt
                 if history:
                     last_user = next((msg["content"] for msg in reversed(history) if msg.get("role") == "user"), effective_prompt)
+                if on_token:
+                    return _stream_cohere_chat(client, mdl, last_user, on_token)
                 resp = client.chat(model=mdl, message=last_user)
-                text = getattr(resp, "text", None) or str(resp)
-                if text and on_token:
-                    on_token(text)
-                return text
+                return getattr(resp, "text", None) or str(resp)
             except Exception as exc:  # noqa: BLE001
                 logger.warning("Cohere chat failed, returning explicit error: %s", exc)
                 raise RuntimeError(f"Cohere failed: {exc}") from exc
 
     if provider_name == "echo":
-        if on_token:
-            on_token(effective_prompt)
+        _emit(on_token, effective_prompt)
         return effective_prompt
 
     if provider_name in {"openai", "mistral"}:
         logger.warning("Provider '%s' not configured. Falling back to echo.", provider_name)
-        if on_token:
-            on_token(effective_prompt)
+        _emit(on_token, effective_prompt)
         return effective_prompt
 
     logger.debug("Returning fallback reply for provider=%s", provider_name)
-    if on_token:
-        on_token(FALLBACK_REPLY)
+    _emit(on_token, FALLBACK_REPLY)
     return FALLBACK_REPLY
 
 
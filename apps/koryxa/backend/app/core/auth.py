@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import hashlib
+import hmac
 import os
 import secrets
 from datetime import datetime, timedelta, timezone
@@ -24,6 +25,8 @@ pwd_context = CryptContext(
     deprecated="auto",
 )
 _fallback_ctx = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+UNUSABLE_PASSWORD_PREFIX = "!"
+OTP_HASH_PREFIX = "hmac-sha256$"
 
 
 def hash_password(password: str) -> str:
@@ -37,6 +40,8 @@ def hash_password(password: str) -> str:
 
 
 def verify_password(plain: str, hashed: str) -> bool:
+    if not hashed or hashed.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return False
     try:
         if _HAS_BCRYPT:
             return pwd_context.verify(plain, hashed)
@@ -50,6 +55,31 @@ def verify_password(plain: str, hashed: str) -> bool:
             return False
 
 
+def unusable_password_hash() -> str:
+    # Placeholder for accounts without a password (Google, dev bypass): never verifies,
+    # and costs no KDF work to produce.
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(32)
+
+
+def hash_otp_code(email: str, code: str) -> str:
+    # OTP codes are short-lived and attempt-limited, so a keyed HMAC is enough; a KDF
+    # would only burn CPU on every request-otp / verify-otp call.
+    digest = hmac.new(
+        settings.USER_HASH_SECRET.encode("utf-8"),
+        f"{normalize_email(email)}:{code}".encode("utf-8"),
+        hashlib.sha256,
+    ).hexdigest()
+    return OTP_HASH_PREFIX + digest
+
+
+def is_hmac_otp_hash(stored: str) -> bool:
+    return stored.startswith(OTP_HASH_PREFIX)
+
+
+def verify_otp_code(email: str, code: str, stored: str) -> bool:
+    return hmac.compare_digest(hash_otp_code(email, code), stored)
+
+
 def create_access_token(data: dict, expires_minutes: int | None = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes or settings.JWT_EXPIRES_MINUTES)
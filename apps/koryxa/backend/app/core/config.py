@@ -37,6 +37,14 @@ class Settings(BaseSettings):
     JWT_EXPIRES_MINUTES: int = int(os.getenv("JWT_EXPIRES_MINUTES", "60"))
     SESSION_COOKIE_NAME: str = os.getenv("SESSION_COOKIE_NAME", "innova_session")
     SESSION_TTL_DAYS: int = int(os.getenv("SESSION_TTL_DAYS", "7"))
+    AUTH_SESSION_CACHE_ENABLED: bool = os.getenv("AUTH_SESSION_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    AUTH_SESSION_CACHE_TTL_S: int = int(os.getenv("AUTH_SESSION_CACHE_TTL_S", "30"))
+    AUTH_SESSION_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_SESSION_CACHE_MAX_ENTRIES", "10000"))
+    SESSION_TOUCH_INTERVAL_S: int = int(os.getenv("SESSION_TOUCH_INTERVAL_S", "60"))
+    SESSION_TOUCH_FLUSH_S: int = int(os.getenv("SESSION_TOUCH_FLUSH_S", "10"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+    TALENT_INDEX_ENABLED: bool = os.getenv("TALENT_INDEX_ENABLED", "true").lower() in {"1", "true", "yes"}
     RESET_TOKEN_TTL_MIN: int = int(os.getenv("RESET_TOKEN_TTL_MIN", "30"))
     FRONTEND_BASE_URL: str = os.getenv("FRONTEND_BASE_URL", "https://innovaplus.africa")
     ALLOWED_AUTH_REDIRECT_ORIGINS: str | None = os.getenv("ALLOWED_AUTH_REDIRECT_ORIGINS")
@@ -53,6 +61,9 @@ class Settings(BaseSettings):
     CHAT_PROVIDER: str = os.getenv("PROVIDER", "cohere")
     CHAT_MODEL: str | None = os.getenv("CHAT_MODEL")
     CHAT_MAX_NEW_TOKENS: int = int(os.getenv("CHAT_MAX_NEW_TOKENS", "900"))
+    AI_JSON_CACHE_ENABLED: bool = os.getenv("AI_JSON_CACHE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    AI_JSON_CACHE_TTL_S: int = int(os.getenv("AI_JSON_CACHE_TTL_S", "604800"))
+    AI_JSON_CACHE_MAX_ROWS: int = int(os.getenv("AI_JSON_CACHE_MAX_ROWS", "5000"))
     # CORS
     ALLOWED_ORIGINS: str | None = os.getenv("ALLOWED_ORIGINS")
     # RAG / AI
@@ -66,6 +77,8 @@ class Settings(BaseSettings):
     VECTOR_INDEX_NAME: str = os.getenv("VECTOR_INDEX_NAME", "vector_index")
     RAG_TOP_K_DEFAULT: int = int(os.getenv("RAG_TOP_K_DEFAULT", "5"))
     RAG_MAX_CONTEXT_TOKENS: int = int(os.getenv("RAG_MAX_CONTEXT_TOKENS", "1200"))
+    CHAT_TOKENIZER: str | None = os.getenv("CHAT_TOKENIZER")
+    CHAT_TOKENIZER_LOCAL_ONLY: bool = os.getenv("CHAT_TOKENIZER_LOCAL_ONLY", "true").lower() in {"1", "true", "yes"}
     RAG_API_URL: str | None = os.getenv("RAG_API_URL", "http://127.0.0.1:8011")
     RAG_API_TIMEOUT: float = float(os.getenv("RAG_API_TIMEOUT", "8.0"))
     UPLOAD_MAX_MB: int = int(os.getenv("UPLOAD_MAX_MB", "20"))
@@ -85,6 +98,7 @@ class Settings(BaseSettings):
     DB_INNOVA: str | None = None
     OTP_CODE_LENGTH: int = int(os.getenv("OTP_CODE_LENGTH", "6"))
     OTP_TTL_MIN: int = int(os.getenv("OTP_TTL_MIN", "10"))
+    OTP_MAX_ATTEMPTS: int = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
     OTP_DEV_DEBUG: bool = os.getenv("OTP_DEV_DEBUG", "false").lower() in {"1", "true", "yes"}
     DEV_AUTH_BYPASS: bool = os.getenv("DEV_AUTH_BYPASS", "false").lower() in {"1", "true", "yes"}
     DEV_AUTH_BYPASS_EMAIL: str = os.getenv("DEV_AUTH_BYPASS_EMAIL", "dev@koryxa.app")
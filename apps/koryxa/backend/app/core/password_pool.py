@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+from app.core.auth import hash_password, verify_password
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+_LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PasswordPoolBusy(RuntimeError):
+    pass
+
+
+class PasswordHashPool:
+    """Runs password KDF work in worker processes so it never blocks the event loop.
+
+    At most `max_pending` hash/verify calls may be queued or running; beyond that callers
+    get `PasswordPoolBusy` straight away instead of piling up behind a login burst.
+    """
+
+    def __init__(self, *, workers: int, max_pending: int) -> None:
+        self._workers = max(1, workers)
+        self._max_pending = max(1, max_pending)
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._histogram = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+        self._counters = {"hashes": 0, "verifies": 0, "rejected": 0, "errors": 0}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            try:
+                # Spawned, not forked: the parent already runs listener and pool threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Password process pool unavailable, using threads: %s", exc)
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="password-kdf")
+        return self._executor
+
+    async def _run(self, kind: str, fn: Any, *args: str) -> Any:
+        with self._lock:
+            if self._pending >= self._max_pending:
+                self._counters["rejected"] += 1
+                raise PasswordPoolBusy(f"{self._pending} password operations already queued")
+            self._pending += 1
+        started = time.monotonic()
+        try:
+            executor = self._get_executor()
+            try:
+                return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            except BrokenExecutor as exc:
+                # A worker died (OOM kill, crash): start a fresh pool on the next call and
+                # finish this one on a thread rather than failing the login.
+                logger.warning("Password hashing pool broken, recreating: %s", exc)
+                if self._executor is executor:
+                    self._executor = None
+                return await asyncio.to_thread(fn, *args)
+        except Exception:
+            with self._lock:
+                self._counters["errors"] += 1
+            raise
+        finally:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            with self._lock:
+                self._pending -= 1
+                self._counters[kind] += 1
+                self._histogram[_bucket_index(elapsed_ms)] += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hashes", hash_password, password)
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        return await self._run("verifies", verify_password, plain, hashed)
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            histogram = {f"le_{bound}ms": count for bound, count in zip(_LATENCY_BUCKETS_MS, self._histogram)}
+            histogram["inf"] = self._histogram[-1]
+            return {
+                "workers": self._workers,
+                "pending": self._pending,
+                "max_pending": self._max_pending,
+                **self._counters,
+                "latency_ms": histogram,
+            }
+
+
+def _bucket_index(elapsed_ms: float) -> int:
+    for index, bound in enumerate(_LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return index
+    return len(_LATENCY_BUCKETS_MS)
+
+
+_POOL = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _POOL.hash(password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await _POOL.verify(plain, hashed)
+
+
+def shutdown_password_pool() -> None:
+    _POOL.shutdown()
+
+
+def password_pool_stats() -> dict[str, Any]:
+    return _POOL.stats()
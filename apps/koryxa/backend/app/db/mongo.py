@@ -47,8 +47,10 @@ async def connect_to_mongo() -> None:
             await _db["workspace_profiles"].create_index([("updated_at", -1)])
             await _db["opportunities"].create_index("status")
             await _db["opportunities"].create_index("created_at")
+            await _db["opportunities"].create_index("updated_at")
             await _db["assignments"].create_index("opportunity_id")
             await _db["assignments"].create_index("user_id")
+            await _db["assignments"].create_index([("status", 1), ("user_id", 1)])
             await _db["fairness_windows"].create_index("period_start")
             await _db["decisions_audit"].create_index("created_at")
             # Data reservoir collections
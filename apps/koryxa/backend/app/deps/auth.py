@@ -4,9 +4,11 @@ from datetime import datetime, timezone
 
 from fastapi import HTTPException, Request, status
 
-from app.core.auth import generate_session_token, hash_password, hash_token, normalize_email
+from app.core.auth import hash_token, normalize_email, unusable_password_hash
 from app.core.config import settings
-from app.repositories.auth_pg import get_active_session, get_user_by_id, touch_session, upsert_dev_user
+from app.repositories.auth_pg import get_active_session, get_user_by_id, upsert_dev_user
+from app.services.session_cache import get_session_cache
+from app.services.session_touch import record_session_touch
 
 
 def _dev_auth_enabled() -> bool:
@@ -26,7 +28,7 @@ def _build_dev_user_doc(now: datetime) -> dict:
 
     return {
         "email": normalize_email(settings.DEV_AUTH_BYPASS_EMAIL),
-        "password_hash": hash_password(generate_session_token()),
+        "password_hash": unusable_password_hash(),
         "first_name": (settings.DEV_AUTH_BYPASS_FIRST_NAME or "Dev").strip() or "Dev",
         "last_name": (settings.DEV_AUTH_BYPASS_LAST_NAME or "Local").strip() or "Local",
         "country": (settings.DEV_AUTH_BYPASS_COUNTRY or "TG").strip() or "TG",
@@ -42,7 +44,17 @@ async def _dev_bypass_user_pg() -> dict | None:
     if not _dev_auth_enabled():
         return None
     now = datetime.now(timezone.utc)
-    return upsert_dev_user(_build_dev_user_doc(now))
+    return await upsert_dev_user(_build_dev_user_doc(now))
+
+
+async def _load_session_user(token_hash: str) -> tuple[dict, dict] | None:
+    session = await get_active_session(token_hash)
+    if not session:
+        return None
+    user = await get_user_by_id(str(session["user_id"]))
+    if not user:
+        return None
+    return session, user
 
 
 async def get_current_user_optional(
@@ -59,24 +71,21 @@ async def get_current_user_optional(
         except Exception:
             return None
 
-    session = get_active_session(hash_token(raw_token))
-    if not session:
-        try:
-            return await _dev_bypass_user_pg()
-        except Exception:
-            return None
-
-    user = get_user_by_id(str(session["user_id"]))
-    if not user:
+    token_hash = hash_token(raw_token)
+    cache = get_session_cache()
+    loaded = cache.get(token_hash) if cache is not None else None
+    if loaded is None:
+        generation = cache.generation if cache is not None else 0
+        loaded = await _load_session_user(token_hash)
+        if loaded is not None and cache is not None:
+            cache.put(token_hash, *loaded, generation=generation)
+    if loaded is None:
         try:
             return await _dev_bypass_user_pg()
         except Exception:
             return None
-
-    try:
-        touch_session(str(session["id"]))
-    except Exception:
-        pass
+    session, user = loaded
+    await record_session_touch(str(session["id"]))
 
     request.state.session = session
     return user
@@ -22,15 +22,34 @@ import cohere
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
 from app.core.config import get_allowed_hosts, is_production_env, settings
+from app.core.password_pool import password_pool_stats, shutdown_password_pool
 from app.prompts import render_prompt
+from app.services.ai_json import ai_json_cache_stats
+from app.services.partition_maintenance import run_partition_maintenance
+from app.services.pg_routing import (
+    PIN_COOKIE,
+    PIN_WINDOW_S,
+    begin_route_state,
+    replica_dsn,
+    replica_routing_stats,
+    reset_route_state,
+)
+from app.services.postgres_async import async_pg_pool_stats, close_async_pg_pool, init_async_pg_pool
+from app.services.session_cache import session_cache_stats, start_session_cache, stop_session_cache
+from app.services.opportunity_index import opportunity_index_stats
+from app.services.talent_index import start_talent_index, stop_talent_index, talent_index_stats
+from app.services.session_touch import session_touch_stats, start_session_touch_buffer, stop_session_touch_buffer
 from app.services.postgres_bootstrap import (
     _pg_relation_exists,
     close_pg_pool,
-    db_fetchall,
-    db_fetchone,
+    db_fetchall_read,
+    db_fetchone_read,
+    ensure_ai_json_cache_table,
     ensure_auth_tables,
     ensure_enterprise_leads_table,
+    ensure_match_tables,
     init_pg_pool,
+    pg_pool_stats,
 )
 from app.routers.auth import router as auth_router
 from app.routers.internal_core import router as internal_core_router
@@ -485,6 +504,7 @@ async def on_startup():
         pass
     
     init_pg_pool()
+    await init_async_pg_pool()
     try:
         ensure_auth_tables()
     except Exception:
@@ -493,17 +513,68 @@ async def on_startup():
         ensure_enterprise_leads_table()
     except Exception:
         logger.exception("Failed to ensure enterprise_leads table")
+    try:
+        ensure_ai_json_cache_table()
+    except Exception:
+        logger.exception("Failed to ensure ai_json_cache table")
+    try:
+        ensure_match_tables()
+    except Exception:
+        logger.exception("Failed to ensure match tables")
+    # Keep monthly partitions created ahead; retention (DETACH) runs in the worker.
+    run_partition_maintenance(detach=False)
+    try:
+        start_session_cache()
+    except Exception:
+        logger.exception("Failed to start auth session cache")
+    try:
+        start_talent_index()
+    except Exception:
+        logger.exception("Failed to start talent index")
+    start_session_touch_buffer()
     init_cohere_client()
 
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    stop_session_cache()
+    stop_talent_index()
+    try:
+        await stop_session_touch_buffer()
+    except Exception:
+        logger.exception("Failed to flush session touches on shutdown")
+    shutdown_password_pool()
+    await close_async_pg_pool()
     close_pg_pool()
 
 
 START_TIME = __import__("time").time()
 
 
+@app.middleware("http")
+async def route_replica_reads(request: Request, call_next):
+    # Read-your-writes: after a request writes, the client reads from the primary for
+    # PIN_WINDOW_S. A cookie carries the pin so it holds across workers.
+    if not replica_dsn():
+        return await call_next(request)
+    state, token = begin_route_state(pinned=PIN_COOKIE in request.cookies)
+    try:
+        response = await call_next(request)
+    finally:
+        reset_route_state(token)
+    if state.wrote:
+        response.set_cookie(
+            key=PIN_COOKIE,
+            value="1",
+            max_age=PIN_WINDOW_S,
+            httponly=True,
+            secure=urlparse(settings.FRONTEND_BASE_URL).scheme == "https",
+            samesite="lax",
+            path="/",
+        )
+    return response
+
+
 @app.middleware("http")
 async def normalize_forwarded_prefix(request: Request, call_next):
     # Accept both nginx style forwarded prefix and direct prefixed requests.
@@ -550,6 +621,15 @@ async def health():
         "vector_index": vector_index,
         "config_issues": config_issues,
         "queue_depth": queue_depth,
+        "ai_json_cache": ai_json_cache_stats(),
+        "pg_pool": pg_pool_stats(),
+        "async_pg_pool": async_pg_pool_stats(),
+        "replica_routing": replica_routing_stats(),
+        "session_cache": session_cache_stats(),
+        "session_touch": session_touch_stats(),
+        "password_pool": password_pool_stats(),
+        "talent_index": talent_index_stats(),
+        "opportunity_index": opportunity_index_stats(),
         "uptime_s": uptime,
         "version": os.getenv("APP_VERSION", "1.0.0"),
         "commit_sha": (os.getenv("COMMIT_SHA") or (__import__("subprocess").run(["git","-C", os.path.abspath(os.path.join(os.path.dirname(__file__), "..")), "rev-parse","--short","HEAD"], capture_output=True, text=True).stdout.strip() or "unknown")),
@@ -566,7 +646,7 @@ def mart_app_overview():
                 "avg_company_presence_rate": None,
                 "is_demo_fallback": True,
             }
-        row = db_fetchone("select * from mart.v_app_overview;")
+        row = db_fetchone_read("select * from mart.v_app_overview;")
         if row is None:
             raise HTTPException(status_code=404, detail="No data")
         return _json_safe(row)
@@ -625,7 +705,7 @@ def mart_projects(
         limit %s offset %s;
         """
         params.extend([limit, offset])
-        rows = db_fetchall(sql, tuple(params))
+        rows = db_fetchall_read(sql, tuple(params))
         return [_json_safe(r) for r in rows]
     except Exception:
         raise HTTPException(status_code=500, detail="DB error")
@@ -639,7 +719,7 @@ def mart_project_detail(project_id: str):
     try:
         if not _pg_relation_exists("mart.v_project_detail"):
             raise HTTPException(status_code=404, detail="mart dataset unavailable")
-        row = db_fetchone(
+        row = db_fetchone_read(
             "select * from mart.v_project_detail where project_id = %s;",
             (project_id,),
         )
@@ -660,7 +740,7 @@ def mart_project_presence(project_id: str):
     try:
         if not _pg_relation_exists("mart.v_project_presence_daily"):
             raise HTTPException(status_code=404, detail="mart dataset unavailable")
-        rows = db_fetchall(
+        rows = db_fetchall_read(
             """
             select project_id, presence_date, is_present
             from mart.v_project_presence_daily
@@ -689,7 +769,7 @@ def ai_report_project(project_id: str):
     try:
         if not _pg_relation_exists("mart.v_project_detail"):
             raise HTTPException(status_code=404, detail="mart dataset unavailable")
-        detail = db_fetchone(
+        detail = db_fetchone_read(
             """
             select
               project_id, project_name,
@@ -747,12 +827,12 @@ def ai_report_portfolio():
     try:
         if not _pg_relation_exists("mart.v_app_overview") or not _pg_relation_exists("mart.v_project_detail"):
             raise HTTPException(status_code=404, detail="mart dataset unavailable")
-        overview = db_fetchone("select * from mart.v_app_overview;")
+        overview = db_fetchone_read("select * from mart.v_app_overview;")
         if not overview:
             raise HTTPException(status_code=404, detail="No data")
         o = _json_safe(overview)
 
-        top_risks = db_fetchall(
+        top_risks = db_fetchall_read(
             """
             select
               project_id,
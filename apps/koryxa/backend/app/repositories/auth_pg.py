@@ -4,7 +4,8 @@ import json
 from datetime import datetime, timezone
 from typing import Any
 
-from app.services.postgres_bootstrap import db_execute, db_fetchone
+from app.services.postgres_async import db_execute, db_fetchone
+from app.services.session_cache import publish_token_invalidation, publish_user_invalidation
 
 
 def _parse_roles(value: Any) -> list[str]:
@@ -29,8 +30,8 @@ def _normalize_user(row: dict[str, Any] | None) -> dict[str, Any] | None:
     return row
 
 
-def get_user_by_email(email: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_user_by_email(email: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         select id, email, google_subject, password_hash, first_name, last_name, country,
                account_type, workspace_role, plan, roles, created_at, updated_at
@@ -43,8 +44,8 @@ def get_user_by_email(email: str) -> dict[str, Any] | None:
     return _normalize_user(row)
 
 
-def get_user_by_id(user_id: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_user_by_id(user_id: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         select id, email, google_subject, password_hash, first_name, last_name, country,
                account_type, workspace_role, plan, roles, created_at, updated_at
@@ -57,8 +58,8 @@ def get_user_by_id(user_id: str) -> dict[str, Any] | None:
     return _normalize_user(row)
 
 
-def get_user_by_google_subject(google_subject: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_user_by_google_subject(google_subject: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         select id, email, google_subject, password_hash, first_name, last_name, country,
                account_type, workspace_role, plan, roles, created_at, updated_at
@@ -71,8 +72,8 @@ def get_user_by_google_subject(google_subject: str) -> dict[str, Any] | None:
     return _normalize_user(row)
 
 
-def create_user(*, email: str, password_hash: str, first_name: str, last_name: str, country: str, account_type: str, google_subject: str | None = None) -> dict[str, Any]:
-    row = db_fetchone(
+async def create_user(*, email: str, password_hash: str, first_name: str, last_name: str, country: str, account_type: str, google_subject: str | None = None) -> dict[str, Any]:
+    row = await db_fetchone(
         """
         insert into app.auth_users(email, google_subject, password_hash, first_name, last_name, country, account_type, roles, plan)
         values (%s, %s, %s, %s, %s, %s, %s, '["user"]'::jsonb, 'free')
@@ -84,7 +85,7 @@ def create_user(*, email: str, password_hash: str, first_name: str, last_name: s
     return _normalize_user(row) or {}
 
 
-def update_user_fields(user_id: str, *, first_name: str | None = None, last_name: str | None = None, workspace_role: str | None = None, password_hash: str | None = None) -> dict[str, Any] | None:
+async def update_user_fields(user_id: str, *, first_name: str | None = None, last_name: str | None = None, workspace_role: str | None = None, password_hash: str | None = None) -> dict[str, Any] | None:
     assignments: list[str] = []
     params: list[Any] = []
     if first_name is not None:
@@ -101,9 +102,9 @@ def update_user_fields(user_id: str, *, first_name: str | None = None, last_name
         params.append(password_hash)
         assignments.append("password_updated_at = timezone('utc', now())")
     if not assignments:
-        return get_user_by_id(user_id)
+        return await get_user_by_id(user_id)
     params.append(user_id)
-    row = db_fetchone(
+    row = await db_fetchone(
         f"""
         update app.auth_users
         set {", ".join(assignments)}
@@ -113,11 +114,12 @@ def update_user_fields(user_id: str, *, first_name: str | None = None, last_name
         """,
         tuple(params),
     )
+    await publish_user_invalidation(user_id)
     return _normalize_user(row)
 
 
-def link_google_subject(user_id: str, google_subject: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def link_google_subject(user_id: str, google_subject: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         update app.auth_users
         set google_subject = %s
@@ -127,11 +129,12 @@ def link_google_subject(user_id: str, google_subject: str) -> dict[str, Any] | N
         """,
         (google_subject, user_id),
     )
+    await publish_user_invalidation(user_id)
     return _normalize_user(row)
 
 
-def upsert_dev_user(payload: dict[str, Any]) -> dict[str, Any]:
-    row = db_fetchone(
+async def upsert_dev_user(payload: dict[str, Any]) -> dict[str, Any]:
+    row = await db_fetchone(
         """
         insert into app.auth_users(email, password_hash, first_name, last_name, country, account_type, workspace_role, plan, roles)
         values (%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)
@@ -162,8 +165,8 @@ def upsert_dev_user(payload: dict[str, Any]) -> dict[str, Any]:
     return _normalize_user(row) or {}
 
 
-def create_session(*, user_id: str, token_hash: str, expires_at: datetime, ip: str | None, ua: str | None) -> None:
-    db_execute(
+async def create_session(*, user_id: str, token_hash: str, expires_at: datetime, ip: str | None, ua: str | None) -> None:
+    await db_execute(
         """
         insert into app.sessions(user_id, token_hash, issued_at, expires_at, revoked, ip, ua, last_seen_at)
         values (%s::uuid, %s, timezone('utc', now()), %s, false, %s, %s, timezone('utc', now()));
@@ -172,8 +175,8 @@ def create_session(*, user_id: str, token_hash: str, expires_at: datetime, ip: s
     )
 
 
-def get_active_session(token_hash: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_active_session(token_hash: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         select id, user_id::text as user_id, token_hash, issued_at, expires_at, revoked, ip, ua, last_seen_at
         from app.sessions
@@ -187,15 +190,24 @@ def get_active_session(token_hash: str) -> dict[str, Any] | None:
     return row
 
 
-def touch_session(session_id: str) -> None:
-    db_execute(
-        "update app.sessions set last_seen_at = timezone('utc', now()) where id = %s::uuid;",
-        (session_id,),
+async def touch_sessions(touches: list[tuple[str, datetime]]) -> None:
+    if not touches:
+        return
+    values_sql = ", ".join("(%s::uuid, %s::timestamptz)" for _ in touches)
+    await db_execute(
+        f"""
+        update app.sessions s
+        set last_seen_at = v.last_seen_at
+        from (values {values_sql}) as v(id, last_seen_at)
+        where s.id = v.id
+          and s.last_seen_at < v.last_seen_at;
+        """,
+        tuple(value for touch in touches for value in touch),
     )
 
 
-def revoke_session_by_token(token_hash: str) -> None:
-    db_execute(
+async def revoke_session_by_token(token_hash: str) -> None:
+    await db_execute(
         """
         update app.sessions
         set revoked = true, last_seen_at = timezone('utc', now())
@@ -203,17 +215,19 @@ def revoke_session_by_token(token_hash: str) -> None:
         """,
         (token_hash,),
     )
+    await publish_token_invalidation(token_hash)
 
 
-def revoke_sessions_for_user(user_id: str) -> None:
-    db_execute(
+async def revoke_sessions_for_user(user_id: str) -> None:
+    await db_execute(
         "update app.sessions set revoked = true, last_seen_at = timezone('utc', now()) where user_id = %s::uuid and revoked = false;",
         (user_id,),
     )
+    await publish_user_invalidation(user_id)
 
 
-def upsert_otp(*, email: str, code_hash: str, expires_at: datetime, intent: str, meta: dict[str, Any] | None = None) -> None:
-    db_execute(
+async def upsert_otp(*, email: str, code_hash: str, expires_at: datetime, intent: str, meta: dict[str, Any] | None = None) -> None:
+    await db_execute(
         """
         insert into app.login_otps(email, code_hash, expires_at, intent, meta, created_at)
         values (%s, %s, %s, %s, %s::jsonb, timezone('utc', now()))
@@ -221,18 +235,18 @@ def upsert_otp(*, email: str, code_hash: str, expires_at: datetime, intent: str,
         """,
         (email, code_hash, expires_at, intent, json.dumps(meta or {})),
     )
-    db_execute("delete from app.login_otps where lower(email) = lower(%s) and expires_at <= timezone('utc', now());", (email,))
+    await db_execute("delete from app.login_otps where lower(email) = lower(%s) and expires_at <= timezone('utc', now());", (email,))
 
 
-def replace_otp(*, email: str, code_hash: str, expires_at: datetime, intent: str, meta: dict[str, Any] | None = None) -> None:
-    db_execute("delete from app.login_otps where lower(email) = lower(%s);", (email,))
-    upsert_otp(email=email, code_hash=code_hash, expires_at=expires_at, intent=intent, meta=meta)
+async def replace_otp(*, email: str, code_hash: str, expires_at: datetime, intent: str, meta: dict[str, Any] | None = None) -> None:
+    await db_execute("delete from app.login_otps where lower(email) = lower(%s);", (email,))
+    await upsert_otp(email=email, code_hash=code_hash, expires_at=expires_at, intent=intent, meta=meta)
 
 
-def get_latest_otp(email: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_latest_otp(email: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
-        select id, email, code_hash, expires_at, intent, meta, consumed_at, created_at
+        select id, email, code_hash, expires_at, intent, meta, attempts, consumed_at, created_at
         from app.login_otps
         where lower(email) = lower(%s)
         order by created_at desc
@@ -250,12 +264,20 @@ def get_latest_otp(email: str) -> dict[str, Any] | None:
     return row
 
 
-def delete_otp(otp_id: str) -> None:
-    db_execute("delete from app.login_otps where id = %s::uuid;", (otp_id,))
+async def record_otp_failure(otp_id: str) -> int:
+    row = await db_fetchone(
+        "update app.login_otps set attempts = attempts + 1 where id = %s::uuid returning attempts;",
+        (otp_id,),
+    )
+    return int(row["attempts"]) if row else 0
+
+
+async def delete_otp(otp_id: str) -> None:
+    await db_execute("delete from app.login_otps where id = %s::uuid;", (otp_id,))
 
 
-def create_reset_token(*, user_id: str, token_hash: str, expires_at: datetime) -> None:
-    db_execute(
+async def create_reset_token(*, user_id: str, token_hash: str, expires_at: datetime) -> None:
+    await db_execute(
         """
         insert into app.password_reset_tokens(user_id, token_hash, expires_at, used, created_at)
         values (%s::uuid, %s, %s, false, timezone('utc', now()));
@@ -264,8 +286,8 @@ def create_reset_token(*, user_id: str, token_hash: str, expires_at: datetime) -
     )
 
 
-def get_valid_reset_token(*, user_id: str, token_hash: str) -> dict[str, Any] | None:
-    return db_fetchone(
+async def get_valid_reset_token(*, user_id: str, token_hash: str) -> dict[str, Any] | None:
+    return await db_fetchone(
         """
         select id, user_id::text as user_id, token_hash, expires_at, used, created_at
         from app.password_reset_tokens
@@ -279,8 +301,8 @@ def get_valid_reset_token(*, user_id: str, token_hash: str) -> dict[str, Any] |
     )
 
 
-def mark_reset_token_used(token_id: str) -> None:
-    db_execute(
+async def mark_reset_token_used(token_id: str) -> None:
+    await db_execute(
         "update app.password_reset_tokens set used = true where id = %s::uuid;",
         (token_id,),
     )
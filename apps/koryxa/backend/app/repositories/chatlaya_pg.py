@@ -5,7 +5,7 @@ from datetime import datetime
 from typing import Any
 from uuid import uuid4
 
-from app.services.postgres_bootstrap import db_execute, db_fetchall, db_fetchone
+from app.services.postgres_async import db_execute, db_fetchall, db_fetchone
 
 
 def _owner_where_clause(*, user_id: str | None, guest_id: str | None) -> tuple[str, tuple[Any, ...]]:
@@ -57,9 +57,9 @@ def _normalize_problem_report(row: dict[str, Any] | None) -> dict[str, Any] | No
     return row
 
 
-def get_latest_active_conversation(*, user_id: str | None, guest_id: str | None) -> dict[str, Any] | None:
+async def get_latest_active_conversation(*, user_id: str | None, guest_id: str | None) -> dict[str, Any] | None:
     where_sql, params = _owner_where_clause(user_id=user_id, guest_id=guest_id)
-    row = db_fetchone(
+    row = await db_fetchone(
         f"""
         select id::text as id, guest_id, user_id::text as user_id, title, assistant_mode, archived, created_at, updated_at
         from app.chatlaya_conversations
@@ -73,7 +73,7 @@ def get_latest_active_conversation(*, user_id: str | None, guest_id: str | None)
     return _normalize_conversation(row)
 
 
-def create_conversation(
+async def create_conversation(
     *,
     user_id: str | None,
     guest_id: str | None,
@@ -82,7 +82,7 @@ def create_conversation(
     now: datetime,
 ) -> dict[str, Any]:
     conversation_id = str(uuid4())
-    row = db_fetchone(
+    row = await db_fetchone(
         """
         insert into app.chatlaya_conversations(
           id, guest_id, user_id, title, assistant_mode, archived, created_at, updated_at
@@ -95,7 +95,7 @@ def create_conversation(
     return _normalize_conversation(row) or {}
 
 
-def list_conversations(
+async def list_conversations(
     *,
     user_id: str | None,
     guest_id: str | None,
@@ -103,7 +103,7 @@ def list_conversations(
     offset: int,
 ) -> list[dict[str, Any]]:
     where_sql, params = _owner_where_clause(user_id=user_id, guest_id=guest_id)
-    rows = db_fetchall(
+    rows = await db_fetchall(
         f"""
         select id::text as id, guest_id, user_id::text as user_id, title, assistant_mode, archived, created_at, updated_at
         from app.chatlaya_conversations
@@ -117,14 +117,14 @@ def list_conversations(
     return [_normalize_conversation(row) for row in rows if row]
 
 
-def get_conversation(
+async def get_conversation(
     *,
     conversation_id: str,
     user_id: str | None,
     guest_id: str | None,
 ) -> dict[str, Any] | None:
     where_sql, params = _owner_where_clause(user_id=user_id, guest_id=guest_id)
-    row = db_fetchone(
+    row = await db_fetchone(
         f"""
         select id::text as id, guest_id, user_id::text as user_id, title, assistant_mode, archived, created_at, updated_at
         from app.chatlaya_conversations
@@ -137,14 +137,14 @@ def get_conversation(
     return _normalize_conversation(row)
 
 
-def get_message(
+async def get_message(
     *,
     message_id: str,
     user_id: str | None,
     guest_id: str | None,
 ) -> dict[str, Any] | None:
     where_sql, params = _owner_where_clause(user_id=user_id, guest_id=guest_id)
-    row = db_fetchone(
+    row = await db_fetchone(
         f"""
         select id::text as id, conversation_id::text as conversation_id, guest_id, user_id::text as user_id, role, content, meta, created_at
         from app.chatlaya_messages
@@ -157,7 +157,7 @@ def get_message(
     return _normalize_message(row)
 
 
-def update_conversation_mode(
+async def update_conversation_mode(
     *,
     conversation_id: str,
     user_id: str | None,
@@ -166,7 +166,7 @@ def update_conversation_mode(
     updated_at: datetime,
 ) -> dict[str, Any] | None:
     where_sql, params = _owner_where_clause(user_id=user_id, guest_id=guest_id)
-    row = db_fetchone(
+    row = await db_fetchone(
         f"""
         update app.chatlaya_conversations
         set assistant_mode = %s,
@@ -180,7 +180,7 @@ def update_conversation_mode(
     return _normalize_conversation(row)
 
 
-def archive_conversation(
+async def archive_conversation(
     *,
     conversation_id: str,
     user_id: str | None,
@@ -188,7 +188,7 @@ def archive_conversation(
     updated_at: datetime,
 ) -> bool:
     where_sql, params = _owner_where_clause(user_id=user_id, guest_id=guest_id)
-    row = db_fetchone(
+    row = await db_fetchone(
         f"""
         update app.chatlaya_conversations
         set archived = true,
@@ -202,13 +202,13 @@ def archive_conversation(
     return bool(row)
 
 
-def touch_conversation(
+async def touch_conversation(
     *,
     conversation_id: str,
     title: str,
     updated_at: datetime,
 ) -> None:
-    db_execute(
+    await db_execute(
         """
         update app.chatlaya_conversations
         set title = %s,
@@ -219,7 +219,7 @@ def touch_conversation(
     )
 
 
-def create_message(
+async def create_message(
     *,
     conversation_id: str,
     role: str,
@@ -230,7 +230,7 @@ def create_message(
     created_at: datetime,
 ) -> dict[str, Any]:
     message_id = str(uuid4())
-    row = db_fetchone(
+    row = await db_fetchone(
         """
         insert into app.chatlaya_messages(
           id, conversation_id, guest_id, user_id, role, content, meta, created_at
@@ -243,35 +243,43 @@ def create_message(
     return _normalize_message(row) or {}
 
 
-def list_messages(*, conversation_id: str) -> list[dict[str, Any]]:
-    rows = db_fetchall(
+async def list_messages(*, conversation_id: str) -> list[dict[str, Any]]:
+    # Messages are partitioned by month on created_at; bounding the scan below by the
+    # conversation's creation (less a day for clock skew) prunes older partitions.
+    rows = await db_fetchall(
         """
         select id::text as id, conversation_id::text as conversation_id, guest_id, user_id::text as user_id, role, content, meta, created_at
         from app.chatlaya_messages
         where conversation_id = %s::uuid
+          and created_at >= (
+            select c.created_at - interval '1 day' from app.chatlaya_conversations c where c.id = %s::uuid
+          )
         order by created_at asc;
         """,
-        (conversation_id,),
+        (conversation_id, conversation_id),
     )
     return [_normalize_message(row) for row in rows if row]
 
 
-def list_recent_messages(*, conversation_id: str, limit: int) -> list[dict[str, Any]]:
-    rows = db_fetchall(
+async def list_recent_messages(*, conversation_id: str, limit: int) -> list[dict[str, Any]]:
+    rows = await db_fetchall(
         """
         select id::text as id, conversation_id::text as conversation_id, guest_id, user_id::text as user_id, role, content, meta, created_at
         from app.chatlaya_messages
         where conversation_id = %s::uuid
+          and created_at >= (
+            select c.created_at - interval '1 day' from app.chatlaya_conversations c where c.id = %s::uuid
+          )
         order by created_at desc
         limit %s;
         """,
-        (conversation_id, limit),
+        (conversation_id, conversation_id, limit),
     )
     rows.reverse()
     return [_normalize_message(row) for row in rows if row]
 
 
-def create_problem_report(
+async def create_problem_report(
     *,
     user_id: str | None,
     conversation_id: str | None,
@@ -295,7 +303,7 @@ def create_problem_report(
     source_channel: str,
     raw_payload: dict[str, Any],
 ) -> dict[str, Any]:
-    row = db_fetchone(
+    row = await db_fetchone(
         """
         insert into app.problem_reports(
           user_id,
@@ -4,7 +4,8 @@ import json
 from datetime import datetime
 from typing import Any
 
-from app.services.postgres_bootstrap import db_execute, db_fetchall, db_fetchone
+from app.repositories.match_pg import enqueue_match_refresh
+from app.services.postgres_async import db_execute, db_fetchall, db_fetchall_read, db_fetchone
 
 
 def _json_load(value: Any, default: Any) -> Any:
@@ -46,8 +47,8 @@ def _normalize_opportunity(row: dict[str, Any] | None) -> dict[str, Any] | None:
     return row
 
 
-def create_need(*, payload: dict[str, Any], guest_id: str | None, user_id: str | None, now: datetime) -> dict[str, Any]:
-    row = db_fetchone(
+async def create_need(*, payload: dict[str, Any], guest_id: str | None, user_id: str | None, now: datetime) -> dict[str, Any]:
+    row = await db_fetchone(
         """
         insert into app.enterprise_needs(
           guest_id, user_id, title, company_name, primary_goal, need_type, expected_result, urgency,
@@ -85,11 +86,13 @@ def create_need(*, payload: dict[str, Any], guest_id: str | None, user_id: str |
             now,
         ),
     )
-    return _normalize_need(row) or {}
+    need = _normalize_need(row) or {}
+    await enqueue_match_refresh("need", need.get("id", ""))
+    return need
 
 
-def create_mission(*, need_id: str, guest_id: str | None, user_id: str | None, payload: dict[str, Any], status: str, now: datetime) -> dict[str, Any]:
-    row = db_fetchone(
+async def create_mission(*, need_id: str, guest_id: str | None, user_id: str | None, payload: dict[str, Any], status: str, now: datetime) -> dict[str, Any]:
+    row = await db_fetchone(
         """
         insert into app.enterprise_missions(
           need_id, guest_id, user_id, title, summary, deliverable, execution_mode, status, steps, created_at, updated_at
@@ -102,8 +105,8 @@ def create_mission(*, need_id: str, guest_id: str | None, user_id: str | None, p
     return _normalize_mission(row) or {}
 
 
-def create_opportunity(*, need_id: str, mission_id: str, payload: dict[str, Any], status: str, now: datetime) -> dict[str, Any]:
-    row = db_fetchone(
+async def create_opportunity(*, need_id: str, mission_id: str, payload: dict[str, Any], status: str, now: datetime) -> dict[str, Any]:
+    row = await db_fetchone(
         """
         insert into app.enterprise_opportunities(
           need_id, mission_id, type, title, summary, status, highlights, published_at, created_at, updated_at
@@ -116,16 +119,20 @@ def create_opportunity(*, need_id: str, mission_id: str, payload: dict[str, Any]
     return _normalize_opportunity(row) or {}
 
 
-def get_need_for_user(need_id: str, user_id: str) -> dict[str, Any] | None:
-    return _normalize_need(db_fetchone("select id::text as id, guest_id, user_id::text as user_id, title, company_name, primary_goal, need_type, expected_result, urgency, treatment_preference, recommended_treatment_mode, team_context, support_preference, short_brief, status, qualification_score, clarity_level, structured_summary, next_recommended_action, created_at, updated_at from app.enterprise_needs where id = %s::uuid and user_id = %s::uuid limit 1;", (need_id, user_id)))
+async def get_need(need_id: str) -> dict[str, Any] | None:
+    return _normalize_need(await db_fetchone("select id::text as id, guest_id, user_id::text as user_id, title, company_name, primary_goal, need_type, expected_result, urgency, treatment_preference, recommended_treatment_mode, team_context, support_preference, short_brief, status, qualification_score, clarity_level, structured_summary, next_recommended_action, created_at, updated_at from app.enterprise_needs where id = %s::uuid limit 1;", (need_id,)))
 
 
-def get_need_for_guest(need_id: str, guest_id: str) -> dict[str, Any] | None:
-    return _normalize_need(db_fetchone("select id::text as id, guest_id, user_id::text as user_id, title, company_name, primary_goal, need_type, expected_result, urgency, treatment_preference, recommended_treatment_mode, team_context, support_preference, short_brief, status, qualification_score, clarity_level, structured_summary, next_recommended_action, created_at, updated_at from app.enterprise_needs where id = %s::uuid and guest_id = %s limit 1;", (need_id, guest_id)))
+async def get_need_for_user(need_id: str, user_id: str) -> dict[str, Any] | None:
+    return _normalize_need(await db_fetchone("select id::text as id, guest_id, user_id::text as user_id, title, company_name, primary_goal, need_type, expected_result, urgency, treatment_preference, recommended_treatment_mode, team_context, support_preference, short_brief, status, qualification_score, clarity_level, structured_summary, next_recommended_action, created_at, updated_at from app.enterprise_needs where id = %s::uuid and user_id = %s::uuid limit 1;", (need_id, user_id)))
 
 
-def claim_need_for_user(need_id: str, user_id: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_need_for_guest(need_id: str, guest_id: str) -> dict[str, Any] | None:
+    return _normalize_need(await db_fetchone("select id::text as id, guest_id, user_id::text as user_id, title, company_name, primary_goal, need_type, expected_result, urgency, treatment_preference, recommended_treatment_mode, team_context, support_preference, short_brief, status, qualification_score, clarity_level, structured_summary, next_recommended_action, created_at, updated_at from app.enterprise_needs where id = %s::uuid and guest_id = %s limit 1;", (need_id, guest_id)))
+
+
+async def claim_need_for_user(need_id: str, user_id: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         update app.enterprise_needs
         set user_id = %s::uuid, updated_at = timezone('utc', now())
@@ -137,33 +144,41 @@ def claim_need_for_user(need_id: str, user_id: str) -> dict[str, Any] | None:
     return _normalize_need(row)
 
 
-def sync_need_related_user(need_id: str, user_id: str) -> None:
-    db_execute("update app.enterprise_missions set user_id = %s::uuid, updated_at = timezone('utc', now()) where need_id = %s::uuid and user_id is distinct from %s::uuid;", (user_id, need_id, user_id))
-    db_execute("update app.enterprise_opportunities set user_id = %s::uuid, updated_at = timezone('utc', now()) where need_id = %s::uuid and user_id is distinct from %s::uuid;", (user_id, need_id, user_id))
+async def sync_need_related_user(need_id: str, user_id: str) -> None:
+    await db_execute("update app.enterprise_missions set user_id = %s::uuid, updated_at = timezone('utc', now()) where need_id = %s::uuid and user_id is distinct from %s::uuid;", (user_id, need_id, user_id))
+    await db_execute("update app.enterprise_opportunities set user_id = %s::uuid, updated_at = timezone('utc', now()) where need_id = %s::uuid and user_id is distinct from %s::uuid;", (user_id, need_id, user_id))
+
+
+async def list_user_needs(user_id: str) -> list[dict[str, Any]]:
+    return [_normalize_need(r) for r in await db_fetchall("select id::text as id, guest_id, user_id::text as user_id, title, company_name, primary_goal, need_type, expected_result, urgency, treatment_preference, recommended_treatment_mode, team_context, support_preference, short_brief, status, qualification_score, clarity_level, structured_summary, next_recommended_action, created_at, updated_at from app.enterprise_needs where user_id = %s::uuid order by created_at desc limit 50;", (user_id,)) if r]
+
+
+# Needs still looking for talents (see enterprise_service.derive_statuses).
+OPEN_NEED_STATUSES = ("qualified", "published")
 
 
-def list_user_needs(user_id: str) -> list[dict[str, Any]]:
-    return [_normalize_need(r) for r in db_fetchall("select id::text as id, guest_id, user_id::text as user_id, title, company_name, primary_goal, need_type, expected_result, urgency, treatment_preference, recommended_treatment_mode, team_context, support_preference, short_brief, status, qualification_score, clarity_level, structured_summary, next_recommended_action, created_at, updated_at from app.enterprise_needs where user_id = %s::uuid order by created_at desc limit 50;", (user_id,)) if r]
+async def list_open_needs() -> list[dict[str, Any]]:
+    return [_normalize_need(r) for r in await db_fetchall_read("select id::text as id, title, primary_goal, urgency, treatment_preference, status, created_at, updated_at from app.enterprise_needs where status = any(%s) order by created_at desc;", (list(OPEN_NEED_STATUSES),)) if r]
 
 
-def get_mission_for_need(need_id: str) -> dict[str, Any] | None:
-    return _normalize_mission(db_fetchone("select id::text as id, need_id::text as need_id, guest_id, user_id::text as user_id, title, summary, deliverable, execution_mode, status, steps, created_at, updated_at from app.enterprise_missions where need_id = %s::uuid limit 1;", (need_id,)))
+async def get_mission_for_need(need_id: str) -> dict[str, Any] | None:
+    return _normalize_mission(await db_fetchone("select id::text as id, need_id::text as need_id, guest_id, user_id::text as user_id, title, summary, deliverable, execution_mode, status, steps, created_at, updated_at from app.enterprise_missions where need_id = %s::uuid limit 1;", (need_id,)))
 
 
-def get_opportunity_for_need(need_id: str) -> dict[str, Any] | None:
-    return _normalize_opportunity(db_fetchone("select id::text as id, need_id::text as need_id, mission_id::text as mission_id, user_id::text as user_id, type, title, summary, status, highlights, published_at, created_at, updated_at from app.enterprise_opportunities where need_id = %s::uuid limit 1;", (need_id,)))
+async def get_opportunity_for_need(need_id: str) -> dict[str, Any] | None:
+    return _normalize_opportunity(await db_fetchone("select id::text as id, need_id::text as need_id, mission_id::text as mission_id, user_id::text as user_id, type, title, summary, status, highlights, published_at, created_at, updated_at from app.enterprise_opportunities where need_id = %s::uuid limit 1;", (need_id,)))
 
 
-def list_public_opportunities() -> list[dict[str, Any]]:
-    return [_normalize_opportunity(r) for r in db_fetchall("select id::text as id, need_id::text as need_id, mission_id::text as mission_id, user_id::text as user_id, type, title, summary, status, highlights, published_at, created_at, updated_at from app.enterprise_opportunities where status = 'published' order by published_at desc nulls last limit 24;") if r]
+async def list_public_opportunities() -> list[dict[str, Any]]:
+    return [_normalize_opportunity(r) for r in await db_fetchall_read("select id::text as id, need_id::text as need_id, mission_id::text as mission_id, user_id::text as user_id, type, title, summary, status, highlights, published_at, created_at, updated_at from app.enterprise_opportunities where status = 'published' order by published_at desc nulls last limit 24;") if r]
 
 
-def list_task_bindings(need_id: str, user_id: str) -> list[dict[str, Any]]:
-    return db_fetchall("select id::text as id, need_id::text as need_id, user_id::text as user_id, context_id, step_key, step_title, created_at, updated_at from app.enterprise_task_bindings where need_id = %s::uuid and user_id = %s::uuid order by created_at asc;", (need_id, user_id))
+async def list_task_bindings(need_id: str, user_id: str) -> list[dict[str, Any]]:
+    return await db_fetchall("select id::text as id, need_id::text as need_id, user_id::text as user_id, context_id, step_key, step_title, created_at, updated_at from app.enterprise_task_bindings where need_id = %s::uuid and user_id = %s::uuid order by created_at asc;", (need_id, user_id))
 
 
-def create_task_binding(*, need_id: str, user_id: str, context_id: str, step_key: str, step_title: str, now: datetime) -> dict[str, Any] | None:
-    return db_fetchone(
+async def create_task_binding(*, need_id: str, user_id: str, context_id: str, step_key: str, step_title: str, now: datetime) -> dict[str, Any] | None:
+    return await db_fetchone(
         """
         insert into app.enterprise_task_bindings(need_id, user_id, context_id, step_key, step_title, created_at, updated_at)
         values (%s::uuid, %s::uuid, %s, %s, %s, %s, %s)
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from app.services.postgres_async import async_pg_pool_ready, db_execute, db_fetchall, db_fetchone
+from app.services.talent_index import TALENT_COLUMNS_SQL
+
+
+logger = logging.getLogger(__name__)
+
+
+def _json_load(value: Any, default: Any) -> Any:
+    if value is None:
+        return default
+    if isinstance(value, (dict, list)):
+        return value
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except Exception:
+            return default
+    return default
+
+
+def _normalize_match_row(row: dict[str, Any] | None) -> dict[str, Any] | None:
+    if not row:
+        return None
+    row["matches"] = _json_load(row.get("matches"), [])
+    row["pending"] = bool(row.get("pending", False))
+    return row
+
+
+async def enqueue_match_refresh(kind: str, ref_id: str) -> None:
+    """Ask the match worker to recompute what depends on one need or flow."""
+    if not ref_id or not async_pg_pool_ready():
+        return
+    try:
+        await db_execute(
+            """
+            insert into app.match_refresh_queue(kind, ref_id) values (%s, %s)
+            on conflict (kind, ref_id) do update set enqueued_at = excluded.enqueued_at;
+            """,
+            (kind, ref_id),
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Match refresh enqueue failed for %s %s: %s", kind, ref_id, exc)
+
+
+async def get_need_match_row(need_id: str) -> dict[str, Any] | None:
+    return _normalize_match_row(await db_fetchone(
+        """
+        select m.need_id::text as need_id, m.matches, m.talents_evaluated, m.computed_at,
+               exists(
+                 select 1 from app.match_refresh_queue q
+                 where (q.kind = 'need' and q.ref_id = %s) or q.kind = 'all'
+               ) as pending
+        from app.enterprise_need_matches m
+        where m.need_id = %s::uuid;
+        """,
+        (need_id, need_id),
+    ))
+
+
+async def get_talent_match_row(flow_id: str) -> dict[str, Any] | None:
+    return _normalize_match_row(await db_fetchone(
+        """
+        select m.flow_id::text as flow_id, m.matches, m.needs_evaluated, m.computed_at,
+               exists(
+                 select 1 from app.match_refresh_queue q
+                 where (q.kind = 'flow' and q.ref_id = %s) or q.kind = 'all'
+               ) as pending
+        from app.talent_need_matches m
+        where m.flow_id = %s::uuid;
+        """,
+        (flow_id, flow_id),
+    ))
+
+
+async def list_talent_cards(flow_ids: list[str]) -> dict[str, dict[str, Any]]:
+    if not flow_ids:
+        return {}
+    rows = await db_fetchall(f"select {TALENT_COLUMNS_SQL} from app.trajectory_flows where id = any(%s::uuid[]);", (flow_ids,))
+    return {row["id"]: row for row in rows}
+
+
+async def list_need_summaries(need_ids: list[str]) -> dict[str, dict[str, Any]]:
+    if not need_ids:
+        return {}
+    rows = await db_fetchall(
+        "select id::text as id, title, company_name, primary_goal, urgency, treatment_preference, status, created_at from app.enterprise_needs where id = any(%s::uuid[]);",
+        (need_ids,),
+    )
+    return {row["id"]: row for row in rows}
@@ -4,7 +4,9 @@ import json
 from datetime import datetime
 from typing import Any
 
-from app.services.postgres_bootstrap import db_execute, db_fetchall, db_fetchone
+from app.services.postgres_async import db_execute, db_fetchall, db_fetchone
+from app.repositories.match_pg import enqueue_match_refresh
+from app.services.talent_index import publish_talent_change
 
 
 def _json_load(value: Any, default: Any) -> Any:
@@ -36,8 +38,8 @@ def _normalize_flow(row: dict[str, Any] | None) -> dict[str, Any] | None:
     return row
 
 
-def create_flow(*, guest_id: str | None, user_id: str | None, onboarding: dict[str, Any], status: str, now: datetime) -> dict[str, Any]:
-    row = db_fetchone(
+async def create_flow(*, guest_id: str | None, user_id: str | None, onboarding: dict[str, Any], status: str, now: datetime) -> dict[str, Any]:
+    row = await db_fetchone(
         """
         insert into app.trajectory_flows(
           guest_id, user_id, status, onboarding, diagnostic, progress_plan, final_recommendation, submitted_to_team, proofs, verified_profile, opportunity_targets, created_at, updated_at
@@ -49,11 +51,14 @@ def create_flow(*, guest_id: str | None, user_id: str | None, onboarding: dict[s
         """,
         (guest_id, user_id, status, json.dumps(onboarding), now, now),
     )
-    return _normalize_flow(row) or {}
+    flow = _normalize_flow(row) or {}
+    await publish_talent_change(flow.get("id", ""))
+    await enqueue_match_refresh("flow", flow.get("id", ""))
+    return flow
 
 
-def get_flow_for_user(flow_id: str, user_id: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_flow_for_user(flow_id: str, user_id: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         select id::text as id, guest_id, user_id::text as user_id, status, onboarding, diagnostic, progress_plan, final_recommendation, submitted_to_team, proofs, verified_profile, opportunity_targets, enrolled_at, created_at, updated_at
         from app.trajectory_flows
@@ -65,8 +70,8 @@ def get_flow_for_user(flow_id: str, user_id: str) -> dict[str, Any] | None:
     return _normalize_flow(row)
 
 
-def get_flow_for_guest(flow_id: str, guest_id: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def get_flow_for_guest(flow_id: str, guest_id: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         select id::text as id, guest_id, user_id::text as user_id, status, onboarding, diagnostic, progress_plan, final_recommendation, submitted_to_team, proofs, verified_profile, opportunity_targets, enrolled_at, created_at, updated_at
         from app.trajectory_flows
@@ -78,8 +83,8 @@ def get_flow_for_guest(flow_id: str, guest_id: str) -> dict[str, Any] | None:
     return _normalize_flow(row)
 
 
-def claim_flow_for_user(flow_id: str, user_id: str) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def claim_flow_for_user(flow_id: str, user_id: str) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         update app.trajectory_flows
         set user_id = %s::uuid, updated_at = timezone('utc', now())
@@ -88,11 +93,13 @@ def claim_flow_for_user(flow_id: str, user_id: str) -> dict[str, Any] | None:
         """,
         (user_id, flow_id),
     )
+    if row:
+        await publish_talent_change(flow_id)
     return _normalize_flow(row)
 
 
-def update_flow_state(flow_id: str, *, diagnostic: dict[str, Any], progress_plan: dict[str, Any], final_recommendation: dict[str, Any] | None, proofs: list[dict[str, Any]], verified_profile: dict[str, Any], opportunity_targets: list[dict[str, Any]], status: str, updated_at: datetime) -> None:
-    db_execute(
+async def update_flow_state(flow_id: str, *, diagnostic: dict[str, Any], progress_plan: dict[str, Any], final_recommendation: dict[str, Any] | None, proofs: list[dict[str, Any]], verified_profile: dict[str, Any], opportunity_targets: list[dict[str, Any]], status: str, updated_at: datetime) -> None:
+    await db_execute(
         """
         update app.trajectory_flows
         set diagnostic = %s::jsonb,
@@ -117,10 +124,12 @@ def update_flow_state(flow_id: str, *, diagnostic: dict[str, Any], progress_plan
             flow_id,
         ),
     )
+    await publish_talent_change(flow_id)
+    await enqueue_match_refresh("flow", flow_id)
 
 
-def submit_flow_lead(*, flow_id: str, first_name: str, last_name: str, email: str, whatsapp_country_code: str, whatsapp_number: str, submitted_at: datetime) -> None:
-    db_execute(
+async def submit_flow_lead(*, flow_id: str, first_name: str, last_name: str, email: str, whatsapp_country_code: str, whatsapp_number: str, submitted_at: datetime) -> None:
+    await db_execute(
         """
         insert into app.training_diagnostic_leads(
           flow_id, first_name, last_name, email, whatsapp_country_code, whatsapp_number, submitted_at
@@ -136,14 +145,14 @@ def submit_flow_lead(*, flow_id: str, first_name: str, last_name: str, email: st
         """,
         (flow_id, first_name, last_name, email, whatsapp_country_code, whatsapp_number, submitted_at),
     )
-    db_execute(
+    await db_execute(
         "update app.trajectory_flows set submitted_to_team = true, updated_at = %s where id = %s::uuid;",
         (submitted_at, flow_id),
     )
 
 
-def mark_flow_enrolled(flow_id: str, enrolled_at: datetime) -> None:
-    db_execute(
+async def mark_flow_enrolled(flow_id: str, enrolled_at: datetime) -> None:
+    await db_execute(
         """
         update app.trajectory_flows
         set enrolled_at = coalesce(enrolled_at, %s), updated_at = %s
@@ -153,8 +162,8 @@ def mark_flow_enrolled(flow_id: str, enrolled_at: datetime) -> None:
     )
 
 
-def list_bindings(flow_id: str, user_id: str) -> list[dict[str, Any]]:
-    return db_fetchall(
+async def list_bindings(flow_id: str, user_id: str) -> list[dict[str, Any]]:
+    return await db_fetchall(
         """
         select id::text as id, flow_id::text as flow_id, user_id::text as user_id, context_id,
                koryxa_stage_key, koryxa_task_key, proof_required, feature_gate, created_at, updated_at
@@ -166,8 +175,8 @@ def list_bindings(flow_id: str, user_id: str) -> list[dict[str, Any]]:
     )
 
 
-def create_binding(*, flow_id: str, user_id: str, context_id: str, stage_key: str, task_key: str, proof_required: bool, feature_gate: str | None, now: datetime) -> dict[str, Any] | None:
-    row = db_fetchone(
+async def create_binding(*, flow_id: str, user_id: str, context_id: str, stage_key: str, task_key: str, proof_required: bool, feature_gate: str | None, now: datetime) -> dict[str, Any] | None:
+    row = await db_fetchone(
         """
         insert into app.trajectory_task_bindings(
           flow_id, user_id, context_id, koryxa_stage_key, koryxa_task_key, proof_required, feature_gate, created_at, updated_at
@@ -13,14 +13,17 @@ from fastapi.responses import RedirectResponse
 
 from app.core.auth import (
     generate_session_token,
-    hash_password,
+    hash_otp_code,
     hash_token,
+    is_hmac_otp_hash,
     normalize_email,
     session_expiry,
-    verify_password,
+    unusable_password_hash,
+    verify_otp_code,
 )
 from app.core.config import settings
 from app.core.email import send_email_async
+from app.core.password_pool import PasswordPoolBusy, hash_password_async, verify_password_async
 from app.deps.auth import get_current_user
 from app.repositories.auth_pg import (
     create_reset_token,
@@ -31,6 +34,7 @@ from app.repositories.auth_pg import (
     get_user_by_email,
     get_user_by_google_subject,
     mark_reset_token_used,
+    record_otp_failure,
     replace_otp,
     revoke_session_by_token,
     revoke_sessions_for_user,
@@ -67,6 +71,28 @@ def _generate_otp(length: int | None = None) -> str:
     return "".join(secrets.choice(digits) for _ in range(size))
 
 
+async def _hash_password(password: str) -> str:
+    try:
+        return await hash_password_async(password)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service momentanement sature. Merci de reessayer.",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def _verify_password(plain: str, hashed: str) -> bool:
+    try:
+        return await verify_password_async(plain, hashed)
+    except PasswordPoolBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service momentanement sature. Merci de reessayer.",
+            headers={"Retry-After": "1"},
+        )
+
+
 def _cookie_domain() -> str | None:
     try:
         host = urlparse(settings.FRONTEND_BASE_URL).hostname
@@ -282,7 +308,7 @@ def _build_dev_user_doc(now: datetime) -> dict:
 
     return {
         "email": normalize_email(settings.DEV_AUTH_BYPASS_EMAIL),
-        "password_hash": hash_password(generate_session_token()),
+        "password_hash": unusable_password_hash(),
         "first_name": (settings.DEV_AUTH_BYPASS_FIRST_NAME or "Dev").strip() or "Dev",
         "last_name": (settings.DEV_AUTH_BYPASS_LAST_NAME or "Local").strip() or "Local",
         "country": (settings.DEV_AUTH_BYPASS_COUNTRY or "TG").strip() or "TG",
@@ -298,10 +324,10 @@ def _public_user_pg(user: dict) -> UserPublic:
     return _public_user(user)
 
 
-def _issue_session_pg(response: Response, user_id: str, request: Request) -> datetime:
+async def _issue_session_pg(response: Response, user_id: str, request: Request) -> datetime:
     token = generate_session_token()
     expires_at = session_expiry()
-    create_pg_session(
+    await create_pg_session(
         user_id=user_id,
         token_hash=hash_token(token),
         expires_at=expires_at,
@@ -352,21 +378,21 @@ async def register(
     request: Request,
 ):
     email = normalize_email(payload.email)
-    existing = get_user_by_email(email)
+    existing = await get_user_by_email(email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail={"code": "EMAIL_EXISTS", "detail": "Email deja utilise"},
         )
-    user = create_pg_user(
+    user = await create_pg_user(
         email=email,
-        password_hash=hash_password(payload.password),
+        password_hash=await _hash_password(payload.password),
         first_name=payload.first_name.strip(),
         last_name=payload.last_name.strip(),
         country=payload.country.strip(),
         account_type=payload.account_type,
     )
-    expires_at = _issue_session_pg(response, str(user["id"]), request)
+    expires_at = await _issue_session_pg(response, str(user["id"]), request)
     return {"user": _public_user_pg(user), "session_expires_at": expires_at}
 
 
@@ -381,16 +407,16 @@ async def request_otp(
 
     meta: dict[str, str] = {}
     if intent == "login":
-        user = get_user_by_email(email)
+        user = await get_user_by_email(email)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Compte introuvable. Merci de vous inscrire.")
         if not payload.password:
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Mot de passe requis.")
-        if not verify_password(payload.password, user.get("password_hash") or ""):
+        if not await _verify_password(payload.password, user.get("password_hash") or ""):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email ou mot de passe invalide.")
         meta = {"flow": "login", "user_id": str(user["id"])}
     elif intent == "register":
-        if get_user_by_email(email):
+        if await get_user_by_email(email):
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail={"code": "EMAIL_EXISTS", "detail": "Email deja utilise"},
@@ -413,7 +439,7 @@ async def request_otp(
             )
         meta = {
             "flow": "register",
-            "password_hash": hash_password(payload.password),
+            "password_hash": await _hash_password(payload.password),
             "first_name": payload.first_name.strip(),
             "last_name": payload.last_name.strip(),
             "country": payload.country.strip(),
@@ -424,9 +450,9 @@ async def request_otp(
 
     expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.OTP_TTL_MIN)
     code = _generate_otp()
-    replace_otp(
+    await replace_otp(
         email=email,
-        code_hash=hash_password(code),
+        code_hash=hash_otp_code(email, code),
         expires_at=expires_at,
         intent=intent,
         meta=meta,
@@ -518,17 +544,17 @@ async def google_callback(
     if not google_subject or not email or not email_verified:
         return _google_auth_error_redirect("google_profil_invalide", saved_redirect)
 
-    user = get_user_by_google_subject(google_subject)
+    user = await get_user_by_google_subject(google_subject)
     if not user:
-        user = get_user_by_email(email)
+        user = await get_user_by_email(email)
         if user:
-            linked = link_google_subject(str(user["id"]), google_subject)
+            linked = await link_google_subject(str(user["id"]), google_subject)
             user = linked or user
         else:
-            user = create_pg_user(
+            user = await create_pg_user(
                 email=email,
                 google_subject=google_subject,
-                password_hash=hash_password(generate_session_token()),
+                password_hash=unusable_password_hash(),
                 first_name=first_name,
                 last_name=last_name,
                 country="",
@@ -536,7 +562,7 @@ async def google_callback(
             )
 
     if user and ((not user.get("first_name")) or (not user.get("last_name"))):
-        user = update_user_fields(
+        user = await update_user_fields(
             str(user["id"]),
             first_name=first_name if not user.get("first_name") else None,
             last_name=last_name if not user.get("last_name") else None,
@@ -546,7 +572,7 @@ async def google_callback(
         url=_resolve_frontend_redirect_url(saved_redirect),
         status_code=303,
     )
-    _issue_session_pg(redirect_response, str(user["id"]), request)
+    await _issue_session_pg(redirect_response, str(user["id"]), request)
     _clear_short_lived_cookie(redirect_response, GOOGLE_STATE_COOKIE)
     _clear_short_lived_cookie(redirect_response, GOOGLE_REDIRECT_COOKIE)
     return redirect_response
@@ -559,7 +585,7 @@ async def _verify_otp_flow(
 ):
     email = normalize_email(payload.email)
     expected_intent = payload.intent or "auto"
-    otp_doc = get_latest_otp(email)
+    otp_doc = await get_latest_otp(email)
     now = datetime.now(timezone.utc)
     expires_at = otp_doc.get("expires_at") if otp_doc else None
     if not otp_doc or not isinstance(expires_at, datetime) or expires_at <= now:
@@ -567,13 +593,26 @@ async def _verify_otp_flow(
     otp_intent = str(otp_doc.get("intent") or "login")
     if expected_intent != "auto" and otp_intent != expected_intent:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ce code OTP ne correspond pas a cette operation.")
-    if not verify_password(payload.code, otp_doc.get("code_hash") or ""):
+    code_hash = str(otp_doc.get("code_hash") or "")
+    if is_hmac_otp_hash(code_hash):
+        code_ok = verify_otp_code(email, payload.code, code_hash)
+    else:
+        # Codes issued before the switch to HMAC are still KDF hashes.
+        code_ok = await _verify_password(payload.code, code_hash)
+    if not code_ok:
+        attempts = await record_otp_failure(str(otp_doc["id"]))
+        if attempts >= settings.OTP_MAX_ATTEMPTS:
+            await delete_otp(str(otp_doc["id"]))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Trop de tentatives. Merci de renvoyer un OTP.",
+            )
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Code invalide.")
     meta = otp_doc.get("meta") or {}
-    delete_otp(str(otp_doc["id"]))
+    await delete_otp(str(otp_doc["id"]))
 
     if otp_intent == "register":
-        if get_user_by_email(email):
+        if await get_user_by_email(email):
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Cet email est deja utilise.")
         password_hash = str(meta.get("password_hash") or "").strip()
         first_name = str(meta.get("first_name") or "").strip()
@@ -582,7 +621,7 @@ async def _verify_otp_flow(
         account_type = str(meta.get("account_type") or "").strip()
         if not all([password_hash, first_name, last_name, country, account_type]):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Les donnees d'inscription OTP sont incompletes.")
-        user = create_pg_user(
+        user = await create_pg_user(
             email=email,
             password_hash=password_hash,
             first_name=first_name,
@@ -591,7 +630,7 @@ async def _verify_otp_flow(
             account_type=account_type,
         )
     else:
-        user = get_user_by_email(email)
+        user = await get_user_by_email(email)
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Compte introuvable. Merci de vous inscrire d'abord.")
         updates: dict[str, str] = {}
@@ -600,8 +639,8 @@ async def _verify_otp_flow(
         if payload.last_name and not user.get("last_name"):
             updates["last_name"] = payload.last_name.strip()
         if updates:
-            user = update_user_fields(str(user["id"]), **updates) or user
-    session_expires_at = _issue_session_pg(response, str(user["id"]), request)
+            user = await update_user_fields(str(user["id"]), **updates) or user
+    session_expires_at = await _issue_session_pg(response, str(user["id"]), request)
     return {"user": _public_user_pg(user), "session_expires_at": session_expires_at}
 
 
@@ -629,12 +668,12 @@ async def login(
     response: Response,
     request: Request,
 ):
-    user = get_user_by_email(normalize_email(payload.email))
+    user = await get_user_by_email(normalize_email(payload.email))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Identifiants invalides")
-    if not verify_password(payload.password, user.get("password_hash") or ""):
+    if not await _verify_password(payload.password, user.get("password_hash") or ""):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Identifiants invalides")
-    expires_at = _issue_session_pg(response, str(user["id"]), request)
+    expires_at = await _issue_session_pg(response, str(user["id"]), request)
     return {"user": _public_user_pg(user), "session_expires_at": expires_at}
 
 
@@ -645,8 +684,8 @@ async def dev_login(
 ):
     if not _dev_auth_enabled():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
-    user = upsert_dev_user(_build_dev_user_doc(datetime.now(timezone.utc)))
-    expires_at = _issue_session_pg(response, str(user["id"]), request)
+    user = await upsert_dev_user(_build_dev_user_doc(datetime.now(timezone.utc)))
+    expires_at = await _issue_session_pg(response, str(user["id"]), request)
     return {"user": _public_user_pg(user), "session_expires_at": expires_at}
 
 
@@ -660,7 +699,7 @@ async def set_workspace_role(
     payload: RoleUpdatePayload,
     current: dict = Depends(get_current_user),
 ):
-    user = update_user_fields(str(current["_id"]), workspace_role=payload.role)
+    user = await update_user_fields(str(current["_id"]), workspace_role=payload.role)
     current["workspace_role"] = payload.role
     if user:
         current.update(user)
@@ -674,7 +713,7 @@ async def logout(
 ):
     token = request.cookies.get(settings.SESSION_COOKIE_NAME)
     if token:
-        revoke_session_by_token(hash_token(token))
+        await revoke_session_by_token(hash_token(token))
     _clear_session_cookie(response)
     response.headers["Cache-Control"] = "no-store"
     return {"ok": True}
@@ -686,12 +725,12 @@ async def forgot_password(
     request: Request,
 ):
     email = normalize_email(payload.email)
-    user = get_user_by_email(email)
+    user = await get_user_by_email(email)
     if not user:
         return {"ok": True}
     token = generate_session_token()
     expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.RESET_TOKEN_TTL_MIN)
-    create_reset_token(user_id=str(user["id"]), token_hash=hash_token(token), expires_at=expires_at)
+    await create_reset_token(user_id=str(user["id"]), token_hash=hash_token(token), expires_at=expires_at)
     params = urlencode({"token": token, "email": email})
     reset_url = f"{settings.FRONTEND_BASE_URL.rstrip('/')}/reset?{params}"
     subject = "Reinitialisation de votre mot de passe KORYXA"
@@ -711,15 +750,15 @@ async def reset_password(
     request: Request,
 ):
     email = normalize_email(payload.email)
-    user = get_user_by_email(email)
+    user = await get_user_by_email(email)
     if not user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token invalide ou expire")
-    token_doc = get_valid_reset_token(user_id=str(user["id"]), token_hash=hash_token(payload.token))
+    token_doc = await get_valid_reset_token(user_id=str(user["id"]), token_hash=hash_token(payload.token))
     if not token_doc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token invalide ou expire")
-    update_user_fields(str(user["id"]), password_hash=hash_password(payload.new_password))
-    mark_reset_token_used(str(token_doc["id"]))
-    revoke_sessions_for_user(str(user["id"]))
+    await update_user_fields(str(user["id"]), password_hash=await _hash_password(payload.new_password))
+    await mark_reset_token_used(str(token_doc["id"]))
+    await revoke_sessions_for_user(str(user["id"]))
     _clear_session_cookie(response)
     response.headers["Cache-Control"] = "no-store"
     return {"ok": True}
@@ -7,7 +7,7 @@ import json
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 
-from app.services.postgres_bootstrap import db_execute, db_fetchall
+from app.services.postgres_async import db_execute, db_fetchall_read
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -26,7 +26,7 @@ COLL_NOTIFS = "notifications"
 
 @router.get("")
 async def list_notifications(user_id: str, unread_only: Optional[int] = 0):
-    rows = db_fetchall(
+    rows = await db_fetchall_read(
         """
         select id::text as id,
                user_id::text as user_id,
@@ -46,7 +46,7 @@ async def list_notifications(user_id: str, unread_only: Optional[int] = 0):
 
 @router.post("")
 async def create_notification(n: Notification):
-    db_execute(
+    await db_execute(
         """
         insert into app.notifications(user_id, title, body, category, is_read, read_at, payload_json, created_at, updated_at)
         values (%s::uuid, %s, %s, %s, %s, %s, %s::jsonb, %s, %s);
@@ -69,11 +69,11 @@ async def create_notification(n: Notification):
 @router.post("/read")
 async def mark_read(user_id: str, ids: List[str]):
     now = datetime.utcnow().isoformat()
-    db_execute(
+    await db_execute(
         """
         update app.notifications
         set is_read = true, read_at = %s::timestamptz, updated_at = %s::timestamptz
-        where user_id = %s::uuid and id::text = any(%s);
+        where user_id = %s::uuid and id::text = any(%s::text[]);
         """,
         (now, now, user_id, ids),
     )
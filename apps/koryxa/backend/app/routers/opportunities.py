@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import logging
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
 
 from app.core.config import settings
 from app.db.mongo import get_db
+from app.services.opportunity_index import get_opportunity_index
+from app.services.skill_vocab import SKILLS, jaccard_bits
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["innova-opportunities"])  # will be mounted under /innova/api
 
 
@@ -94,6 +101,7 @@ async def create_opportunity(payload: Dict[str, Any], db: AsyncIOMotorDatabase =
     probability = clean_int(payload.get("probability"))
     close_date = clean_text(payload.get("close_date"))
     priority = clean_text(payload.get("priority"))
+    now = iso_now()
     doc = {
         "title": title,
         "problem": problem,
@@ -101,7 +109,8 @@ async def create_opportunity(payload: Dict[str, Any], db: AsyncIOMotorDatabase =
         "tags": tags,
         "country": country,
         "status": status,
-        "created_at": iso_now(),
+        "created_at": now,
+        "updated_at": now,
         "mission_id": mission_id,
         "source": source,
         "product_slug": product_slug,
@@ -115,9 +124,47 @@ async def create_opportunity(payload: Dict[str, Any], db: AsyncIOMotorDatabase =
         "priority": priority,
     }
     res = await db["opportunities"].insert_one(doc)
+    get_opportunity_index().upsert(doc)
     return {"opportunity_id": str(res.inserted_id)}
 
 
+_OPP_TEXT_FIELDS = ("status", "company", "contact", "currency", "stage", "close_date", "priority")
+
+
+@router.patch("/opportunities/{opp_id}")
+async def update_opportunity(opp_id: str, payload: Dict[str, Any], db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Partial edit; closing an opportunity is an edit of its status.
+    updates: Dict[str, Any] = {}
+    for field in ("title", "problem"):
+        if field in payload:
+            value = (payload.get(field) or "").strip()
+            if not value:
+                raise HTTPException(status_code=422, detail=f"{field} cannot be empty")
+            updates[field] = value
+    for field in ("skills_required", "tags"):
+        if field in payload:
+            updates[field] = payload.get(field) or []
+    for field in _OPP_TEXT_FIELDS:
+        if field in payload:
+            updates[field] = clean_text(payload.get(field))
+    if "status" in updates and not updates["status"]:
+        raise HTTPException(status_code=422, detail="status cannot be empty")
+    if "country" in payload:
+        updates["country"] = payload.get("country")
+    if "value" in payload:
+        updates["value"] = clean_float(payload.get("value"))
+    if "probability" in payload:
+        updates["probability"] = clean_int(payload.get("probability"))
+    updates["updated_at"] = iso_now()
+    doc = await db["opportunities"].find_one_and_update(
+        {"_id": oid(opp_id)}, {"$set": updates}, return_document=ReturnDocument.AFTER
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="opportunity not found")
+    get_opportunity_index().upsert(doc)
+    return _serialize_opp(doc)
+
+
 def _serialize_opp(doc: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "id": str(doc.get("_id")),
@@ -177,35 +224,42 @@ async def list_opportunities(
     return {"items": items, "total": total, "page": page, "has_more": page * limit < total}
 
 
+# Only the fields match_run scores on.
+_PROFILE_MATCH_PROJECTION = {"user_id": 1, "skills": 1, "reputation": 1, "last_active_at": 1}
+_ACTIVE_ASSIGNMENT_STATUSES = ["pending", "accepted"]
+
+
 async def _load_profiles(db: AsyncIOMotorDatabase, country: Optional[str]) -> List[Dict[str, Any]]:
     q: Dict[str, Any] = {}
     if country:
         q["country"] = country
-    cursor = db["profiles"].find(q)
+    cursor = db["profiles"].find(q, _PROFILE_MATCH_PROJECTION)
     out: List[Dict[str, Any]] = []
     async for p in cursor:
         out.append(p)
     return out
 
 
-def _jaccard(a: List[str], b: List[str]) -> float:
-    sa, sb = set(x.strip().lower() for x in (a or [])), set(x.strip().lower() for x in (b or []))
-    if not sa and not sb:
-        return 0.0
-    inter = len(sa & sb)
-    union = len(sa | sb) or 1
-    return inter / union
-
-
 def _to01(x: float, lo: float, hi: float) -> float:
     if hi <= lo:
         return 0.0
     return max(0.0, min(1.0, (x - lo) / (hi - lo)))
 
 
-async def _workload_score(db: AsyncIOMotorDatabase, user_id: str) -> float:
+async def _workload_counts(db: AsyncIOMotorDatabase, user_ids: List[str]) -> Dict[str, int]:
+    # Active assignments per user in one round trip; users without any are absent.
+    pipeline = [
+        {"$match": {"status": {"$in": _ACTIVE_ASSIGNMENT_STATUSES}, "user_id": {"$in": user_ids}}},
+        {"$group": {"_id": "$user_id", "n": {"$sum": 1}}},
+    ]
+    counts: Dict[str, int] = {}
+    async for row in db["assignments"].aggregate(pipeline):
+        counts[str(row["_id"])] = int(row["n"])
+    return counts
+
+
+def _workload_score(active: int) -> float:
     # higher workload -> higher penalty; return value in [0,1]
-    active = await db["assignments"].count_documents({"user_id": user_id, "status": {"$in": ["pending", "accepted"]}})
     return _to01(active, 0.0, 5.0)
 
 
@@ -214,14 +268,23 @@ async def match_run(payload: Dict[str, Any], db: AsyncIOMotorDatabase = Depends(
     opp_id = payload.get("opportunity_id")
     if not opp_id:
         raise HTTPException(status_code=422, detail="opportunity_id required")
-    opp = await db["opportunities"].find_one({"_id": oid(opp_id)})
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    opp = await db["opportunities"].find_one({"_id": oid(opp_id)}, {"country": 1, "skills_required": 1})
     if not opp:
         raise HTTPException(status_code=404, detail="opportunity not found")
 
     profiles = await _load_profiles(db, opp.get("country"))
+    timings["load_profiles"] = time.perf_counter() - started
     if not profiles:
         return {"shortlist": []}
 
+    phase = time.perf_counter()
+    user_ids = [str(p.get("user_id") or p.get("_id")) for p in profiles]
+    workloads = await _workload_counts(db, user_ids)
+    timings["workload"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
     # compute recency bounds for normalization
     recencies: List[float] = []
     now = datetime.now(timezone.utc)
@@ -239,15 +302,16 @@ async def match_run(payload: Dict[str, Any], db: AsyncIOMotorDatabase = Depends(
     gamma = settings.MATCH_GAMMA
     delta = settings.MATCH_DELTA
 
+    required_bits = SKILLS.bitset(opp.get("skills_required"))
     results: List[Dict[str, Any]] = []
     for idx, p in enumerate(profiles):
-        user_id = str(p.get("user_id") or p.get("_id"))
-        skill_match = _jaccard(opp.get("skills_required") or [], p.get("skills") or [])
+        user_id = user_ids[idx]
+        skill_match = jaccard_bits(required_bits, SKILLS.bitset(p.get("skills")))
         reputation = float(p.get("reputation") or 0.5)
         # recency: smaller seconds -> more recent -> score close to 1
         sec = recencies[idx] if idx < len(recencies) else rmax
         recency = 1.0 - _to01(sec, rmin, rmax)
-        workload_pen = await _workload_score(db, user_id)
+        workload_pen = _workload_score(workloads.get(user_id, 0))
 
         match_score = alpha * skill_match + beta * reputation + gamma * recency - delta * workload_pen
         results.append({
@@ -260,9 +324,18 @@ async def match_run(payload: Dict[str, Any], db: AsyncIOMotorDatabase = Depends(
                 "workload_pen": round(workload_pen, 6),
             },
         })
+    timings["score"] = time.perf_counter() - phase
 
+    phase = time.perf_counter()
     results.sort(key=lambda x: x["scores"]["match"], reverse=True)
     top_k = int(payload.get("top_k") or settings.MATCH_TOP_K)
+    timings["sort"] = time.perf_counter() - phase
+    logger.info(
+        "match_run opportunity=%s profiles=%s timings_ms=%s",
+        opp_id,
+        len(profiles),
+        {name: round(seconds * 1000, 2) for name, seconds in timings.items()},
+    )
     return {"shortlist": results[: top_k]}
 
 
@@ -345,17 +418,13 @@ async def assignment_decision(payload: Dict[str, Any], db: AsyncIOMotorDatabase
 
 @router.get("/recommendations")
 async def recommendations(user_id: str, db: AsyncIOMotorDatabase = Depends(get_db)):
-    # Simple: list open opportunities, score quick by skill overlap vs profile
-    profile = await db["profiles"].find_one({"user_id": user_id})
+    # Score only open opportunities sharing at least one skill with the profile
+    profile = await db["profiles"].find_one({"user_id": user_id}, {"skills": 1})
     if not profile:
         return []
-    skills = profile.get("skills") or []
-    items: List[Dict[str, Any]] = []
-    async for opp in db["opportunities"].find({"status": "open"}).sort("created_at", -1):
-        sm = _jaccard(skills, opp.get("skills_required") or [])
-        items.append({"opportunity_id": str(opp["_id"]), "title": opp.get("title"), "score": round(sm, 6)})
-    items.sort(key=lambda x: x["score"], reverse=True)
-    return items[: settings.MATCH_TOP_K]
+    index = get_opportunity_index()
+    await index.ensure_fresh(db)
+    return index.recommend(profile.get("skills") or [], settings.MATCH_TOP_K)
 
 
 @router.get("/fairness/stats")
@@ -488,6 +557,7 @@ async def seed_e2e(db: AsyncIOMotorDatabase = Depends(get_db)):
         "tags": ["rag"],
         "status": "open",
         "created_at": iso_now(),
+        "updated_at": iso_now(),
         "company": "NeedIndex Labs",
         "contact": "Equipe growth",
         "value": 42000,
@@ -498,4 +568,5 @@ async def seed_e2e(db: AsyncIOMotorDatabase = Depends(get_db)):
         "priority": "medium",
     }
     res = await db["opportunities"].insert_one(opp)
+    get_opportunity_index().upsert(opp)
     return {"profiles": [p["user_id"] for p in profiles], "opportunity_id": str(res.inserted_id)}
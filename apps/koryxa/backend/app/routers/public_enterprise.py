@@ -39,7 +39,8 @@ from app.services.enterprise_service import (
     generate_next_enterprise_question,
     structure_enterprise_need,
 )
-from app.services.matching_service import find_matches_for_need
+from app.services.match_materializer import MATCH_TOP_K
+from app.services.matching_service import get_materialized_need_matches
 router = APIRouter(prefix="/enterprise", tags=["public-enterprise"])
 
 
@@ -117,26 +118,26 @@ async def _resolve_need(
     guest_id = get_guest_id(request)
 
     if current:
-        need = get_need_for_user(need_id, str(current["_id"]))
+        need = await get_need_for_user(need_id, str(current["_id"]))
         if need:
             return need
         if guest_id:
-            need = get_need_for_guest(need_id, guest_id)
+            need = await get_need_for_guest(need_id, guest_id)
             if need and not need.get("user_id"):
-                claimed = claim_need_for_user(need_id, str(current["_id"]))
+                claimed = await claim_need_for_user(need_id, str(current["_id"]))
                 if claimed:
-                    sync_need_related_user(need_id, str(current["_id"]))
+                    await sync_need_related_user(need_id, str(current["_id"]))
                     return claimed
-        need = claim_need_for_user(need_id, str(current["_id"]))
+        need = await claim_need_for_user(need_id, str(current["_id"]))
         if need:
-            sync_need_related_user(need_id, str(current["_id"]))
+            await sync_need_related_user(need_id, str(current["_id"]))
             return need
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Besoin introuvable")
 
     resolved_guest_id = ensure_guest_id(request, response) if response is not None else guest_id
     if not resolved_guest_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session invitée introuvable")
-    need = get_need_for_guest(need_id, resolved_guest_id)
+    need = await get_need_for_guest(need_id, resolved_guest_id)
     if not need:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Besoin introuvable")
     return need
@@ -148,7 +149,7 @@ async def _ensure_cockpit_bindings(
     current: dict,
 ) -> tuple[str, dict[str, dict[str, Any]], int]:
     context_id = _enterprise_context_id(str(need["_id"]))
-    existing = list_task_bindings(str(need["_id"]), str(current["_id"]))
+    existing = await list_task_bindings(str(need["_id"]), str(current["_id"]))
     binding_map = {str(item.get("step_key") or ""): item for item in existing}
     created_task_count = 0
     now = datetime.now(timezone.utc)
@@ -169,7 +170,7 @@ async def _ensure_cockpit_bindings(
             "created_at": now,
             "updated_at": now,
         }
-        created = create_task_binding(
+        created = await create_task_binding(
             need_id=str(need["_id"]),
             user_id=str(current["_id"]),
             context_id=context_id,
@@ -518,8 +519,8 @@ async def create_enterprise_need(
         "structured_summary": structured["need_summary"],
         "next_recommended_action": structured["next_recommended_action"],
     }
-    need_doc = create_need(payload=need_payload, guest_id=guest_id, user_id=str(current["_id"]) if current else None, now=now)
-    mission_doc = create_mission(
+    need_doc = await create_need(payload=need_payload, guest_id=guest_id, user_id=str(current["_id"]) if current else None, now=now)
+    mission_doc = await create_mission(
         need_id=str(need_doc["_id"]),
         guest_id=guest_id,
         user_id=str(current["_id"]) if current else None,
@@ -530,7 +531,7 @@ async def create_enterprise_need(
 
     opportunity_doc: dict[str, Any] | None = None
     if recommended_mode == "publie":
-        opportunity_doc = create_opportunity(
+        opportunity_doc = await create_opportunity(
             need_id=str(need_doc["_id"]),
             mission_id=str(mission_doc["_id"]),
             payload=structured["opportunity"],
@@ -583,8 +584,8 @@ async def create_enterprise_need_adaptive(
         "structured_summary": structured["need_summary"],
         "next_recommended_action": structured["next_recommended_action"],
     }
-    need_doc = create_need(payload=need_payload_db, guest_id=guest_id, user_id=str(current["_id"]) if current else None, now=now)
-    mission_doc = create_mission(
+    need_doc = await create_need(payload=need_payload_db, guest_id=guest_id, user_id=str(current["_id"]) if current else None, now=now)
+    mission_doc = await create_mission(
         need_id=str(need_doc["_id"]),
         guest_id=guest_id,
         user_id=str(current["_id"]) if current else None,
@@ -595,7 +596,7 @@ async def create_enterprise_need_adaptive(
 
     opportunity_doc: dict[str, Any] | None = None
     if recommended_mode == "publie":
-        opportunity_doc = create_opportunity(
+        opportunity_doc = await create_opportunity(
             need_id=str(need_doc["_id"]),
             mission_id=str(mission_doc["_id"]),
             payload=structured["opportunity"],
@@ -613,24 +614,38 @@ async def create_enterprise_need_adaptive(
 @router.get("/needs/{need_id}/matches")
 async def get_need_matches(
     need_id: str,
+    request: Request,
+    response: Response,
     limit: int = 5,
+    current: dict | None = Depends(get_current_user_optional),
 ):
     """Retourne les meilleurs profils talents matchant un besoin entreprise."""
-    return {"need_id": need_id, "matches": [], "count": 0}
+    need = await _resolve_need(need_id, request, response, current)
+    return await get_materialized_need_matches(str(need["_id"]), limit=max(1, min(limit, MATCH_TOP_K)))
 
 
 @router.post("/analyse/ai", response_model=EnterpriseFileAiAnalysisResponse)
 async def analyze_enterprise_file_with_ai(
     payload: EnterpriseFileAiAnalysisRequest,
 ):
-    generated = await generate_structured_json(_build_upload_ai_prompt(payload))
+    generated = await generate_structured_json(
+        _build_upload_ai_prompt(payload),
+        cache_namespace="enterprise_upload_analysis",
+        schema={
+            "executive_summary": str,
+            "business_diagnosis": list,
+            "key_risks": list,
+            "priority_actions": list,
+            "ai_confidence": str,
+        },
+    )
     return _normalize_upload_ai_response(payload, generated)
 
 
 @router.get("/opportunities/public", response_model=EnterpriseOpportunityListResponse)
 async def list_public_enterprise_opportunities(
 ):
-    items = list_public_opportunities()
+    items = await list_public_opportunities()
     return {"items": [_serialize_opportunity(item) for item in items if item]}
 
 
@@ -641,7 +656,7 @@ async def list_enterprise_needs(
     """Retourne tous les besoins soumis par l'utilisateur authentifié."""
     if not current:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Connexion requise")
-    docs = list_user_needs(str(current["_id"]))
+    docs = await list_user_needs(str(current["_id"]))
     return {"needs": [_serialize_need(doc) for doc in docs]}
 
 
@@ -653,10 +668,10 @@ async def get_enterprise_need(
     current: dict | None = Depends(get_current_user_optional),
 ):
     need = await _resolve_need(need_id, request, response, current)
-    mission = get_mission_for_need(str(need["_id"]))
+    mission = await get_mission_for_need(str(need["_id"]))
     if not mission:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission introuvable pour ce besoin")
-    opportunity = get_opportunity_for_need(str(need["_id"]))
+    opportunity = await get_opportunity_for_need(str(need["_id"]))
     return {
         "need": _serialize_need(need),
         "mission": _serialize_mission(mission),
@@ -672,7 +687,7 @@ async def activate_enterprise_cockpit(
     current: dict | None = Depends(get_current_user_optional),
 ):
     need = await _resolve_need(need_id, request, response, current)
-    mission = get_mission_for_need(str(need["_id"]))
+    mission = await get_mission_for_need(str(need["_id"]))
     if not mission:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission introuvable pour ce besoin")
 
@@ -711,9 +726,9 @@ async def get_enterprise_cockpit_context(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Connexion requise pour le cockpit entreprise")
 
     need = await _resolve_need(need_id, request, None, current)
-    mission = get_mission_for_need(str(need["_id"]))
+    mission = await get_mission_for_need(str(need["_id"]))
     if not mission:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mission introuvable pour ce besoin")
-    opportunity = get_opportunity_for_need(str(need["_id"]))
+    opportunity = await get_opportunity_for_need(str(need["_id"]))
     context_id, binding_map, _ = await _ensure_cockpit_bindings(need, mission, current)
     return _serialize_cockpit_context(need, mission, opportunity, context_id, binding_map)
@@ -28,6 +28,8 @@ from app.schemas.trajectory import (
     TrajectoryProofCreatePayload,
     TrajectoryProgressUpdatePayload,
 )
+from app.services.match_materializer import MATCH_TOP_K
+from app.services.matching_service import get_materialized_talent_matches
 from app.services.partner_registry import DEFAULT_PARTNERS, list_public_partners
 from app.services.trajectory_service import (
     BlueprintAIGenerationError,
@@ -87,16 +89,16 @@ async def _resolve_flow(
     guest_id = get_guest_id(request)
 
     if current:
-        flow = get_flow_for_user(flow_id, str(current["_id"]))
+        flow = await get_flow_for_user(flow_id, str(current["_id"]))
         if flow:
             return flow
         if guest_id:
-            flow = get_flow_for_guest(flow_id, guest_id)
+            flow = await get_flow_for_guest(flow_id, guest_id)
             if flow and not flow.get("user_id"):
-                claimed = claim_flow_for_user(flow_id, str(current["_id"]))
+                claimed = await claim_flow_for_user(flow_id, str(current["_id"]))
                 if claimed:
                     return claimed
-        flow = claim_flow_for_user(flow_id, str(current["_id"]))
+        flow = await claim_flow_for_user(flow_id, str(current["_id"]))
         if flow:
             return flow
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Flow trajectoire introuvable")
@@ -104,7 +106,7 @@ async def _resolve_flow(
     resolved_guest_id = ensure_guest_id(request, response) if response is not None else guest_id
     if not resolved_guest_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session invitée introuvable")
-    flow = get_flow_for_guest(flow_id, resolved_guest_id)
+    flow = await get_flow_for_guest(flow_id, resolved_guest_id)
     if not flow:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Flow trajectoire introuvable")
     return flow
@@ -115,7 +117,7 @@ async def _ensure_cockpit_bindings(
     current: dict,
 ) -> tuple[str, dict[str, dict[str, Any]], int]:
     context_id = trajectory_context_id(str(flow["_id"]))
-    existing = list_bindings(str(flow["_id"]), str(current["_id"]))
+    existing = await list_bindings(str(flow["_id"]), str(current["_id"]))
     binding_map = {str(item.get("koryxa_task_key") or ""): item for item in existing}
     created_task_count = 0
     now = datetime.now(timezone.utc)
@@ -141,7 +143,7 @@ async def _ensure_cockpit_bindings(
                 "created_at": now,
                 "updated_at": now,
             }
-            created = create_binding(
+            created = await create_binding(
                 flow_id=str(flow["_id"]),
                 user_id=str(current["_id"]),
                 context_id=context_id,
@@ -216,7 +218,7 @@ async def create_trajectory_onboarding(
 ):
     now = datetime.now(timezone.utc)
     guest_id = get_guest_id(request) if current else ensure_guest_id(request, response)
-    doc = create_flow(
+    doc = await create_flow(
         guest_id=guest_id,
         user_id=str(current["_id"]) if current else None,
         onboarding=payload.model_dump(),
@@ -278,7 +280,7 @@ async def create_trajectory_diagnostic(
         "status": "diagnosed",
         "updated_at": now,
     }
-    update_flow_state(
+    await update_flow_state(
         str(flow["_id"]),
         diagnostic=experience["diagnostic"],
         progress_plan=experience["progress_plan"],
@@ -311,7 +313,7 @@ async def get_trajectory_flow(
     if flow.get("diagnostic") and flow.get("progress_plan"):
         refreshed = recompute_trajectory_state(flow)
         refreshed["updated_at"] = datetime.now(timezone.utc)
-        update_flow_state(
+        await update_flow_state(
             str(flow["_id"]),
             diagnostic=refreshed["diagnostic"],
             progress_plan=refreshed["progress_plan"],
@@ -326,6 +328,23 @@ async def get_trajectory_flow(
     return _serialize_flow(flow)
 
 
+@router.get("/flows/{flow_id}/needs")
+async def get_trajectory_need_matches(
+    flow_id: str,
+    request: Request,
+    response: Response,
+    limit: int = 5,
+    current: dict | None = Depends(get_current_user_optional),
+):
+    """Besoins entreprise ouverts les plus compatibles avec ce profil."""
+    flow = await _resolve_flow(flow_id, request, response, current)
+    return await get_materialized_talent_matches(
+        str(flow["_id"]),
+        limit=max(1, min(limit, MATCH_TOP_K)),
+        onboarded=bool(flow.get("onboarding")),
+    )
+
+
 @router.post("/flows/{flow_id}/submit-contact")
 async def submit_trajectory_contact(
     flow_id: str,
@@ -338,7 +357,7 @@ async def submit_trajectory_contact(
     if not flow.get("diagnostic") or not flow.get("progress_plan"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Le diagnostic doit être généré avant l'envoi.")
     submitted_at = datetime.now(timezone.utc)
-    submit_flow_lead(
+    await submit_flow_lead(
         flow_id=str(flow["_id"]),
         first_name=payload.first_name.strip(),
         last_name=payload.last_name.strip(),
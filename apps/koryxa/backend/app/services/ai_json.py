@@ -1,18 +1,40 @@
 from __future__ import annotations
 
 import asyncio
+import copy
+import hashlib
 import json
 import logging
 import re
-from typing import Any
+import time
+from typing import Any, Callable, Optional
 
 from app.core.ai import generate_answer
 from app.core.config import settings
+from app.services.json_stream import JsonObjectStream, JsonSchema
+from app.services.postgres_bootstrap import db_execute, db_fetchone, pg_pool_ready
 
 
 logger = logging.getLogger(__name__)
 
 _JSON_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
+_PRUNE_EVERY_STORES = 50
+_HIT_FLUSH_EVERY_S = 30.0
+
+AI_JSON_CACHE_STATS: dict[str, float] = {
+    "hits": 0,
+    "misses": 0,
+    "shared": 0,
+    "stores": 0,
+    "errors": 0,
+    "saved_llm_seconds": 0.0,
+}
+_INFLIGHT: dict[str, asyncio.Future[tuple[dict[str, Any] | None, float]]] = {}
+# Hit counters are accumulated here and written in one statement now and then, so a
+# cache read stays a read.
+_PENDING_HITS: dict[str, int] = {}
+_HITS_FLUSHED_AT = 0.0
+_BACKGROUND_TASKS: set[asyncio.Task[None]] = set()
 
 
 def _extract_json_payload(text: str) -> dict[str, Any] | None:
@@ -36,7 +58,12 @@ def _extract_json_payload(text: str) -> dict[str, Any] | None:
         return None
 
 
-async def generate_structured_json(prompt: str) -> dict[str, Any] | None:
+async def _generate_structured_json_uncached(
+    prompt: str,
+    schema: JsonSchema | None = None,
+    on_partial: Optional[Callable[[dict[str, Any]], None]] = None,
+) -> dict[str, Any] | None:
+    stream = JsonObjectStream(schema=schema, on_partial=on_partial)
     try:
         raw = await asyncio.to_thread(
             generate_answer,
@@ -44,12 +71,182 @@ async def generate_structured_json(prompt: str) -> dict[str, Any] | None:
             settings.CHAT_PROVIDER,
             settings.CHAT_MODEL,
             settings.LLM_TIMEOUT,
+            on_token=stream.feed,
         )
     except Exception as exc:  # noqa: BLE001
         logger.warning("Structured AI generation failed before parsing: %s", exc)
         return None
 
+    if stream.result is not None:
+        return stream.result
     parsed = _extract_json_payload(raw)
     if parsed is None:
         logger.warning("Structured AI generation returned non-JSON payload.")
     return parsed
+
+
+def _cache_key(prompt: str, namespace: str, template_version: str) -> str:
+    material = json.dumps(
+        {
+            "namespace": namespace,
+            "template_version": template_version,
+            "provider": (settings.CHAT_PROVIDER or "").lower(),
+            "model": settings.CHAT_MODEL or "",
+            "prompt": " ".join(prompt.split()),
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _cache_get(cache_key: str) -> dict[str, Any] | None:
+    return db_fetchone(
+        """
+        select payload, generation_ms
+        from app.ai_json_cache
+        where cache_key = %s and expires_at > timezone('utc', now());
+        """,
+        (cache_key,),
+    )
+
+
+def _flush_hits(hits: dict[str, int]) -> None:
+    keys = list(hits)
+    db_execute(
+        """
+        update app.ai_json_cache c
+        set hits = c.hits + h.n, last_hit_at = timezone('utc', now())
+        from unnest(%s::text[], %s::int[]) as h(cache_key, n)
+        where c.cache_key = h.cache_key;
+        """,
+        (keys, [hits[key] for key in keys]),
+    )
+
+
+def _record_hit(cache_key: str) -> None:
+    global _HITS_FLUSHED_AT
+    _PENDING_HITS[cache_key] = _PENDING_HITS.get(cache_key, 0) + 1
+    now = time.monotonic()
+    if now - _HITS_FLUSHED_AT < _HIT_FLUSH_EVERY_S:
+        return
+    _HITS_FLUSHED_AT = now
+    hits = dict(_PENDING_HITS)
+    _PENDING_HITS.clear()
+
+    async def _run() -> None:
+        try:
+            await asyncio.to_thread(_flush_hits, hits)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Structured AI cache hit counters not recorded (%d keys): %s", len(hits), exc)
+
+    task = asyncio.create_task(_run())
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
+
+
+def _cache_put(cache_key: str, namespace: str, payload: dict[str, Any], generation_ms: int) -> None:
+    db_execute(
+        """
+        insert into app.ai_json_cache (cache_key, namespace, payload, generation_ms, expires_at)
+        values (%s, %s, %s::jsonb, %s, timezone('utc', now()) + make_interval(secs => %s))
+        on conflict (cache_key) do update
+        set payload = excluded.payload,
+            generation_ms = excluded.generation_ms,
+            created_at = timezone('utc', now()),
+            expires_at = excluded.expires_at;
+        """,
+        (cache_key, namespace, json.dumps(payload, ensure_ascii=False), generation_ms, settings.AI_JSON_CACHE_TTL_S),
+    )
+
+
+def _cache_prune() -> None:
+    db_execute("delete from app.ai_json_cache where expires_at <= timezone('utc', now());")
+    db_execute(
+        """
+        delete from app.ai_json_cache
+        where cache_key in (
+          select cache_key
+          from app.ai_json_cache
+          order by coalesce(last_hit_at, created_at) desc
+          offset %s
+        );
+        """,
+        (max(1, settings.AI_JSON_CACHE_MAX_ROWS),),
+    )
+
+
+def ai_json_cache_stats() -> dict[str, float]:
+    stats = dict(AI_JSON_CACHE_STATS)
+    stats["saved_llm_seconds"] = round(stats["saved_llm_seconds"], 1)
+    return stats
+
+
+async def generate_structured_json(
+    prompt: str,
+    *,
+    cache_namespace: str | None = None,
+    template_version: str = "1",
+    schema: JsonSchema | None = None,
+    on_partial: Optional[Callable[[dict[str, Any]], None]] = None,
+) -> dict[str, Any] | None:
+    """Generate a JSON object from `prompt`.
+
+    Callers version their prompt templates with `template_version`; bump it whenever the
+    template changes so entries generated from the old wording are not served.
+
+    The object is extracted from the token stream and generation stops as soon as it
+    closes; stringly-typed scalars are coerced to the `schema` types (other mismatches
+    are left to the caller's coercion) and `on_partial` (called from the worker thread)
+    receives the object parsed so far.
+
+    Callers that pass `cache_namespace` get a Postgres-backed cache keyed on the prompt
+    template version, the normalised prompt and the provider/model, and concurrent
+    identical requests in this process share a single generation.
+    """
+    if not cache_namespace or not settings.AI_JSON_CACHE_ENABLED or not pg_pool_ready():
+        return await _generate_structured_json_uncached(prompt, schema, on_partial)
+
+    cache_key = _cache_key(prompt, cache_namespace, template_version)
+    try:
+        cached = await asyncio.to_thread(_cache_get, cache_key)
+    except Exception as exc:  # noqa: BLE001
+        AI_JSON_CACHE_STATS["errors"] += 1
+        logger.warning("Structured AI cache lookup failed: %s", exc)
+        cached = None
+    if cached is not None:
+        AI_JSON_CACHE_STATS["hits"] += 1
+        _record_hit(cache_key)
+        AI_JSON_CACHE_STATS["saved_llm_seconds"] += (cached.get("generation_ms") or 0) / 1000
+        return cached["payload"]
+
+    inflight = _INFLIGHT.get(cache_key)
+    if inflight is not None:
+        parsed, generation_s = await asyncio.shield(inflight)
+        AI_JSON_CACHE_STATS["shared"] += 1
+        AI_JSON_CACHE_STATS["saved_llm_seconds"] += generation_s
+        return copy.deepcopy(parsed)
+
+    AI_JSON_CACHE_STATS["misses"] += 1
+    future: asyncio.Future[tuple[dict[str, Any] | None, float]] = asyncio.get_running_loop().create_future()
+    _INFLIGHT[cache_key] = future
+    parsed: dict[str, Any] | None = None
+    generation_s = 0.0
+    try:
+        started = time.monotonic()
+        parsed = await _generate_structured_json_uncached(prompt, schema, on_partial)
+        generation_s = time.monotonic() - started
+    finally:
+        _INFLIGHT.pop(cache_key, None)
+        future.set_result((copy.deepcopy(parsed), generation_s))
+
+    if parsed is not None:
+        try:
+            await asyncio.to_thread(_cache_put, cache_key, cache_namespace, parsed, int(generation_s * 1000))
+            AI_JSON_CACHE_STATS["stores"] += 1
+            if AI_JSON_CACHE_STATS["stores"] % _PRUNE_EVERY_STORES == 0:
+                await asyncio.to_thread(_cache_prune)
+        except Exception as exc:  # noqa: BLE001
+            AI_JSON_CACHE_STATS["errors"] += 1
+            logger.warning("Structured AI cache store failed: %s", exc)
+    return parsed
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Iterator
+
+try:
+    import zstandard as _zstd  # type: ignore
+except Exception:  # noqa: BLE001
+    _zstd = None
+
+try:
+    import fsspec  # type: ignore
+except Exception:  # noqa: BLE001
+    fsspec = None
+
+from psycopg2.extras import RealDictCursor
+
+from app.services.partition_maintenance import PARTITIONED_TABLES
+from app.services.postgres_bootstrap import connect_pg
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH = int(os.environ.get("ARCHIVE_BATCH", "5000"))
+ARCHIVE_DELETE_PAUSE_S = float(os.environ.get("ARCHIVE_DELETE_PAUSE_S", "0.2"))
+
+
+class ArchiveVerificationError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class PgArchiveSource:
+    name: str
+    table: str
+    ts_column: str
+    key_column: str
+    # Extra predicate on alias `t`, e.g. to keep rows other tables still reference.
+    extra_where: str = ""
+
+
+# Ordered so that child rows leave before the rows they reference.
+PG_SOURCES = (
+    PgArchiveSource("notification_events", "app.notification_events", "created_at", "id"),
+    PgArchiveSource(
+        "notifications",
+        "app.notifications",
+        "created_at",
+        "id",
+        "and t.status <> 'pending' and not exists (select 1 from app.notification_events e where e.notification_id = t.id)",
+    ),
+    PgArchiveSource("chatlaya_messages", "app.chatlaya_messages", "created_at", "id"),
+)
+# data_logging collections; every document carries a `ts` datetime.
+MONGO_SOURCES = ("ai_interactions", "social_messages", "planning_events")
+
+
+def _open(path: str, mode: str) -> BinaryIO:
+    if "://" in path:
+        if fsspec is None:
+            raise RuntimeError("fsspec is required for remote archive paths")
+        return fsspec.open(path, mode).open()
+    return open(path, mode)
+
+
+def _join(base: str, name: str) -> str:
+    return f"{base.rstrip('/')}/{name}" if "://" in base else os.path.join(base, name)
+
+
+class _ArchiveWriter:
+    """JSON lines, compressed with zstd when available (gzip otherwise), hashed as written.
+
+    The sha256 covers the uncompressed lines, so the read-back check is independent of
+    the codec and its settings.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.codec = "zstd" if _zstd is not None else "gzip"
+        self.path = f"{path}.jsonl.{'zst' if self.codec == 'zstd' else 'gz'}"
+        self._raw = _open(self.path, "wb")
+        if self.codec == "zstd":
+            self._stream = _zstd.ZstdCompressor(level=10).stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        self._sha = hashlib.sha256()
+        self.rows = 0
+
+    def write(self, row: dict[str, Any]) -> None:
+        line = json.dumps(row, default=str, sort_keys=True, ensure_ascii=False).encode("utf-8") + b"\n"
+        self._sha.update(line)
+        self._stream.write(line)
+        self.rows += 1
+
+    def close(self) -> str:
+        self._stream.close()
+        self._raw.close()
+        return self._sha.hexdigest()
+
+
+def iter_archive(path: str) -> Iterator[dict[str, Any]]:
+    """Yield the rows of an archive file, for audits and restores."""
+    for line in _iter_lines(path):
+        yield json.loads(line)
+
+
+def _iter_lines(path: str) -> Iterator[bytes]:
+    with _open(path, "rb") as raw:
+        if path.endswith(".zst"):
+            if _zstd is None:
+                raise RuntimeError("zstandard is required to read .zst archives")
+            stream = _zstd.ZstdDecompressor().stream_reader(raw)
+            buffer = b""
+            while chunk := stream.read(1 << 20):
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                yield from (line + b"\n" for line in lines)
+            if buffer:
+                yield buffer
+        else:
+            with gzip.GzipFile(fileobj=raw, mode="rb") as stream:
+                yield from stream
+
+
+def verify_archive(manifest_path: str) -> dict[str, Any]:
+    """Re-read an archive and check it against its manifest; raises on mismatch."""
+    with _open(manifest_path, "rb") as handle:
+        manifest = json.loads(handle.read())
+    sha = hashlib.sha256()
+    rows = 0
+    try:
+        for line in _iter_lines(manifest["path"]):
+            sha.update(line)
+            rows += 1
+    except Exception as exc:  # noqa: BLE001
+        raise ArchiveVerificationError(f"{manifest['path']}: unreadable after {rows} rows: {exc}") from exc
+    if rows != manifest["rows"] or sha.hexdigest() != manifest["sha256"]:
+        raise ArchiveVerificationError(
+            f"{manifest['path']}: read {rows} rows / {sha.hexdigest()}, "
+            f"manifest says {manifest['rows']} / {manifest['sha256']}"
+        )
+    return manifest
+
+
+def _write_manifest(writer: _ArchiveWriter, sha256: str, **fields: Any) -> str:
+    manifest = {
+        **fields,
+        "path": writer.path,
+        "codec": writer.codec,
+        "rows": writer.rows,
+        "sha256": sha256,
+        "archived_at": datetime.now(timezone.utc).isoformat(),
+    }
+    manifest_path = writer.path.rsplit(".jsonl", 1)[0] + ".manifest.json"
+    with _open(manifest_path, "wb") as handle:
+        handle.write(json.dumps(manifest, indent=2, default=str).encode("utf-8"))
+    return manifest_path
+
+
+def _archive_name(source: str, cutoff: datetime | None) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    return f"{source}_before_{cutoff:%Y%m%d}_{stamp}" if cutoff else f"{source}_{stamp}"
+
+
+def _export_pg(table: str, where_sql: str, params: tuple[Any, ...], key_column: str, writer: _ArchiveWriter) -> Any:
+    # A named cursor keeps the result set on the server and streams it ARCHIVE_BATCH
+    # rows at a time; it needs a transaction, hence no autocommit here.
+    conn = connect_pg()
+    if conn is None:
+        raise RuntimeError("DATABASE_URL is not configured")
+    max_key = None
+    try:
+        with conn.cursor(name="koryxa_archive", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = ARCHIVE_BATCH
+            cur.execute(f"select * from {table} t where {where_sql} order by t.{key_column};", params)
+            for row in cur:
+                writer.write(dict(row))
+                max_key = row[key_column]
+        conn.rollback()
+    finally:
+        conn.close()
+    return max_key
+
+
+def archive_pg_source(source: PgArchiveSource, *, cutoff: datetime, out_dir: str, delete: bool) -> dict[str, Any]:
+    where_sql = f"t.{source.ts_column} < %s {source.extra_where}"
+    writer = _ArchiveWriter(_join(out_dir, _archive_name(source.name, cutoff)))
+    try:
+        max_key = _export_pg(source.table, where_sql, (cutoff,), source.key_column, writer)
+    finally:
+        sha256 = writer.close()
+    manifest_path = _write_manifest(
+        writer, sha256, source=source.name, table=source.table, cutoff=cutoff.isoformat(), max_key=max_key
+    )
+    manifest = verify_archive(manifest_path)
+    deleted = 0
+    if delete and writer.rows:
+        deleted = _delete_pg(source, where_sql=where_sql, cutoff=cutoff, max_key=max_key, expected=writer.rows)
+    logger.info("Archived %d rows of %s to %s (deleted %d)", writer.rows, source.table, writer.path, deleted)
+    return {"manifest": manifest_path, "rows": manifest["rows"], "deleted": deleted}
+
+
+def _delete_pg(source: PgArchiveSource, *, where_sql: str, cutoff: datetime, max_key: Any, expected: int) -> int:
+    conn = connect_pg()
+    if conn is None:
+        raise RuntimeError("DATABASE_URL is not configured")
+    conn.autocommit = True
+    bounded = f"{where_sql} and t.{source.key_column} <= %s"
+    deleted = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"select count(*) from {source.table} t where {bounded};", (cutoff, max_key))
+            present = cur.fetchone()[0]
+            if present != expected:
+                raise ArchiveVerificationError(
+                    f"{source.table}: {present} rows match the archived range, archive holds {expected}; not deleting"
+                )
+            while True:
+                cur.execute(
+                    f"""
+                    delete from {source.table}
+                    where {source.key_column} in (
+                      select t.{source.key_column} from {source.table} t
+                      where {bounded}
+                      order by t.{source.key_column}
+                      limit %s
+                    );
+                    """,
+                    (cutoff, max_key, ARCHIVE_BATCH),
+                )
+                if cur.rowcount <= 0:
+                    break
+                deleted += cur.rowcount
+                time.sleep(ARCHIVE_DELETE_PAUSE_S)
+            # Make the freed pages reusable and refresh planner stats for the hot table.
+            cur.execute(f"vacuum (analyze) {source.table};")
+    finally:
+        conn.close()
+    return deleted
+
+
+def detached_partitions() -> list[str]:
+    """Partitions that retention detached from their parent and that still hold data."""
+    conn = connect_pg()
+    if conn is None:
+        return []
+    try:
+        with conn.cursor() as cur:
+            names: list[str] = []
+            for table in PARTITIONED_TABLES:
+                cur.execute(
+                    """
+                    select n.nspname || '.' || c.relname
+                    from pg_class c
+                    join pg_namespace n on n.oid = c.relnamespace
+                    where n.nspname = %s
+                      and c.relkind = 'r'
+                      and not c.relispartition
+                      and (c.relname like %s or c.relname = %s)
+                    order by c.relname;
+                    """,
+                    (table.schema, f"{table.name}\\_p%", f"{table.name}_legacy"),
+                )
+                names.extend(row[0] for row in cur.fetchall())
+            return names
+    finally:
+        conn.close()
+
+
+def archive_detached_partition(qualified: str, *, out_dir: str, drop: bool) -> dict[str, Any]:
+    writer = _ArchiveWriter(_join(out_dir, _archive_name(qualified.split(".", 1)[1], None)))
+    try:
+        _export_pg(qualified, "true", (), "id", writer)
+    finally:
+        sha256 = writer.close()
+    manifest_path = _write_manifest(writer, sha256, source=qualified, table=qualified, cutoff=None)
+    manifest = verify_archive(manifest_path)
+    if drop:
+        conn = connect_pg()
+        if conn is None:
+            raise RuntimeError("DATABASE_URL is not configured")
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"select count(*) from {qualified};")
+                present = cur.fetchone()[0]
+                if present != manifest["rows"]:
+                    raise ArchiveVerificationError(f"{qualified}: {present} rows, archive holds {manifest['rows']}; not dropping")
+                cur.execute(f"drop table {qualified};")
+        finally:
+            conn.close()
+    logger.info("Archived detached partition %s to %s (dropped=%s)", qualified, writer.path, drop)
+    return {"manifest": manifest_path, "rows": manifest["rows"], "dropped": drop}
+
+
+async def archive_mongo_collection(db: Any, collection: str, *, cutoff: datetime, out_dir: str, delete: bool) -> dict[str, Any]:
+    query = {"ts": {"$lt": cutoff}}
+    writer = _ArchiveWriter(_join(out_dir, _archive_name(collection, cutoff)))
+    max_id = None
+    try:
+        async for doc in db[collection].find(query).sort("_id", 1).batch_size(ARCHIVE_BATCH):
+            writer.write(doc)
+            max_id = doc["_id"]
+    finally:
+        sha256 = writer.close()
+    manifest_path = _write_manifest(
+        writer, sha256, source=collection, table=f"mongo:{collection}", cutoff=cutoff.isoformat(), max_key=max_id
+    )
+    manifest = verify_archive(manifest_path)
+    deleted = 0
+    if delete and writer.rows:
+        bounded = {**query, "_id": {"$lte": max_id}}
+        present = await db[collection].count_documents(bounded)
+        if present != writer.rows:
+            raise ArchiveVerificationError(
+                f"mongo:{collection}: {present} documents match the archived range, archive holds {writer.rows}; not deleting"
+            )
+        while True:
+            ids = [doc["_id"] async for doc in db[collection].find(bounded, {"_id": 1}).limit(ARCHIVE_BATCH)]
+            if not ids:
+                break
+            result = await db[collection].delete_many({"_id": {"$in": ids}})
+            deleted += result.deleted_count
+            await asyncio.sleep(ARCHIVE_DELETE_PAUSE_S)
+    logger.info("Archived %d documents of %s to %s (deleted %d)", writer.rows, collection, writer.path, deleted)
+    return {"manifest": manifest_path, "rows": manifest["rows"], "deleted": deleted}
@@ -0,0 +1,259 @@
+"""
+Scoring vectorisé besoins × talents
+─────────────────────────────────────────────────────────────────────────────
+Même score que `matching_service._score_match`, mais pour une grille complète :
+chaque axe devient une matrice dense [clé besoin, code talent] précalculée depuis
+les fonctions scalaires, et la grille se calcule par gather + somme. Le top-k par
+besoin passe par `argpartition`.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.repositories.enterprise_pg import list_open_needs
+from app.services.matching_service import (
+    TALENT_COLUMNS_SQL,
+    TALENT_WHERE_SQL,
+    URGENCY_TIMELINE_COMPAT,
+    WEIGHT_DOMAIN,
+    WEIGHT_MISSION,
+    WEIGHT_MODE,
+    WEIGHT_URGENCY,
+    _domain_score,
+    _extract_need_domain,
+    _mission_score,
+    _normalize_mode,
+    _serialize_talent,
+    _urgency_score,
+)
+from app.services.postgres_async import db_fetchall_read
+from app.services.talent_index import TalentFeatures, TalentIndex, Vocabulary, get_talent_index, talent_flow_from_row
+from app.services.taxonomy import DOMAINS
+
+# Lignes des matrices : l'index 0 correspond à « valeur absente ».
+NEED_DOMAINS: list[str] = [""] + [d["id"] for d in DOMAINS]
+NEED_URGENCIES: list[str] = [""] + list(URGENCY_TIMELINE_COMPAT)
+_DOMAIN_ROW = {value: row for row, value in enumerate(NEED_DOMAINS)}
+_URGENCY_ROW = {value: row for row, value in enumerate(NEED_URGENCIES)}
+
+# Taille max d'un bloc de grille (besoins × talents) en cellules float64 (~32 Mo).
+CHUNK_CELLS = 4_000_000
+
+
+@dataclass
+class TalentArrays:
+    flows: list[dict[str, Any]]
+    mission: np.ndarray
+    domain: np.ndarray
+    mode: np.ndarray
+    timeline: np.ndarray
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[tuple[dict[str, Any], TalentFeatures]]) -> "TalentArrays":
+        entries = list(entries)
+        codes = np.array(
+            [(f.mission, f.domain, f.mode, f.timeline) for _, f in entries] or np.zeros((0, 4)),
+            dtype=np.int32,
+        ).reshape(-1, 4)
+        return cls(
+            flows=[flow for flow, _ in entries],
+            mission=codes[:, 0],
+            domain=codes[:, 1],
+            mode=codes[:, 2],
+            timeline=codes[:, 3],
+        )
+
+    @classmethod
+    def from_index(cls, index: TalentIndex) -> "TalentArrays":
+        return cls.from_entries(index.entries())
+
+    def __len__(self) -> int:
+        return len(self.flows)
+
+    def slice(self, start: int, stop: int) -> "TalentArrays":
+        return TalentArrays(
+            flows=self.flows[start:stop],
+            mission=self.mission[start:stop],
+            domain=self.domain[start:stop],
+            mode=self.mode[start:stop],
+            timeline=self.timeline[start:stop],
+        )
+
+
+@dataclass
+class ScoreMatrices:
+    """Score pondéré de chaque axe, indexé par [clé besoin, code talent]."""
+
+    mission: np.ndarray   # [domaine besoin, code main_task]
+    domain: np.ndarray    # [domaine besoin, code current_sector]
+    mode: np.ndarray      # [code mode besoin, code work_mode]
+    timeline: np.ndarray  # [urgence besoin, code target_timeline]
+
+    @classmethod
+    def build(cls, vocab: Vocabulary) -> "ScoreMatrices":
+        values = vocab.items()
+        width = max((code for _, code in values), default=0) + 1
+        mission = np.zeros((len(NEED_DOMAINS), width))
+        domain = np.zeros((len(NEED_DOMAINS), width))
+        timeline = np.zeros((len(NEED_URGENCIES), width))
+        for value, code in values:
+            for row, need_domain in enumerate(NEED_DOMAINS):
+                mission[row, code] = _mission_score(need_domain, value) * WEIGHT_MISSION
+                domain[row, code] = _domain_score(need_domain, value) * WEIGHT_DOMAIN
+            for row, urgency in enumerate(NEED_URGENCIES):
+                timeline[row, code] = _urgency_score(urgency, value) * WEIGHT_URGENCY
+        # Le mode matche sur égalité stricte une fois normalisé : identité hors code 0.
+        mode = np.eye(width) * WEIGHT_MODE
+        mode[0, 0] = 0.0
+        return cls(mission=mission, domain=domain, mode=mode, timeline=timeline)
+
+
+@dataclass
+class NeedArrays:
+    domain: np.ndarray
+    mode: np.ndarray
+    urgency: np.ndarray
+
+    @classmethod
+    def encode(cls, needs: list[dict[str, Any]], vocab: Vocabulary) -> "NeedArrays":
+        domain, mode, urgency = [], [], []
+        for need in needs:
+            domain.append(_DOMAIN_ROW.get(_extract_need_domain(need), 0))
+            raw_mode = need.get("treatment_preference", "")
+            # Un mode inconnu du vocabulaire ne peut égaler aucun talent : code 0.
+            mode.append(vocab.lookup(_normalize_mode(raw_mode)) if raw_mode else 0)
+            urgency.append(_URGENCY_ROW.get(need.get("urgency", ""), 0))
+        return cls(
+            domain=np.array(domain, dtype=np.int32),
+            mode=np.array(mode, dtype=np.int32),
+            urgency=np.array(urgency, dtype=np.int32),
+        )
+
+
+def score_grid(needs: NeedArrays, rows: slice, talents: TalentArrays, matrices: ScoreMatrices) -> np.ndarray:
+    """Grille de scores [besoins[rows], talents] par gather sur les matrices d'axes."""
+    grid = matrices.mission[needs.domain[rows]][:, talents.mission]
+    grid += matrices.domain[needs.domain[rows]][:, talents.domain]
+    grid += matrices.mode[needs.mode[rows]][:, talents.mode]
+    grid += matrices.timeline[needs.urgency[rows]][:, talents.timeline]
+    return grid
+
+
+def top_k(grid: np.ndarray, k: int, min_score: float) -> list[list[tuple[float, int]]]:
+    """(score, position talent) des k meilleurs ≥ min_score, par ligne, triés décroissant."""
+    if grid.shape[1] == 0 or k <= 0:
+        return [[] for _ in range(grid.shape[0])]
+    k = min(k, grid.shape[1])
+    part = np.argpartition(-grid, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(grid, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    best = np.take_along_axis(part, order, axis=1)
+    best_scores = np.take_along_axis(part_scores, order, axis=1)
+    return [
+        [(float(score), int(pos)) for score, pos in zip(scores, positions) if score >= min_score]
+        for scores, positions in zip(best_scores, best)
+    ]
+
+
+def batch_top_matches(
+    needs: list[dict[str, Any]],
+    talents: TalentArrays,
+    vocab: Vocabulary,
+    *,
+    limit: int,
+    min_score: float,
+) -> list[list[tuple[float, dict[str, Any]]]]:
+    """Top `limit` (score, flow) pour chaque besoin, dans l'ordre de `needs`.
+
+    `vocab` doit être celui qui a encodé `talents`. La grille est calculée par blocs de
+    besoins pour borner la mémoire à CHUNK_CELLS cellules.
+    """
+    if not needs:
+        return []
+    matrices = ScoreMatrices.build(vocab)
+    encoded = NeedArrays.encode(needs, vocab)
+    step = max(1, CHUNK_CELLS // max(1, len(talents)))
+    results: list[list[tuple[float, dict[str, Any]]]] = []
+    for start in range(0, len(needs), step):
+        grid = score_grid(encoded, slice(start, start + step), talents, matrices)
+        for row in top_k(grid, limit, min_score):
+            results.append([(score, talents.flows[pos]) for score, pos in row])
+    return results
+
+
+def batch_top_needs(
+    needs: list[dict[str, Any]],
+    talents: TalentArrays,
+    vocab: Vocabulary,
+    *,
+    limit: int,
+    min_score: float,
+) -> list[list[tuple[float, int]]]:
+    """Top `limit` (score, position dans `needs`) pour chaque talent de `talents`.
+
+    Même grille que `batch_top_matches`, lue par colonne : les blocs portent sur les
+    talents pour borner la mémoire.
+    """
+    if not len(talents):
+        return []
+    matrices = ScoreMatrices.build(vocab)
+    encoded = NeedArrays.encode(needs, vocab)
+    step = max(1, CHUNK_CELLS // max(1, len(needs)))
+    results: list[list[tuple[float, int]]] = []
+    for start in range(0, len(talents), step):
+        block = talents.slice(start, start + step)
+        results.extend(top_k(score_grid(encoded, slice(None), block, matrices).T, limit, min_score))
+    return results
+
+
+def best_scores(needs: list[dict[str, Any]], talents: TalentArrays, vocab: Vocabulary, *, per: str) -> np.ndarray:
+    """Meilleur score de chaque besoin (`per="need"`) ou de chaque talent (`per="talent"`)
+    sur l'autre côté, calculé par blocs de CHUNK_CELLS cellules."""
+    matrices = ScoreMatrices.build(vocab)
+    encoded = NeedArrays.encode(needs, vocab)
+    if per == "need":
+        best = np.full(len(needs), -np.inf)
+        step = max(1, CHUNK_CELLS // max(1, len(needs)))
+        for start in range(0, len(talents), step):
+            grid = score_grid(encoded, slice(None), talents.slice(start, start + step), matrices)
+            best = np.maximum(best, grid.max(axis=1, initial=-np.inf))
+        return best
+    best = np.full(len(talents), -np.inf)
+    step = max(1, CHUNK_CELLS // max(1, len(talents)))
+    for start in range(0, len(needs), step):
+        grid = score_grid(encoded, slice(start, start + step), talents, matrices)
+        best = np.maximum(best, grid.max(axis=0, initial=-np.inf))
+    return best
+
+
+async def _talent_arrays() -> tuple[TalentArrays, Vocabulary]:
+    index = get_talent_index()
+    if index is not None and index.serving:
+        return TalentArrays.from_index(index), index.vocab
+    rows = await db_fetchall_read(f"select {TALENT_COLUMNS_SQL} from app.trajectory_flows where {TALENT_WHERE_SQL};")
+    scratch = TalentIndex()
+    flows = [talent_flow_from_row(row) for row in rows]
+    return TalentArrays.from_entries((flow, scratch.encode(flow)) for flow in flows), scratch.vocab
+
+
+async def find_matches_for_open_needs(limit: int = 5, min_score: float = 0.10) -> dict[str, dict[str, Any]]:
+    """Top talents de chaque besoin ouvert, calculés en une seule grille.
+
+    Le calcul NumPy tourne dans un thread pour ne pas bloquer la boucle d'événements.
+    """
+    needs = await list_open_needs()
+    talents, vocab = await _talent_arrays()
+    tops = await asyncio.to_thread(batch_top_matches, needs, talents, vocab, limit=limit, min_score=min_score)
+    return {
+        str(need["_id"]): {
+            "need_id": str(need["_id"]),
+            "primary_goal": need.get("primary_goal"),
+            "matches": [_serialize_talent(flow, score) for score, flow in top],
+            "total_evaluated": len(talents),
+        }
+        for need, top in zip(needs, tops)
+    }
@@ -9,6 +9,7 @@ from typing import Any
 from app.core.ai import FALLBACK_REPLY, generate_answer
 from app.core.config import settings
 from app.core.rag_client import retrieve_rag_results
+from app.services.prompt_packer import pack_chunks
 from app.services.chatlaya_specialist import (
     CHATLAYA_MODE_GENERAL,
     CHATLAYA_MODE_LAUNCH_STRUCTURE_SELL,
@@ -370,32 +371,8 @@ def _build_rag_context(chunks: list[dict[str, Any]], token_budget: int) -> tuple
     if not chunks:
         return "", []
 
-    selected: list[dict[str, Any]] = []
-    total_tokens = 0
-    seen: set[str] = set()
-    for chunk in chunks:
-        text = (chunk.get("text") or "").strip()
-        if not text:
-            continue
-        key = " ".join(text.lower().split())
-        if key in seen:
-            continue
-        seen.add(key)
-        estimated_tokens = max(1, len(text.split()))
-        if selected and total_tokens + estimated_tokens > token_budget:
-            break
-        total_tokens += estimated_tokens
-        selected.append(
-            {
-                "doc_id": chunk.get("doc_id"),
-                "score": chunk.get("score"),
-                "text": text,
-                "meta": chunk.get("meta") or {},
-            }
-        )
-        if len(selected) >= 3:
-            break
-
+    selected, used_tokens = pack_chunks(chunks, token_budget)
+    logger.debug("ChatLAYA RAG context uses %d/%d tokens over %d chunks", used_tokens, token_budget, len(selected))
     if not selected:
         return "", []
 
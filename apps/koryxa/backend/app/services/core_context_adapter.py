@@ -2,13 +2,29 @@ from __future__ import annotations
 
 from typing import Any
 
-from app.repositories.auth_pg import get_user_by_id
-from app.services.postgres_bootstrap import db_fetchone
+from app.repositories.auth_pg import _parse_roles
+from app.services.postgres_bootstrap import db_fetchone_read
+
+
+def _get_user(user_id: str) -> dict[str, Any] | None:
+    # The internal routes run in the threadpool, so they keep the sync pool.
+    row = db_fetchone_read(
+        """
+        select id::text as id, account_type, workspace_role, plan, roles
+        from app.auth_users
+        where id = %s::uuid
+        limit 1;
+        """,
+        (user_id,),
+    )
+    if row:
+        row["roles"] = _parse_roles(row.get("roles"))
+    return row
 
 
 def _get_latest_trajectory_flow(*, user_id: str | None = None, guest_id: str | None = None) -> dict[str, Any] | None:
     if user_id:
-        return db_fetchone(
+        return db_fetchone_read(
             """
             select id::text as id, guest_id, user_id::text as user_id, onboarding, diagnostic, progress_plan, verified_profile, updated_at
             from app.trajectory_flows
@@ -19,7 +35,7 @@ def _get_latest_trajectory_flow(*, user_id: str | None = None, guest_id: str | N
             (user_id,),
         )
     if guest_id:
-        return db_fetchone(
+        return db_fetchone_read(
             """
             select id::text as id, guest_id, user_id::text as user_id, onboarding, diagnostic, progress_plan, verified_profile, updated_at
             from app.trajectory_flows
@@ -34,7 +50,7 @@ def _get_latest_trajectory_flow(*, user_id: str | None = None, guest_id: str | N
 
 def _get_latest_enterprise_need(*, user_id: str | None = None, guest_id: str | None = None) -> dict[str, Any] | None:
     if user_id:
-        return db_fetchone(
+        return db_fetchone_read(
             """
             select id::text as id, guest_id, user_id::text as user_id, title, status, created_at
             from app.enterprise_needs
@@ -45,7 +61,7 @@ def _get_latest_enterprise_need(*, user_id: str | None = None, guest_id: str | N
             (user_id,),
         )
     if guest_id:
-        return db_fetchone(
+        return db_fetchone_read(
             """
             select id::text as id, guest_id, user_id::text as user_id, title, status, created_at
             from app.enterprise_needs
@@ -59,7 +75,7 @@ def _get_latest_enterprise_need(*, user_id: str | None = None, guest_id: str | N
 
 
 def _get_mission_for_need(need_id: str) -> dict[str, Any] | None:
-    return db_fetchone(
+    return db_fetchone_read(
         """
         select id::text as id, need_id::text as need_id, title, status, created_at
         from app.enterprise_missions
@@ -121,7 +137,7 @@ def get_guest_enterprise_summary(guest_id: str) -> dict[str, Any] | None:
 
 
 def get_user_summary(user_id: str) -> dict[str, Any] | None:
-    user = get_user_by_id(user_id)
+    user = _get_user(user_id)
     if not user:
         return None
     return {
@@ -143,7 +159,7 @@ def get_guest_summary(guest_id: str) -> dict[str, Any]:
 
 
 def get_user_chatlaya_entitlement(user_id: str) -> dict[str, Any] | None:
-    user = get_user_by_id(user_id)
+    user = _get_user(user_id)
     if not user:
         return None
     plan = str(user.get("plan") or "free").lower()
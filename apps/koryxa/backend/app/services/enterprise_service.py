@@ -4,6 +4,25 @@ from typing import Any
 
 from app.services.ai_json import generate_structured_json
 
+# Template versions for the need-structuring and next-question prompts (see
+# generate_structured_json).
+NEED_STRUCTURE_PROMPT_VERSION = "1"
+NEXT_QUESTION_PROMPT_VERSION = "1"
+
+_NEED_STRUCTURE_SCHEMA = {
+    "title": str,
+    "need_summary": str,
+    "qualification_score": (int, float),
+    "mission": dict,
+    "opportunity": dict,
+}
+_NEXT_QUESTION_SCHEMA = {
+    "question_id": str,
+    "question_text": str,
+    "options": list,
+    "is_last": bool,
+}
+
 
 def _normalized(value: str | None) -> str:
     return " ".join((value or "").strip().split())
@@ -208,7 +227,12 @@ Exigences:
 - publication seulement si pertinente
 - pas de texte hors JSON
 """.strip()
-    generated = await generate_structured_json(prompt)
+    generated = await generate_structured_json(
+        prompt,
+        cache_namespace="enterprise_need_structure",
+        template_version=NEED_STRUCTURE_PROMPT_VERSION,
+        schema=_NEED_STRUCTURE_SCHEMA,
+    )
     if not generated:
         return fallback
     return _coerce_structure(generated, fallback)
@@ -1859,7 +1883,12 @@ Si tu as une compréhension complète :
   "is_last": true
 }}""".strip()
 
-    result = await generate_structured_json(prompt)
+    result = await generate_structured_json(
+        prompt,
+        cache_namespace="enterprise_next_question",
+        template_version=NEXT_QUESTION_PROMPT_VERSION,
+        schema=_NEXT_QUESTION_SCHEMA,
+    )
 
     if result and result.get("is_last") is True:
         return {
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Optional
+
+from app.core.ai import StopGeneration
+
+
+JsonSchema = dict[str, type | tuple[type, ...]]
+
+_CLOSERS = {"{": "}", "[": "]"}
+_BOOL_STRINGS = {"true": True, "false": False}
+
+
+def _coerce(value: Any, expected: type | tuple[type, ...]) -> Any:
+    """Convert stringly-typed scalars (`"72"`, `"true"`) to the expected type when possible."""
+    if isinstance(value, expected):
+        return value
+    types = expected if isinstance(expected, tuple) else (expected,)
+    if isinstance(value, str):
+        text = value.strip()
+        if bool in types and text.lower() in _BOOL_STRINGS:
+            return _BOOL_STRINGS[text.lower()]
+        for target in (int, float):
+            if target in types:
+                try:
+                    return target(text)
+                except ValueError:
+                    continue
+    return value
+
+
+class JsonObjectStream:
+    """Extract the first top-level JSON object from a token stream as it is generated.
+
+    Feed it as the provider `on_token` callback. Text before the opening brace (prose,
+    code fences) is skipped, and so is a balanced `{...}` span that is not valid JSON
+    (a brace in prose or an echoed format hint): the stream resets and keeps scanning
+    for the next `{`. Each top-level member is parsed once when it ends, and each
+    element of a top-level list/object value once when that element ends, so the work
+    stays linear in the output; the object built so far is handed to `on_partial` after
+    each step. Values are coerced towards `schema` (top-level key -> expected type) where
+    a scalar conversion makes sense; anything else is left for the caller's own coercion
+    and recorded in `mismatches` rather than rejected. Once a valid object closes, `feed`
+    raises `StopGeneration` so the provider stops producing tokens. When no valid object
+    is found, `result` stays None and the caller falls back to parsing the raw text.
+    """
+
+    def __init__(
+        self,
+        schema: JsonSchema | None = None,
+        on_partial: Optional[Callable[[dict[str, Any]], None]] = None,
+    ) -> None:
+        self._schema = schema or {}
+        self._on_partial = on_partial
+        self._chars: list[str] = []
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._member_start = 0
+        self._element_start = 0
+        self._container_key: str | None = None
+        self._container: list[Any] | dict[str, Any] | None = None
+        self.partial: dict[str, Any] = {}
+        self.mismatches: dict[str, str] = {}
+        self.result: dict[str, Any] | None = None
+        self.skipped = 0
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, chunk: str) -> None:
+        if self.done:
+            raise StopGeneration()
+        for char in chunk:
+            if not self._stack:
+                if char != "{":
+                    continue
+                self._chars.append(char)
+                self._stack.append(char)
+                self._member_start = len(self._chars)
+                continue
+            position = len(self._chars)
+            self._chars.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(char)
+                if len(self._stack) == 2:
+                    self._open_container(position, char)
+            elif char in "}]":
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 0:
+                    self._end_member(position)
+                    if not self._finish():
+                        self._reset()
+                if depth == 1:
+                    self._end_element(position, publish=False)
+                    self._close_container()
+            elif char == ",":
+                depth = len(self._stack)
+                if depth == 1:
+                    self._end_member(position)
+                elif depth == 2:
+                    self._end_element(position)
+                    self._element_start = position + 1
+            if self.done:
+                break
+        if self.done:
+            raise StopGeneration()
+
+    def _reset(self) -> None:
+        self.skipped += 1
+        self._chars = []
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._container_key = None
+        self._container = None
+        self.partial = {}
+        self.mismatches = {}
+
+    def _text(self, start: int, end: int) -> str:
+        return "".join(self._chars[start:end]).strip()
+
+    def _open_container(self, position: int, opener: str) -> None:
+        # The member reads `"key": {` or `"key": [`; only the key needs parsing here.
+        key_text = self._text(self._member_start, position).rstrip(":").strip()
+        try:
+            key = json.loads(key_text)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(key, str):
+            return
+        self._container_key = key
+        self._container = {} if opener == "{" else []
+        self._element_start = position + 1
+
+    def _end_element(self, position: int, publish: bool = True) -> None:
+        container = self._container
+        text = self._text(self._element_start, position)
+        if container is None or not text:
+            return
+        try:
+            if isinstance(container, list):
+                container.append(json.loads(text))
+            else:
+                container.update(json.loads("{" + text + "}"))
+        except json.JSONDecodeError:
+            return
+        if publish and self._on_partial:
+            self._publish(self._container_key, _snapshot(container))
+
+    def _close_container(self) -> None:
+        # The value ends with its closer; the member itself ends at the next comma or brace.
+        if self._container is not None:
+            self._publish(self._container_key, self._container)
+        self._container = None
+
+    def _end_member(self, position: int) -> None:
+        text = self._text(self._member_start, position)
+        self._member_start = position + 1
+        key, self._container_key = self._container_key, None
+        if key is not None or not text:
+            return
+        try:
+            member = json.loads("{" + text + "}")
+        except json.JSONDecodeError:
+            return
+        for name, value in member.items():
+            self._publish(name, value)
+
+    def _publish(self, key: str | None, value: Any) -> None:
+        if key is None:
+            return
+        expected = self._schema.get(key)
+        if expected is not None:
+            value = _coerce(value, expected)
+            if isinstance(value, expected):
+                self.mismatches.pop(key, None)
+            else:
+                self.mismatches[key] = f"{type(value).__name__}, expected {expected}"
+        self.partial[key] = value
+        if self._on_partial:
+            self._on_partial(dict(self.partial))
+
+    def _finish(self) -> bool:
+        try:
+            parsed = json.loads("".join(self._chars))
+        except json.JSONDecodeError:
+            return False
+        if not isinstance(parsed, dict):
+            return False
+        for key, expected in self._schema.items():
+            if key in parsed:
+                parsed[key] = _coerce(parsed[key], expected)
+        self.result = parsed
+        self.partial = parsed
+        if self._on_partial:
+            self._on_partial(dict(parsed))
+        return True
+
+
+def _snapshot(container: list[Any] | dict[str, Any]) -> list[Any] | dict[str, Any]:
+    return list(container) if isinstance(container, list) else dict(container)
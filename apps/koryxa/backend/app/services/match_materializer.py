@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Any
+
+from app.repositories.enterprise_pg import OPEN_NEED_STATUSES
+from app.services.batch_matching import TalentArrays, batch_top_matches, batch_top_needs, best_scores
+from app.services.postgres_bootstrap import connect_pg, db_execute, db_fetchall, pg_pool_ready
+from app.services.talent_index import TalentIndex
+
+
+logger = logging.getLogger(__name__)
+
+MATCH_TOP_K = int(os.environ.get("MATCH_TOP_K", "20"))
+MATCH_MIN_SCORE = float(os.environ.get("MATCH_MIN_SCORE", "0.10"))
+_WRITE_CHUNK = 500
+
+_OPEN_NEEDS_SQL = """
+    select id::text as id, primary_goal, urgency, treatment_preference
+    from app.enterprise_needs
+    where status = any(%s) {extra}
+"""
+
+Ranked = list[tuple[float, str]]
+
+
+class MatchMaterializer:
+    """Keeps app.enterprise_need_matches and app.talent_need_matches current.
+
+    Holds its own talent index, the open needs and the top-K lists it last wrote, plus
+    reverse maps of who lists whom. A changed flow or need is scored against the other
+    side first, and only the lists it can enter (score above their K-th) or already sits
+    in are recomputed, so a change costs one narrow grid instead of a full pass. The
+    worker is the only writer of both tables.
+    """
+
+    def __init__(self, *, top_k: int = MATCH_TOP_K, min_score: float = MATCH_MIN_SCORE) -> None:
+        self.top_k = top_k
+        self.min_score = min_score
+        self.index = TalentIndex()
+        self.needs: dict[str, dict[str, Any]] = {}
+        self.need_top: dict[str, Ranked] = {}
+        self.talent_top: dict[str, Ranked] = {}
+        self._needs_listing_flow: dict[str, set[str]] = {}
+        self._flows_listing_need: dict[str, set[str]] = {}
+        self.rebuilt_at: float | None = None
+
+    # ─── Full rebuild ────────────────────────────────────────────────────────
+
+    def rebuild(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        with closing(connect_pg()) as conn:
+            self.index.load(conn)
+        self.needs = {row["id"]: row for row in db_fetchall(_OPEN_NEEDS_SQL.format(extra=""), (list(OPEN_NEED_STATUSES),))}
+        self.need_top, self.talent_top = {}, {}
+        self._needs_listing_flow, self._flows_listing_need = {}, {}
+
+        need_ids = list(self.needs)
+        self._recompute_needs(need_ids)
+        self._recompute_talents([flow["_id"] for flow, _ in self.index.entries()])
+
+        db_execute("delete from app.enterprise_need_matches where not (need_id::text = any(%s));", (need_ids,))
+        db_execute("delete from app.talent_need_matches where not (flow_id::text = any(%s));", (list(self.talent_top),))
+        self.rebuilt_at = time.monotonic()
+        return {
+            "needs": len(self.needs),
+            "talents": len(self.index),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    # ─── Incremental refresh ─────────────────────────────────────────────────
+
+    def apply_changes(self, *, need_ids: set[str], flow_ids: set[str]) -> dict[str, Any]:
+        started = time.perf_counter()
+        dirty_needs: set[str] = set()
+        dirty_talents: set[str] = set()
+
+        if flow_ids:
+            with closing(connect_pg()) as conn:
+                self.index.refresh(conn, flow_ids)
+                conn.rollback()
+            for flow_id in flow_ids:
+                # The flow's own list, and every need list it appeared in.
+                dirty_talents.add(flow_id)
+                dirty_needs |= self._needs_listing_flow.get(flow_id, set())
+            live = [flow_id for flow_id in flow_ids if flow_id in self.index]
+            dirty_needs |= self._lists_entered(live, side="flow")
+
+        if need_ids:
+            rows = db_fetchall(_OPEN_NEEDS_SQL.format(extra="and id = any(%s::uuid[])"), (list(OPEN_NEED_STATUSES), sorted(need_ids)))
+            reopened = {row["id"]: row for row in rows}
+            for need_id in need_ids:
+                if need_id in reopened:
+                    self.needs[need_id] = reopened[need_id]
+                else:
+                    self.needs.pop(need_id, None)
+                dirty_needs.add(need_id)
+                dirty_talents |= self._flows_listing_need.get(need_id, set())
+            dirty_talents |= self._lists_entered(list(reopened), side="need")
+
+        self._recompute_needs(sorted(dirty_needs))
+        self._recompute_talents(sorted(dirty_talents))
+        return {
+            "needs_changed": len(need_ids),
+            "flows_changed": len(flow_ids),
+            "needs_rewritten": len(dirty_needs),
+            "talents_rewritten": len(dirty_talents),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def _lists_entered(self, changed: list[str], *, side: str) -> set[str]:
+        """Lists on the other side that the changed needs/flows now score into."""
+        if not changed or not self.needs or not len(self.index):
+            return set()
+        need_ids = list(self.needs)
+        if side == "flow":
+            talents = TalentArrays.from_entries(self.index.entries(changed))
+            best = best_scores([self.needs[n] for n in need_ids], talents, self.index.vocab, per="need")
+            owners, tops = need_ids, self.need_top
+        else:
+            talents = TalentArrays.from_index(self.index)
+            best = best_scores([self.needs[n] for n in changed], talents, self.index.vocab, per="talent")
+            owners = [str(flow["_id"]) for flow in talents.flows]
+            tops = self.talent_top
+        entered: set[str] = set()
+        for owner, score in zip(owners, best.tolist()):
+            if score < self.min_score:
+                continue
+            current = tops.get(owner, [])
+            if len(current) < self.top_k or score > current[-1][0]:
+                entered.add(owner)
+        return entered
+
+    def _recompute_needs(self, need_ids: list[str]) -> None:
+        open_ids = [n for n in need_ids if n in self.needs]
+        closed = [n for n in need_ids if n not in self.needs]
+        talents = TalentArrays.from_index(self.index)
+        tops = batch_top_matches(
+            [self.needs[n] for n in open_ids], talents, self.index.vocab, limit=self.top_k, min_score=self.min_score
+        )
+        rows = []
+        for need_id, top in zip(open_ids, tops):
+            ranked = [(score, str(flow["_id"])) for score, flow in top]
+            self._set_list(need_id, ranked, self.need_top, self._needs_listing_flow)
+            rows.append({"id": need_id, "matches": [{"flow_id": f, "score": round(s, 4)} for s, f in ranked], "evaluated": len(talents)})
+        for need_id in closed:
+            self._set_list(need_id, [], self.need_top, self._needs_listing_flow)
+            self.need_top.pop(need_id, None)
+        self._write("need", rows)
+        if closed:
+            db_execute("delete from app.enterprise_need_matches where need_id::text = any(%s);", (closed,))
+
+    def _recompute_talents(self, flow_ids: list[str]) -> None:
+        entries = self.index.entries(flow_ids)
+        live = {str(flow["_id"]) for flow, _ in entries}
+        gone = [f for f in flow_ids if f not in live]
+        need_ids = list(self.needs)
+        talents = TalentArrays.from_entries(entries)
+        tops = batch_top_needs(
+            [self.needs[n] for n in need_ids], talents, self.index.vocab, limit=self.top_k, min_score=self.min_score
+        ) if need_ids else [[] for _ in entries]
+        rows = []
+        for (flow, _), top in zip(entries, tops):
+            flow_id = str(flow["_id"])
+            ranked = [(score, need_ids[pos]) for score, pos in top]
+            self._set_list(flow_id, ranked, self.talent_top, self._flows_listing_need)
+            rows.append({"id": flow_id, "matches": [{"need_id": n, "score": round(s, 4)} for s, n in ranked], "evaluated": len(need_ids)})
+        for flow_id in gone:
+            self._set_list(flow_id, [], self.talent_top, self._flows_listing_need)
+            self.talent_top.pop(flow_id, None)
+        self._write("flow", rows)
+        if gone:
+            db_execute("delete from app.talent_need_matches where flow_id::text = any(%s);", (gone,))
+
+    @staticmethod
+    def _set_list(owner: str, ranked: Ranked, tops: dict[str, Ranked], reverse: dict[str, set[str]]) -> None:
+        for _, member in tops.get(owner, []):
+            listed = reverse.get(member)
+            if listed is not None:
+                listed.discard(owner)
+                if not listed:
+                    del reverse[member]
+        tops[owner] = ranked
+        for _, member in ranked:
+            reverse.setdefault(member, set()).add(owner)
+
+    @staticmethod
+    def _write(side: str, rows: list[dict[str, Any]]) -> None:
+        # One statement per chunk; rows whose need/flow was deleted meanwhile are skipped
+        # by the join instead of failing the chunk on the foreign key.
+        if side == "need":
+            sql = """
+                insert into app.enterprise_need_matches(need_id, matches, talents_evaluated, computed_at)
+                select n.id, r->'matches', (r->>'evaluated')::int, %s
+                from jsonb_array_elements(%s::jsonb) r
+                join app.enterprise_needs n on n.id = (r->>'id')::uuid
+                on conflict (need_id) do update
+                set matches = excluded.matches, talents_evaluated = excluded.talents_evaluated, computed_at = excluded.computed_at;
+            """
+        else:
+            sql = """
+                insert into app.talent_need_matches(flow_id, matches, needs_evaluated, computed_at)
+                select f.id, r->'matches', (r->>'evaluated')::int, %s
+                from jsonb_array_elements(%s::jsonb) r
+                join app.trajectory_flows f on f.id = (r->>'id')::uuid
+                on conflict (flow_id) do update
+                set matches = excluded.matches, needs_evaluated = excluded.needs_evaluated, computed_at = excluded.computed_at;
+            """
+        now = datetime.now(timezone.utc)
+        for start in range(0, len(rows), _WRITE_CHUNK):
+            db_execute(sql, (now, json.dumps(rows[start:start + _WRITE_CHUNK])))
+
+
+def _claim_queue(batch: int) -> list[dict[str, Any]]:
+    return db_fetchall(
+        """
+        delete from app.match_refresh_queue
+        where (kind, ref_id) in (
+          select kind, ref_id from app.match_refresh_queue
+          order by enqueued_at
+          limit %s
+          for update skip locked
+        )
+        returning kind, ref_id;
+        """,
+        (batch,),
+    )
+
+
+def _requeue(claimed: list[dict[str, Any]]) -> None:
+    for row in claimed:
+        try:
+            db_execute(
+                "insert into app.match_refresh_queue(kind, ref_id) values (%s, %s) on conflict do nothing;",
+                (row["kind"], row["ref_id"]),
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Match refresh requeue failed for %s %s: %s", row["kind"], row["ref_id"], exc)
+
+
+_MATERIALIZER: MatchMaterializer | None = None
+
+
+def run_match_refresh(*, batch: int = 500, full_every_s: float = 86400) -> dict[str, Any]:
+    """One worker tick: full rebuild when due or requested, else apply queued changes."""
+    global _MATERIALIZER
+    if not pg_pool_ready():
+        return {}
+    claimed = _claim_queue(batch)
+    try:
+        materializer = _MATERIALIZER
+        due = materializer is None or materializer.rebuilt_at is None or time.monotonic() - materializer.rebuilt_at >= full_every_s
+        if due or any(row["kind"] == "all" for row in claimed):
+            materializer = MatchMaterializer()
+            stats = materializer.rebuild()
+            _MATERIALIZER = materializer
+            return {"rebuild": stats}
+        if not claimed:
+            return {}
+        return materializer.apply_changes(
+            need_ids={row["ref_id"] for row in claimed if row["kind"] == "need"},
+            flow_ids={row["ref_id"] for row in claimed if row["kind"] == "flow"},
+        )
+    except Exception:
+        _requeue(claimed)
+        raise
@@ -12,11 +12,27 @@ Axes de scoring :
 """
 from __future__ import annotations
 
+import os
 from typing import Any
-
-from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorDatabase
-
+from uuid import UUID
+
+from app.repositories.enterprise_pg import OPEN_NEED_STATUSES, get_need
+from app.repositories.match_pg import (
+    enqueue_match_refresh,
+    get_need_match_row,
+    get_talent_match_row,
+    list_need_summaries,
+    list_talent_cards,
+)
+from app.services.postgres_async import db_fetchall_read
+from app.services.talent_index import (
+    TALENT_COLUMNS_SQL,
+    TALENT_WHERE_SQL,
+    NeedQuery,
+    TalentIndex,
+    get_talent_index,
+    talent_flow_from_row,
+)
 from app.services.taxonomy import (
     DOMAIN_COMPAT,
     DOMAIN_IDS,
@@ -186,18 +202,160 @@ def _serialize_talent(flow: dict[str, Any], score: float) -> dict[str, Any]:
     }
 
 
+# Colonne (expression indexée, cf. ensure_match_tables) de chaque axe côté talent.
+TALENT_AXIS_SQL: dict[str, str] = {
+    "mission": "onboarding->>'main_task'",
+    "domain": "onboarding->>'current_sector'",
+    "mode": "onboarding->>'work_mode'",
+    "timeline": "onboarding->>'target_timeline'",
+}
+
+# Nombre max de candidats rapatriés depuis Postgres par besoin.
+MATCH_SQL_CANDIDATES = int(os.environ.get("MATCH_SQL_CANDIDATES", "200"))
+
+
+def need_axis_scores(need: dict[str, Any]) -> dict[str, dict[str, float]]:
+    """Score pondéré de chaque valeur talent qui rapporte des points, par axe.
+
+    Les scores viennent des mêmes fonctions que `_score_match` : un talent vaut la somme
+    des scores de ses valeurs, 0 pour une valeur absente de la table.
+    """
+    need_domain = _extract_need_domain(need)
+    primary = DOMAIN_TO_MISSION_COMPAT.get(need_domain, [])
+    missions = set(primary)
+    for mt in primary:
+        missions.update(MISSION_TYPE_COMPAT.get(mt, []))
+    domains = {need_domain, *DOMAIN_COMPAT.get(need_domain, [])} if need_domain else set()
+    need_mode = need.get("treatment_preference", "")
+    modes = {_normalize_mode(need_mode)} if need_mode else set()
+    need_urgency = need.get("urgency", "")
+    timelines = set(URGENCY_TIMELINE_COMPAT.get(need_urgency, []))
+
+    def _axis(values: set[str], scorer: Any, weight: float) -> dict[str, float]:
+        scores = {value: scorer(value) * weight for value in values if value}
+        return {value: score for value, score in scores.items() if score > 0}
+
+    return {
+        "mission": _axis(missions, lambda v: _mission_score(need_domain, v), WEIGHT_MISSION),
+        "domain": _axis(domains, lambda v: _domain_score(need_domain, v), WEIGHT_DOMAIN),
+        "mode": _axis(modes, lambda v: _mode_score(need_mode, v), WEIGHT_MODE),
+        "timeline": _axis(timelines, lambda v: _urgency_score(need_urgency, v), WEIGHT_URGENCY),
+    }
+
+
+def build_need_query(need: dict[str, Any], index: TalentIndex) -> NeedQuery:
+    """Traduit un besoin en scores pondérés par code de feature talent."""
+    axes = need_axis_scores(need)
+
+    def _codes(scores: dict[str, float]) -> dict[int, float]:
+        coded = {index.vocab.lookup(value): score for value, score in scores.items()}
+        coded.pop(0, None)
+        return coded
+
+    return NeedQuery(**{axis: _codes(scores) for axis, scores in axes.items()})
+
+
+def build_candidate_sql(need: dict[str, Any], *, limit: int, min_score: float) -> tuple[str, tuple[Any, ...]] | None:
+    """Requête des meilleurs candidats d'un besoin, filtrés et pré-scorés dans Postgres.
+
+    Chaque axe devient un `case` sur l'expression indexée ; seuls les talents ayant une
+    valeur compatible sur au moins un axe sont lus (BitmapOr sur les index), comme
+    `TalentIndex.candidates` : mode et délai ne filtrent que s'ils suffisent à atteindre
+    `min_score`. Renvoie None quand aucun talent ne peut atteindre `min_score`.
+    """
+    axes = need_axis_scores(need)
+    filter_axes = ["mission", "domain"]
+    if sum(max(axes[a].values(), default=0.0) for a in ("mode", "timeline")) >= min_score:
+        filter_axes += ["mode", "timeline"]
+
+    score_terms: list[str] = []
+    score_params: list[Any] = []
+    for axis, scores in axes.items():
+        by_level: dict[float, list[str]] = {}
+        for value, score in scores.items():
+            by_level.setdefault(score, []).append(value)
+        if not by_level:
+            continue
+        branches = []
+        for score, values in sorted(by_level.items(), reverse=True):
+            branches.append(f"when {TALENT_AXIS_SQL[axis]} = any(%s) then %s")
+            score_params += [sorted(values), score]
+        score_terms.append(f"case {' '.join(branches)} else 0 end")
+
+    filters: list[str] = []
+    filter_params: list[Any] = []
+    for axis in filter_axes:
+        if axes[axis]:
+            filters.append(f"{TALENT_AXIS_SQL[axis]} = any(%s)")
+            filter_params.append(sorted(axes[axis]))
+    if not filters:
+        return None
+
+    sql = f"""
+        select * from (
+          select {TALENT_COLUMNS_SQL}, {' + '.join(score_terms)} as pre_score
+          from app.trajectory_flows
+          where {TALENT_WHERE_SQL} and ({' or '.join(filters)})
+        ) candidates
+        where pre_score >= %s
+        order by pre_score desc
+        limit %s;
+    """
+    return sql, (*score_params, *filter_params, min_score, limit)
+
+
+async def _pushdown_matches(need: dict[str, Any], limit: int, min_score: float) -> tuple[list[tuple[float, dict[str, Any]]], int]:
+    """Chemin sans index : Postgres filtre et pré-score, Python re-score un lot borné."""
+    if min_score <= 0:
+        return await _scan_matches(need, limit, min_score)
+    query = build_candidate_sql(need, limit=max(limit, MATCH_SQL_CANDIDATES), min_score=min_score)
+    if query is None:
+        return [], 0
+    rows = await db_fetchall_read(*query)
+    scored: list[tuple[float, dict[str, Any]]] = []
+    for row in rows:
+        flow = talent_flow_from_row(row)
+        score = _score_match(need, flow)
+        if score >= min_score:
+            scored.append((score, flow))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return scored[:limit], len(rows)
+
+
+async def _scan_matches(need: dict[str, Any], limit: int, min_score: float) -> tuple[list[tuple[float, dict[str, Any]]], int]:
+    """Score chaque profil onboardé ; seulement quand `min_score` ne permet aucun filtre."""
+    rows = await db_fetchall_read(f"select {TALENT_COLUMNS_SQL} from app.trajectory_flows where {TALENT_WHERE_SQL};")
+    scored: list[tuple[float, dict[str, Any]]] = []
+    for row in rows:
+        flow = talent_flow_from_row(row)
+        score = _score_match(need, flow)
+        if score >= min_score:
+            scored.append((score, flow))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return scored[:limit], len(rows)
+
+
+async def _score_need(need: dict[str, Any], limit: int, min_score: float) -> tuple[list[tuple[float, dict[str, Any]]], int]:
+    index = get_talent_index()
+    if index is not None and index.serving:
+        return index.top_matches(build_need_query(need, index), limit=limit, min_score=min_score)
+    return await _pushdown_matches(need, limit, min_score)
+
+
 # ─── Public API ───────────────────────────────────────────────────────────────
 
 
 async def find_matches_for_need(
     need_id: str,
-    db: AsyncIOMotorDatabase,
     limit: int = 5,
     min_score: float = 0.10,
 ) -> dict[str, Any]:
     """
     Trouve les meilleurs profils talents pour un besoin entreprise.
 
+    Utilise l'index talent résident quand il est à jour (seuls les profils compatibles
+    sont scorés), sinon laisse Postgres filtrer et pré-scorer les candidats.
+
     Returns:
         {
           "need_id": str,
@@ -206,51 +364,124 @@ async def find_matches_for_need(
         }
     """
     try:
-        need_oid = ObjectId(need_id)
-    except Exception:
+        UUID(need_id)
+    except (TypeError, ValueError):
         return {"need_id": need_id, "matches": [], "total_evaluated": 0, "error": "invalid need_id"}
 
-    need = await db["enterprise_needs"].find_one({"_id": need_oid})
+    need = await get_need(need_id)
     if not need:
         return {"need_id": need_id, "matches": [], "total_evaluated": 0, "error": "need not found"}
 
-    # Récupère tous les profils qui ont au moins terminé l'onboarding
-    cursor = db["trajectory_flows"].find(
-        {"onboarding": {"$exists": True, "$ne": None}},
-        # Projection — on ne charge que les champs utiles
-        {
-            "_id": 1,
-            "user_id": 1,
-            "onboarding.current_sector": 1,
-            "onboarding.main_task": 1,
-            "onboarding.work_mode": 1,
-            "onboarding.target_roles": 1,
-            "onboarding.existing_skills": 1,
-            "onboarding.ai_maturity": 1,
-            "onboarding.goal_type": 1,
-            "onboarding.target_timeline": 1,
-            "diagnostic.recommended_role": 1,
-            "diagnostic.profile_label": 1,
-            "created_at": 1,
-        },
-    )
-
-    scored: list[tuple[float, dict[str, Any]]] = []
-    total = 0
-
-    async for flow in cursor:
-        total += 1
-        score = _score_match(need, flow)
-        if score >= min_score:
-            scored.append((score, flow))
-
-    # Trie par score décroissant, garde les N meilleurs
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = scored[:limit]
-
+    top, total = await _score_need(need, limit, min_score)
     return {
         "need_id": str(need["_id"]),
         "primary_goal": need.get("primary_goal"),
         "matches": [_serialize_talent(flow, score) for score, flow in top],
         "total_evaluated": total,
     }
+
+
+async def get_materialized_need_matches(need_id: str, limit: int = 5) -> dict[str, Any]:
+    """Top talents d'un besoin lus dans app.enterprise_need_matches (calculés par le worker).
+
+    Aucun scoring sur le chemin de la requête tant que la ligne existe ; sinon le besoin
+    est remis en file et un calcul live borné est renvoyé avec `pending`. `computed_at`
+    indique la fraîcheur du classement. Un besoin non ouvert n'est jamais matérialisé :
+    il renvoie une liste vide avec `not_open`, sans scoring ni remise en file.
+    """
+    row = await get_need_match_row(need_id)
+    if row is None:
+        need = await get_need(need_id)
+        if not need or need.get("status") not in OPEN_NEED_STATUSES:
+            # Le worker supprime la ligne des besoins fermés : la remettre en file ne
+            # ferait que relancer le calcul à chaque lecture.
+            return {
+                "need_id": need_id,
+                "matches": [],
+                "count": 0,
+                "total_evaluated": 0,
+                "computed_at": None,
+                "pending": False,
+                "not_open": True,
+            }
+        # Pas encore matérialisé (besoin tout juste créé) : réponse live, bornée par
+        # le filtrage côté Postgres ou l'index, en attendant le worker.
+        await enqueue_match_refresh("need", need_id)
+        top, total = await _score_need(need, limit, 0.10)
+        matches = [_serialize_talent(flow, score) for score, flow in top]
+        return {
+            "need_id": need_id,
+            "matches": matches,
+            "count": len(matches),
+            "total_evaluated": total,
+            "computed_at": None,
+            "pending": True,
+        }
+    ranked = row["matches"][: max(0, limit)]
+    cards = await list_talent_cards([m["flow_id"] for m in ranked])
+    matches = [
+        _serialize_talent(talent_flow_from_row(cards[m["flow_id"]]), float(m["score"]))
+        for m in ranked
+        if m["flow_id"] in cards
+    ]
+    return {
+        "need_id": need_id,
+        "matches": matches,
+        "count": len(matches),
+        "total_evaluated": row["talents_evaluated"],
+        "computed_at": row["computed_at"],
+        "pending": row["pending"],
+    }
+
+
+async def get_materialized_talent_matches(flow_id: str, limit: int = 5, *, onboarded: bool = True) -> dict[str, Any]:
+    """Besoins ouverts les mieux classés pour un profil talent, lus dans app.talent_need_matches.
+
+    Un profil sans onboarding n'est jamais matérialisé : il renvoie une liste vide avec
+    `not_onboarded`, sans remise en file.
+    """
+    row = await get_talent_match_row(flow_id)
+    if row is None:
+        if not onboarded:
+            # Même logique que pour les besoins fermés : le worker n'écrirait jamais de
+            # ligne, la remise en file tournerait à chaque lecture.
+            return {
+                "flow_id": flow_id,
+                "needs": [],
+                "count": 0,
+                "needs_evaluated": 0,
+                "computed_at": None,
+                "pending": False,
+                "not_onboarded": True,
+            }
+        await enqueue_match_refresh("flow", flow_id)
+        return {"flow_id": flow_id, "needs": [], "count": 0, "needs_evaluated": 0, "computed_at": None, "pending": True}
+    ranked = row["matches"]
+    summaries = await list_need_summaries([m["need_id"] for m in ranked])
+    needs = []
+    for m in ranked:
+        need = summaries.get(m["need_id"])
+        if not need or need.get("status") not in OPEN_NEED_STATUSES:
+            continue
+        score = float(m["score"])
+        needs.append({
+            "need_id": m["need_id"],
+            "title": need.get("title"),
+            "company_name": need.get("company_name"),
+            "primary_goal": need.get("primary_goal"),
+            "urgency": need.get("urgency"),
+            "treatment_preference": need.get("treatment_preference"),
+            "score": round(score, 4),
+            "score_pct": round(score * 100),
+            "created_at": need.get("created_at"),
+        })
+        if len(needs) >= limit:
+            break
+    return {
+        "flow_id": flow_id,
+        "needs": needs,
+        "count": len(needs),
+        "needs_evaluated": row["needs_evaluated"],
+        "computed_at": row["computed_at"],
+        "pending": row["pending"],
+    }
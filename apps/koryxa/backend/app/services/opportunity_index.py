@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.services.skill_vocab import SKILLS, jaccard_bits
+
+
+logger = logging.getLogger(__name__)
+
+_SKEW_S = 5
+_PROJECTION = {"title": 1, "status": 1, "skills_required": 1, "created_at": 1, "updated_at": 1}
+# One definition of "open" for full loads and incremental updates, matching the
+# `{"status": "open"}` filter recommendations used before the index.
+_OPEN_QUERY = {"status": "open"}
+
+
+def _is_open(doc: Dict[str, Any]) -> bool:
+    return doc.get("status") == _OPEN_QUERY["status"]
+
+
+@dataclass(frozen=True)
+class _IndexedOpportunity:
+    opportunity_id: str
+    title: str | None
+    created_at: str
+    skill_ids: frozenset[int]
+    bits: int
+
+
+class OpportunityIndex:
+    """In-memory inverted index skill id -> open opportunity ids.
+
+    Recommendations only score opportunities sharing at least one skill with the
+    profile, so their cost follows the size of the matching postings instead of the
+    whole catalogue. Writes in this process are applied directly (`upsert`); writes
+    from other workers are picked up by an `updated_at` delta query at most every
+    `sync_s`, and the whole index is reloaded every `full_reload_s`.
+    """
+
+    def __init__(self, *, sync_s: float, full_reload_s: float) -> None:
+        self.sync_s = sync_s
+        self.full_reload_s = full_reload_s
+        self._entries: Dict[str, _IndexedOpportunity] = {}
+        self._postings: Dict[int, set[str]] = {}
+        self._watermark = ""
+        self._synced_at = 0.0
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self.stats: Dict[str, int] = {"queries": 0, "scored": 0, "full_loads": 0, "delta_syncs": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> Dict[str, Any]:
+        queries = self.stats["queries"]
+        return {
+            **self.stats,
+            "open_opportunities": len(self._entries),
+            "skills": len(self._postings),
+            "loaded_age_s": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "avg_scored_per_query": round(self.stats["scored"] / queries, 1) if queries else 0.0,
+        }
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        """Index an opportunity document, or drop it when it is no longer open."""
+        opportunity_id = str(doc["_id"])
+        self.remove(opportunity_id)
+        if not _is_open(doc):
+            return
+        skill_ids = frozenset(SKILLS.ids(doc.get("skills_required")))
+        bits = 0
+        for skill_id in skill_ids:
+            bits |= 1 << skill_id
+        self._entries[opportunity_id] = _IndexedOpportunity(
+            opportunity_id=opportunity_id,
+            title=doc.get("title"),
+            created_at=str(doc.get("created_at") or ""),
+            skill_ids=skill_ids,
+            bits=bits,
+        )
+        for skill_id in skill_ids:
+            self._postings.setdefault(skill_id, set()).add(opportunity_id)
+
+    def remove(self, opportunity_id: str) -> None:
+        entry = self._entries.pop(opportunity_id, None)
+        if entry is None:
+            return
+        for skill_id in entry.skill_ids:
+            posting = self._postings.get(skill_id)
+            if posting is not None:
+                posting.discard(opportunity_id)
+                if not posting:
+                    del self._postings[skill_id]
+
+    async def ensure_fresh(self, db: AsyncIOMotorDatabase) -> None:
+        now = time.monotonic()
+        if self._loaded_at and now - self._synced_at < self.sync_s and now - self._loaded_at < self.full_reload_s:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            try:
+                if not self._loaded_at or now - self._loaded_at >= self.full_reload_s:
+                    await self._full_load(db)
+                elif now - self._synced_at >= self.sync_s:
+                    await self._delta_sync(db)
+            except Exception as exc:  # noqa: BLE001
+                if not self._loaded_at:
+                    raise
+                logger.warning("Opportunity index refresh failed, serving the previous state: %s", exc)
+            self._synced_at = time.monotonic()
+
+    async def _full_load(self, db: AsyncIOMotorDatabase) -> None:
+        # Anything written before the load starts is in the load itself, so the delta
+        # watermark can start there even when no document carries `updated_at` yet.
+        started = datetime.now(timezone.utc).isoformat()
+        entries, postings = self._entries, self._postings
+        self._entries, self._postings = {}, {}
+        try:
+            async for doc in db["opportunities"].find(_OPEN_QUERY, _PROJECTION):
+                self.upsert(doc)
+        except Exception:
+            self._entries, self._postings = entries, postings
+            raise
+        self._watermark = started
+        self._loaded_at = time.monotonic()
+        self.stats["full_loads"] += 1
+
+    async def _delta_sync(self, db: AsyncIOMotorDatabase) -> None:
+        # Only documents read back from Mongo move the watermark (local write-through must
+        # not skip an older write from another worker), and the query looks back a few
+        # seconds for clock skew between app servers; re-applying a document is harmless.
+        since = (datetime.fromisoformat(self._watermark) - timedelta(seconds=_SKEW_S)).isoformat()
+        watermark = self._watermark
+        async for doc in db["opportunities"].find({"updated_at": {"$gte": since}}, _PROJECTION):
+            self.upsert(doc)
+            updated_at = str(doc.get("updated_at") or "")
+            if updated_at > watermark:
+                watermark = updated_at
+        self._watermark = watermark
+        self.stats["delta_syncs"] += 1
+
+    def recommend(self, skills: List[Any], k: int) -> List[Dict[str, Any]]:
+        """Top `k` open opportunities by skill Jaccard, newest first on equal scores."""
+        user_ids = SKILLS.ids(skills)
+        user_bits = 0
+        candidates: set[str] = set()
+        for skill_id in user_ids:
+            user_bits |= 1 << skill_id
+            candidates |= self._postings.get(skill_id, set())
+        scored = (
+            (jaccard_bits(user_bits, entry.bits), entry.created_at, entry)
+            for entry in (self._entries[opportunity_id] for opportunity_id in candidates)
+        )
+        top = heapq.nlargest(k, scored, key=lambda item: (item[0], item[1]))
+        self.stats["queries"] += 1
+        self.stats["scored"] += len(candidates)
+        return [
+            {"opportunity_id": entry.opportunity_id, "title": entry.title, "score": round(score, 6)}
+            for score, _, entry in top
+        ]
+
+
+_INDEX = OpportunityIndex(
+    sync_s=float(os.environ.get("OPPORTUNITY_INDEX_SYNC_S", "5")),
+    full_reload_s=float(os.environ.get("OPPORTUNITY_INDEX_FULL_RELOAD_S", "3600")),
+)
+
+
+def get_opportunity_index() -> OpportunityIndex:
+    return _INDEX
+
+
+def opportunity_index_stats() -> Dict[str, Any]:
+    return _INDEX.snapshot()
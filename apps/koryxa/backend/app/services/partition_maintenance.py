@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from app.services.postgres_bootstrap import db_execute, db_fetchall, db_fetchone, pg_pool_ready
+
+
+logger = logging.getLogger(__name__)
+
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+@dataclass(frozen=True)
+class MonthlyPartitionedTable:
+    schema: str
+    name: str
+    retention_env: str
+    default_retention_months: int
+
+    @property
+    def qualified(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+    def retention_months(self) -> int:
+        return int(os.environ.get(self.retention_env, str(self.default_retention_months)))
+
+
+# Append-mostly tables range-partitioned by month on created_at. Retention 0 keeps
+# every partition attached.
+PARTITIONED_TABLES = (
+    MonthlyPartitionedTable("app", "chatlaya_messages", "CHATLAYA_MESSAGES_RETENTION_MONTHS", 12),
+)
+
+
+def _month_start(year: int, month: int) -> datetime:
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def _is_partitioned(table: MonthlyPartitionedTable) -> bool:
+    row = db_fetchone(
+        """
+        select 1 as found
+        from pg_partitioned_table pt
+        join pg_class c on c.oid = pt.partrelid
+        join pg_namespace n on n.oid = c.relnamespace
+        where n.nspname = %s and c.relname = %s;
+        """,
+        (table.schema, table.name),
+    )
+    return row is not None
+
+
+def _partitions(table: MonthlyPartitionedTable) -> list[dict[str, Any]]:
+    return db_fetchall(
+        """
+        select c.relname as name, pg_get_expr(c.relpartbound, c.oid) as bound
+        from pg_inherits i
+        join pg_class c on c.oid = i.inhrelid
+        join pg_class p on p.oid = i.inhparent
+        join pg_namespace n on n.oid = p.relnamespace
+        where n.nspname = %s and p.relname = %s;
+        """,
+        (table.schema, table.name),
+    )
+
+
+def ensure_monthly_partitions(table: MonthlyPartitionedTable, *, months_ahead: int) -> list[str]:
+    """Create the partitions for the current month and the next `months_ahead` months.
+
+    Inserts fail when no partition covers the row, so partitions are created well ahead;
+    there is deliberately no DEFAULT partition, which would block creating new ones once
+    it holds rows.
+    """
+    now = datetime.now(timezone.utc)
+    existing = {row["name"] for row in _partitions(table)}
+    created: list[str] = []
+    for offset in range(months_ahead + 1):
+        start = _month_start(now.year, now.month + offset)
+        end = _month_start(start.year, start.month + 1)
+        name = f"{table.name}_p{start:%Y%m}"
+        if name in existing:
+            continue
+        db_execute(
+            f"create table if not exists {table.schema}.{name} partition of {table.qualified} "
+            "for values from (%s) to (%s);",
+            (start, end),
+        )
+        created.append(name)
+    return created
+
+
+def detach_expired_partitions(table: MonthlyPartitionedTable, *, retention_months: int) -> list[str]:
+    """Detach partitions whose whole range is older than the retention window.
+
+    Detached partitions are left in place as standalone tables, to be archived and then
+    dropped by an operator, so retention never runs a bulk DELETE on the hot table.
+    """
+    if retention_months <= 0:
+        return []
+    now = datetime.now(timezone.utc)
+    cutoff = _month_start(now.year, now.month - retention_months)
+    concurrently = _server_version_num() >= 140000
+    detached: list[str] = []
+    for row in _partitions(table):
+        match = _UPPER_BOUND_RE.search(row.get("bound") or "")
+        if not match:
+            continue
+        upper = datetime.fromisoformat(match.group(1))
+        if upper.tzinfo is None:
+            upper = upper.replace(tzinfo=timezone.utc)
+        if upper > cutoff:
+            continue
+        db_execute(
+            f"alter table {table.qualified} detach partition {table.schema}.{row['name']}"
+            f"{' concurrently' if concurrently else ''};"
+        )
+        detached.append(row["name"])
+    return detached
+
+
+def _server_version_num() -> int:
+    row = db_fetchone("select current_setting('server_version_num')::int as version;")
+    return int(row["version"]) if row else 0
+
+
+def run_partition_maintenance(*, detach: bool = True) -> dict[str, Any]:
+    """Roll partitions forward for every table in PARTITIONED_TABLES, then apply retention.
+
+    Tables not (yet) converted to partitioned tables are skipped. The web app runs this
+    with `detach=False` at startup; retention runs from the worker only, so concurrent
+    web processes never race on DETACH.
+    """
+    if not pg_pool_ready():
+        return {}
+    months_ahead = int(os.environ.get("PARTITION_MONTHS_AHEAD", "3"))
+    report: dict[str, Any] = {}
+    for table in PARTITIONED_TABLES:
+        try:
+            if not _is_partitioned(table):
+                report[table.qualified] = {"partitioned": False}
+                continue
+            created = ensure_monthly_partitions(table, months_ahead=months_ahead)
+            detached = detach_expired_partitions(table, retention_months=table.retention_months()) if detach else []
+            report[table.qualified] = {"partitioned": True, "created": created, "detached": detached}
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Partition maintenance failed for %s: %s", table.qualified, exc)
+            report[table.qualified] = {"error": str(exc)}
+    return report
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any
+
+
+PIN_COOKIE = "koryxa_rw"
+REPLICA_LAG_SQL = """
+select case
+  when not pg_is_in_recovery() then 0
+  when pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() then 0
+  else coalesce(extract(epoch from now() - pg_last_xact_replay_timestamp()), 0)
+end::float8 as lag_s;
+"""
+
+_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+_READ_ONLY_RE = re.compile(r"^\s*(select|show|values|table)\b", re.IGNORECASE)
+
+
+@dataclass
+class RouteState:
+    pinned: bool = False
+    wrote: bool = False
+
+
+_ROUTE_STATE: ContextVar[RouteState | None] = ContextVar("pg_route_state", default=None)
+
+
+class ReplicaRouter:
+    """Decides whether a read-only query may go to the replica, and keeps the metrics.
+
+    Reads stay on the primary when there is no replica, when the current request is
+    pinned (it wrote, or the client wrote within the pin window), or when the last lag
+    sample is above `max_lag_s` or older than a few probe intervals.
+    """
+
+    def __init__(self, *, max_lag_s: float, lag_check_s: float) -> None:
+        self.max_lag_s = max_lag_s
+        self.lag_check_s = lag_check_s
+        self._lock = threading.Lock()
+        self._lag_s: float | None = None
+        self._lag_sampled_at = 0.0
+        self._histograms = {role: [0] * (len(_LATENCY_BUCKETS_MS) + 1) for role in ("primary", "replica")}
+        self._counters = {
+            "replica_reads": 0,
+            "primary_reads_no_replica": 0,
+            "primary_reads_pinned": 0,
+            "primary_reads_lagging": 0,
+            "replica_errors": 0,
+            "lag_probe_failures": 0,
+        }
+
+    def record_lag(self, lag_s: float | None) -> None:
+        with self._lock:
+            if lag_s is None:
+                self._counters["lag_probe_failures"] += 1
+                self._lag_s = None
+                return
+            self._lag_s = lag_s
+            self._lag_sampled_at = time.monotonic()
+
+    def _replica_fresh(self) -> bool:
+        if self._lag_s is None:
+            return False
+        if time.monotonic() - self._lag_sampled_at > 3 * self.lag_check_s:
+            return False
+        return self._lag_s <= self.max_lag_s
+
+    def choose(self, *, has_replica: bool) -> str:
+        state = _ROUTE_STATE.get()
+        with self._lock:
+            if not has_replica:
+                self._counters["primary_reads_no_replica"] += 1
+                return "primary"
+            if state is not None and state.pinned:
+                self._counters["primary_reads_pinned"] += 1
+                return "primary"
+            if not self._replica_fresh():
+                self._counters["primary_reads_lagging"] += 1
+                return "primary"
+            self._counters["replica_reads"] += 1
+            return "replica"
+
+    def record_replica_error(self) -> None:
+        with self._lock:
+            self._counters["replica_errors"] += 1
+
+    def observe(self, role: str, elapsed_ms: float) -> None:
+        with self._lock:
+            self._histograms[role][_bucket_index(elapsed_ms)] += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            latency = {}
+            for role, counts in self._histograms.items():
+                histogram = {f"le_{bound}ms": count for bound, count in zip(_LATENCY_BUCKETS_MS, counts)}
+                histogram["inf"] = counts[-1]
+                latency[role] = histogram
+            return {
+                **self._counters,
+                "replica_lag_s": self._lag_s,
+                "replica_fresh": self._replica_fresh(),
+                "max_lag_s": self.max_lag_s,
+                "latency_ms": latency,
+            }
+
+
+def _bucket_index(elapsed_ms: float) -> int:
+    for index, bound in enumerate(_LATENCY_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return index
+    return len(_LATENCY_BUCKETS_MS)
+
+
+ROUTER = ReplicaRouter(
+    max_lag_s=float(os.environ.get("PG_REPLICA_MAX_LAG_S", "5")),
+    lag_check_s=float(os.environ.get("PG_REPLICA_LAG_CHECK_S", "2")),
+)
+PIN_WINDOW_S = int(os.environ.get("PG_REPLICA_PIN_S", "10"))
+
+
+def replica_dsn() -> str:
+    return (os.environ.get("DATABASE_REPLICA_URL") or "").strip()
+
+
+def begin_route_state(*, pinned: bool) -> tuple[RouteState, Token]:
+    """Open the per-request routing state; the handler mutates it, the caller reads `wrote`."""
+    state = RouteState(pinned=pinned)
+    return state, _ROUTE_STATE.set(state)
+
+
+def reset_route_state(token: Token) -> None:
+    _ROUTE_STATE.reset(token)
+
+
+def note_primary_statement(sql: str) -> None:
+    # Anything that is not plainly a read pins the rest of the request, and the client
+    # for PIN_WINDOW_S, to the primary so it reads its own writes.
+    if _READ_ONLY_RE.match(sql):
+        return
+    state = _ROUTE_STATE.get()
+    if state is not None:
+        state.wrote = True
+        state.pinned = True
+
+
+def replica_routing_stats() -> dict[str, Any]:
+    return ROUTER.stats() if replica_dsn() else {}
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from app.services.pg_routing import ROUTER, note_primary_statement, replica_dsn
+from app.services.postgres_bootstrap import _dsn_with_supabase_defaults, _resolve_database_url
+
+logger = logging.getLogger(__name__)
+POOL: AsyncConnectionPool | None = None
+REPLICA_POOL: AsyncConnectionPool | None = None
+
+
+def _build_async_pool(dsn: str, *, name: str, read_only: bool = False) -> AsyncConnectionPool:
+    options = f"-c statement_timeout={int(os.environ.get('PG_STATEMENT_TIMEOUT_MS', '5000'))}"
+    if read_only:
+        options += " -c default_transaction_read_only=on"
+    return AsyncConnectionPool(
+        conninfo=_dsn_with_supabase_defaults(dsn),
+        min_size=int(os.environ.get("PG_ASYNC_POOL_MIN", "2")),
+        max_size=int(os.environ.get("PG_ASYNC_POOL_MAX", "20")),
+        timeout=float(os.environ.get("PG_ASYNC_POOL_TIMEOUT_S", "10")),
+        kwargs={
+            "autocommit": True,
+            "row_factory": dict_row,
+            "prepare_threshold": None,
+            "options": options,
+        },
+        name=name,
+        open=False,
+    )
+
+
+async def _open(pool: AsyncConnectionPool) -> bool:
+    try:
+        await pool.open(wait=True, timeout=float(os.environ.get("PG_CONNECT_TIMEOUT_S", "10")))
+    except Exception as exc:  # noqa: BLE001
+        await pool.close()
+        logger.warning("Async Postgres pool %s init failed: %s", pool.name, exc)
+        return False
+    return True
+
+
+async def init_async_pg_pool() -> None:
+    """Open the asyncio pool used by the request-path repositories.
+
+    Same DSN as the sync bootstrap pool. Connections run in autocommit with dict rows,
+    so the helpers below behave like their `postgres_bootstrap` counterparts; server-side
+    prepared statements are off because Supabase routes through a transaction pooler.
+    When DATABASE_REPLICA_URL is set a read-only replica pool is opened as well; lag is
+    sampled by the sync bootstrap pool and shared through `pg_routing.ROUTER`.
+    """
+    global POOL, REPLICA_POOL
+    dsn = _resolve_database_url()
+    if not dsn:
+        return
+    pool = _build_async_pool(dsn, name="koryxa-async")
+    if not await _open(pool):
+        logger.warning("Async repositories are disabled")
+        return
+    POOL = pool
+    if replica_dsn():
+        replica = _build_async_pool(replica_dsn(), name="koryxa-async-replica", read_only=True)
+        if await _open(replica):
+            REPLICA_POOL = replica
+
+
+async def close_async_pg_pool() -> None:
+    global POOL, REPLICA_POOL
+    if REPLICA_POOL:
+        await REPLICA_POOL.close()
+        REPLICA_POOL = None
+    if POOL:
+        await POOL.close()
+        POOL = None
+
+
+def async_pg_pool_ready() -> bool:
+    return POOL is not None
+
+
+def async_pg_pool_stats() -> dict[str, Any]:
+    if POOL is None:
+        return {}
+    stats = POOL.get_stats()
+    if REPLICA_POOL is not None:
+        stats["replica"] = REPLICA_POOL.get_stats()
+    return stats
+
+
+def _require_pool() -> AsyncConnectionPool:
+    if not POOL:
+        raise RuntimeError("Async DB pool not initialized")
+    return POOL
+
+
+async def _fetchone_on(pool: AsyncConnectionPool, role: str, sql: str, params: tuple[Any, ...]) -> dict[str, Any] | None:
+    started = time.monotonic()
+    try:
+        async with pool.connection() as conn:
+            cur = await conn.execute(sql, params)
+            row = await cur.fetchone()
+            return dict(row) if row is not None else None
+    finally:
+        ROUTER.observe(role, (time.monotonic() - started) * 1000)
+
+
+async def _fetchall_on(pool: AsyncConnectionPool, role: str, sql: str, params: tuple[Any, ...]) -> list[dict[str, Any]]:
+    started = time.monotonic()
+    try:
+        async with pool.connection() as conn:
+            cur = await conn.execute(sql, params)
+            rows = await cur.fetchall()
+            return [dict(r) for r in rows]
+    finally:
+        ROUTER.observe(role, (time.monotonic() - started) * 1000)
+
+
+async def db_fetchone(sql: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
+    note_primary_statement(sql)
+    return await _fetchone_on(_require_pool(), "primary", sql, params)
+
+
+async def db_fetchall(sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
+    note_primary_statement(sql)
+    return await _fetchall_on(_require_pool(), "primary", sql, params)
+
+
+async def db_execute(sql: str, params: tuple[Any, ...] = ()) -> None:
+    pool = _require_pool()
+    note_primary_statement(sql)
+    started = time.monotonic()
+    try:
+        async with pool.connection() as conn:
+            await conn.execute(sql, params)
+    finally:
+        ROUTER.observe("primary", (time.monotonic() - started) * 1000)
+
+
+async def db_fetchone_read(sql: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
+    """Read-only query that may be served by the replica; see `pg_routing.ReplicaRouter`."""
+    replica = REPLICA_POOL
+    if ROUTER.choose(has_replica=replica is not None) == "replica":
+        try:
+            return await _fetchone_on(replica, "replica", sql, params)
+        except Exception as exc:  # noqa: BLE001
+            ROUTER.record_replica_error()
+            logger.warning("Replica read failed, retrying on primary: %s", exc)
+    return await _fetchone_on(_require_pool(), "primary", sql, params)
+
+
+async def db_fetchall_read(sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
+    """Read-only query that may be served by the replica; see `pg_routing.ReplicaRouter`."""
+    replica = REPLICA_POOL
+    if ROUTER.choose(has_replica=replica is not None) == "replica":
+        try:
+            return await _fetchall_on(replica, "replica", sql, params)
+        except Exception as exc:  # noqa: BLE001
+            ROUTER.record_replica_error()
+            logger.warning("Replica read failed, retrying on primary: %s", exc)
+    return await _fetchall_on(_require_pool(), "primary", sql, params)
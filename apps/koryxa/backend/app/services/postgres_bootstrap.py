@@ -3,13 +3,199 @@
 import logging
 import os
 import json
+import threading
+import time
+from collections import deque
 from typing import Any
 
+import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+
+from app.services.pg_routing import REPLICA_LAG_SQL, ROUTER, note_primary_statement, replica_dsn
 
 logger = logging.getLogger(__name__)
-POOL: SimpleConnectionPool | None = None
+
+_ACQUIRE_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class InstrumentedConnectionPool:
+    """Thread-safe psycopg2 pool with bounded waits, connection recycling and stats.
+
+    `getconn` blocks up to `acquire_timeout_s` for a free connection, then raises
+    `PoolTimeout`. Idle connections are pinged before reuse once they have been idle
+    for `idle_check_s`, and replaced after `max_lifetime_s`; broken or mid-transaction
+    connections handed back are closed instead of reused.
+    """
+
+    def __init__(
+        self,
+        *,
+        dsn: str,
+        minconn: int,
+        maxconn: int,
+        acquire_timeout_s: float,
+        idle_check_s: float,
+        max_lifetime_s: float,
+        read_only: bool = False,
+    ) -> None:
+        self._dsn = dsn
+        self._options = _statement_timeout_option()
+        if read_only:
+            self._options += " -c default_transaction_read_only=on"
+        self._maxconn = max(1, maxconn)
+        self._acquire_timeout_s = acquire_timeout_s
+        self._idle_check_s = idle_check_s
+        self._max_lifetime_s = max_lifetime_s
+        self._cond = threading.Condition()
+        self._idle: deque[tuple[Any, float, float]] = deque()
+        self._born: dict[int, float] = {}
+        self._size = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+        self._histogram = [0] * (len(_ACQUIRE_BUCKETS_MS) + 1)
+        self._counters = {"acquired": 0, "timeouts": 0, "recycled": 0, "connect_errors": 0}
+        for _ in range(min(max(0, minconn), self._maxconn)):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, time.monotonic(), time.monotonic()))
+
+    def _connect(self) -> Any:
+        conn = psycopg2.connect(self._dsn, options=self._options)
+        conn.autocommit = True
+        return conn
+
+    def _usable(self, conn: Any, born: float, last_used: float) -> bool:
+        now = time.monotonic()
+        if conn.closed or now - born > self._max_lifetime_s:
+            return False
+        if now - last_used < self._idle_check_s:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("select 1;")
+            return True
+        except Exception:  # noqa: BLE001
+            return False
+
+    def getconn(self) -> Any:
+        started = time.monotonic()
+        deadline = started + self._acquire_timeout_s
+        conn = None
+        born = last_used = 0.0
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("DB pool is closed")
+                    if self._idle:
+                        conn, born, last_used = self._idle.pop()
+                        break
+                    if self._size < self._maxconn:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self._acquire_timeout_s:g}s waiting for a Postgres connection "
+                            f"({self._in_use}/{self._maxconn} in use, {self._waiting - 1} other waiters)"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if conn is not None and not self._usable(conn, born, last_used):
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._counters["recycled"] += 1
+            if conn is None:
+                conn = self._connect()
+                born = time.monotonic()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._counters["connect_errors"] += 1
+                self._cond.notify()
+            raise
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._cond:
+            self._born[id(conn)] = born
+            self._counters["acquired"] += 1
+            self._histogram[_bucket_index(elapsed_ms)] += 1
+        return conn
+
+    def putconn(self, conn: Any) -> None:
+        reusable = not conn.closed and conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+        with self._cond:
+            born = self._born.pop(id(conn), time.monotonic())
+            self._in_use -= 1
+            if reusable and not self._closed:
+                self._idle.append((conn, born, time.monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+        if not reusable or self._closed:
+            self._discard(conn)
+
+    def closeall(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    @staticmethod
+    def _discard(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:  # noqa: BLE001
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            histogram = {f"le_{bound}ms": count for bound, count in zip(_ACQUIRE_BUCKETS_MS, self._histogram)}
+            histogram["inf"] = self._histogram[-1]
+            return {
+                "size": self._size,
+                "max": self._maxconn,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                **self._counters,
+                "acquire_ms": histogram,
+            }
+
+
+def _bucket_index(elapsed_ms: float) -> int:
+    for index, bound in enumerate(_ACQUIRE_BUCKETS_MS):
+        if elapsed_ms <= bound:
+            return index
+    return len(_ACQUIRE_BUCKETS_MS)
+
+
+def _statement_timeout_option() -> str:
+    return f"-c statement_timeout={int(os.environ.get('PG_STATEMENT_TIMEOUT_MS', '5000'))}"
+
+
+POOL: InstrumentedConnectionPool | None = None
+REPLICA_POOL: InstrumentedConnectionPool | None = None
+_LAG_THREAD: threading.Thread | None = None
+_LAG_STOP = threading.Event()
 
 
 def _resolve_database_url() -> str:
@@ -27,6 +213,18 @@ def _dsn_with_supabase_defaults(dsn: str) -> str:
     return dsn
 
 
+def _build_pool(dsn: str, *, read_only: bool = False) -> InstrumentedConnectionPool:
+    return InstrumentedConnectionPool(
+        dsn=dsn,
+        minconn=int(os.environ.get("PGPOOL_MIN", "1")),
+        maxconn=int(os.environ.get("PGPOOL_MAX", "10")),
+        acquire_timeout_s=float(os.environ.get("PGPOOL_ACQUIRE_TIMEOUT_S", "5")),
+        idle_check_s=float(os.environ.get("PGPOOL_IDLE_CHECK_S", "30")),
+        max_lifetime_s=float(os.environ.get("PGPOOL_MAX_LIFETIME_S", "1800")),
+        read_only=read_only,
+    )
+
+
 def init_pg_pool() -> None:
     global POOL
     dsn = _resolve_database_url()
@@ -35,40 +233,94 @@ def init_pg_pool() -> None:
         return
     dsn = _dsn_with_supabase_defaults(dsn)
     try:
-        POOL = SimpleConnectionPool(
-            minconn=int(os.environ.get("PGPOOL_MIN", "1")),
-            maxconn=int(os.environ.get("PGPOOL_MAX", "5")),
-            dsn=dsn,
-        )
+        POOL = _build_pool(dsn)
     except Exception as exc:  # noqa: BLE001
         POOL = None
         logger.warning("Postgres pool init failed; postgres-backed features are disabled: %s", exc)
+        return
+    _init_replica_pool()
+
+
+def _init_replica_pool() -> None:
+    """Open the optional read replica pool (DATABASE_REPLICA_URL) and its lag probe.
+
+    Replica sessions are read-only. Until the probe has a fresh lag sample, reads routed
+    through `db_fetchone_read` / `db_fetchall_read` stay on the primary.
+    """
+    global REPLICA_POOL, _LAG_THREAD
+    dsn = replica_dsn()
+    if not dsn:
+        return
+    try:
+        REPLICA_POOL = _build_pool(_dsn_with_supabase_defaults(dsn), read_only=True)
+    except Exception as exc:  # noqa: BLE001
+        REPLICA_POOL = None
+        logger.warning("Postgres replica pool init failed; reads stay on the primary: %s", exc)
+        return
+    _LAG_STOP.clear()
+    _LAG_THREAD = threading.Thread(target=_probe_replica_lag_forever, name="pg-replica-lag", daemon=True)
+    _LAG_THREAD.start()
+
+
+def _probe_replica_lag_forever() -> None:
+    while not _LAG_STOP.is_set():
+        try:
+            row = _fetchone_on(REPLICA_POOL, "replica", REPLICA_LAG_SQL, ())
+            ROUTER.record_lag(float(row["lag_s"]) if row else None)
+        except Exception as exc:  # noqa: BLE001
+            ROUTER.record_lag(None)
+            logger.warning("Replica lag probe failed: %s", exc)
+        _LAG_STOP.wait(ROUTER.lag_check_s)
 
 
 def close_pg_pool() -> None:
-    global POOL
+    global POOL, REPLICA_POOL, _LAG_THREAD
+    _LAG_STOP.set()
+    thread, _LAG_THREAD = _LAG_THREAD, None
+    if thread is not None:
+        thread.join(timeout=ROUTER.lag_check_s + 1)
+    if REPLICA_POOL:
+        REPLICA_POOL.closeall()
+        REPLICA_POOL = None
     if POOL:
         POOL.closeall()
         POOL = None
 
 
+def connect_pg() -> Any | None:
+    """Open a dedicated connection outside the pool, e.g. for a long-lived LISTEN."""
+    dsn = _resolve_database_url()
+    if not dsn:
+        return None
+    return psycopg2.connect(_dsn_with_supabase_defaults(dsn))
+
+
 def pg_pool_ready() -> bool:
     return POOL is not None
 
 
-def db_fetchone(sql: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
-    global POOL
+def pg_pool_stats() -> dict[str, Any]:
+    if POOL is None:
+        return {}
+    stats = POOL.stats()
+    if REPLICA_POOL is not None:
+        stats["replica"] = REPLICA_POOL.stats()
+    return stats
+
+
+def _require_pool() -> InstrumentedConnectionPool:
     if not POOL:
         raise RuntimeError("DB pool not initialized")
+    return POOL
+
 
-    conn = POOL.getconn()
+def _fetchone_on(pool: InstrumentedConnectionPool | None, role: str, sql: str, params: tuple[Any, ...]) -> dict[str, Any] | None:
+    if pool is None:
+        raise RuntimeError("DB pool not initialized")
+    started = time.monotonic()
+    conn = pool.getconn()
     try:
-        conn.autocommit = True
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "set statement_timeout = %s;",
-                (int(os.environ.get("PG_STATEMENT_TIMEOUT_MS", "5000")),),
-            )
             cur.execute(sql, params)
             row = cur.fetchone()
             return dict(row) if row is not None else None
@@ -79,22 +331,17 @@ def db_fetchone(sql: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None
             pass
         raise
     finally:
-        POOL.putconn(conn)
+        pool.putconn(conn)
+        ROUTER.observe(role, (time.monotonic() - started) * 1000)
 
 
-def db_fetchall(sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
-    global POOL
-    if not POOL:
+def _fetchall_on(pool: InstrumentedConnectionPool | None, role: str, sql: str, params: tuple[Any, ...]) -> list[dict[str, Any]]:
+    if pool is None:
         raise RuntimeError("DB pool not initialized")
-
-    conn = POOL.getconn()
+    started = time.monotonic()
+    conn = pool.getconn()
     try:
-        conn.autocommit = True
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "set statement_timeout = %s;",
-                (int(os.environ.get("PG_STATEMENT_TIMEOUT_MS", "5000")),),
-            )
             cur.execute(sql, params)
             rows = cur.fetchall()
             return [dict(r) for r in rows]
@@ -105,22 +352,27 @@ def db_fetchall(sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
             pass
         raise
     finally:
-        POOL.putconn(conn)
+        pool.putconn(conn)
+        ROUTER.observe(role, (time.monotonic() - started) * 1000)
 
 
-def db_execute(sql: str, params: tuple[Any, ...] = ()) -> None:
-    global POOL
-    if not POOL:
-        raise RuntimeError("DB pool not initialized")
+def db_fetchone(sql: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
+    note_primary_statement(sql)
+    return _fetchone_on(_require_pool(), "primary", sql, params)
+
 
-    conn = POOL.getconn()
+def db_fetchall(sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
+    note_primary_statement(sql)
+    return _fetchall_on(_require_pool(), "primary", sql, params)
+
+
+def db_execute(sql: str, params: tuple[Any, ...] = ()) -> None:
+    pool = _require_pool()
+    note_primary_statement(sql)
+    started = time.monotonic()
+    conn = pool.getconn()
     try:
-        conn.autocommit = True
         with conn.cursor() as cur:
-            cur.execute(
-                "set statement_timeout = %s;",
-                (int(os.environ.get("PG_STATEMENT_TIMEOUT_MS", "5000")),),
-            )
             cur.execute(sql, params)
     except Exception:
         try:
@@ -129,7 +381,30 @@ def db_execute(sql: str, params: tuple[Any, ...] = ()) -> None:
             pass
         raise
     finally:
-        POOL.putconn(conn)
+        pool.putconn(conn)
+        ROUTER.observe("primary", (time.monotonic() - started) * 1000)
+
+
+def db_fetchone_read(sql: str, params: tuple[Any, ...] = ()) -> dict[str, Any] | None:
+    """Read-only query that may be served by the replica; see `pg_routing.ReplicaRouter`."""
+    if ROUTER.choose(has_replica=REPLICA_POOL is not None) == "replica":
+        try:
+            return _fetchone_on(REPLICA_POOL, "replica", sql, params)
+        except Exception as exc:  # noqa: BLE001
+            ROUTER.record_replica_error()
+            logger.warning("Replica read failed, retrying on primary: %s", exc)
+    return _fetchone_on(_require_pool(), "primary", sql, params)
+
+
+def db_fetchall_read(sql: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
+    """Read-only query that may be served by the replica; see `pg_routing.ReplicaRouter`."""
+    if ROUTER.choose(has_replica=REPLICA_POOL is not None) == "replica":
+        try:
+            return _fetchall_on(REPLICA_POOL, "replica", sql, params)
+        except Exception as exc:  # noqa: BLE001
+            ROUTER.record_replica_error()
+            logger.warning("Replica read failed, retrying on primary: %s", exc)
+    return _fetchall_on(_require_pool(), "primary", sql, params)
 
 
 def _pg_relation_exists(qualified_name: str) -> bool:
@@ -271,6 +546,7 @@ def ensure_auth_tables() -> None:
           code_hash text not null,
           intent text not null default 'login',
           meta jsonb not null default '{}'::jsonb,
+          attempts int not null default 0,
           expires_at timestamptz not null,
           consumed_at timestamptz null,
           created_at timestamptz not null default timezone('utc', now())
@@ -280,6 +556,9 @@ def ensure_auth_tables() -> None:
     db_execute(
         "alter table app.login_otps add column if not exists meta jsonb not null default '{}'::jsonb;"
     )
+    db_execute(
+        "alter table app.login_otps add column if not exists attempts int not null default 0;"
+    )
     db_execute(
         "create index if not exists login_otps_email_created_idx on app.login_otps (lower(email), created_at desc);"
     )
@@ -311,7 +590,7 @@ def ensure_chatlaya_tables() -> None:
     db_execute(
         """
         create table if not exists app.chatlaya_messages (
-          id uuid primary key,
+          id uuid not null,
           conversation_id uuid not null references app.chatlaya_conversations(id) on delete cascade,
           guest_id text,
           user_id uuid references app.auth_users(id) on delete cascade,
@@ -319,17 +598,98 @@ def ensure_chatlaya_tables() -> None:
           content text not null,
           meta jsonb not null default '{}'::jsonb,
           created_at timestamptz not null default timezone('utc', now()),
+          constraint chatlaya_messages_pkey primary key (id, created_at),
           constraint chatlaya_messages_role_check check (role in ('user', 'assistant'))
-        );
+        ) partition by range (created_at);
         """
     )
     db_execute(
-        "create index if not exists idx_chatlaya_conversations_user_updated_at on app.chatlaya_conversations (user_id, updated_at desc) where archived = false;"
+        "alter table app.chatlaya_conversations add column if not exists summary text not null default '';"
+    )
+    db_execute(
+        "alter table app.chatlaya_conversations add column if not exists summary_until timestamptz null;"
+    )
+    db_execute(
+        "create index if not exists idx_chatlaya_conversations_user_updated_at_id on app.chatlaya_conversations (user_id, updated_at desc, id desc) where archived = false;"
+    )
+    db_execute(
+        "create index if not exists idx_chatlaya_conversations_guest_updated_at_id on app.chatlaya_conversations (guest_id, updated_at desc, id desc) where archived = false;"
+    )
+    db_execute(
+        "create index if not exists idx_chatlaya_messages_conversation_created_at_id on app.chatlaya_messages (conversation_id, created_at, id);"
     )
+    # Superseded by the (…, id) keyset indexes above.
+    db_execute("drop index if exists app.idx_chatlaya_conversations_user_updated_at;")
+    db_execute("drop index if exists app.idx_chatlaya_conversations_guest_updated_at;")
+    db_execute("drop index if exists app.idx_chatlaya_messages_conversation_created_at;")
+    # Databases created before partitioning keep a plain table until
+    # services/chatlaya-service/migrations/005 converts it; maintenance skips those.
+    from app.services.partition_maintenance import run_partition_maintenance
+
+    run_partition_maintenance(detach=False)
+
+
+def ensure_ai_json_cache_table() -> None:
+    if not POOL:
+        return
+    db_execute("create schema if not exists app;")
     db_execute(
-        "create index if not exists idx_chatlaya_conversations_guest_updated_at on app.chatlaya_conversations (guest_id, updated_at desc) where archived = false;"
+        """
+        create table if not exists app.ai_json_cache (
+          cache_key text primary key,
+          namespace text not null,
+          payload jsonb not null,
+          generation_ms integer not null default 0,
+          hits integer not null default 0,
+          created_at timestamptz not null default timezone('utc', now()),
+          last_hit_at timestamptz null,
+          expires_at timestamptz not null
+        );
+        """
     )
     db_execute(
-        "create index if not exists idx_chatlaya_messages_conversation_created_at on app.chatlaya_messages (conversation_id, created_at asc);"
+        "create index if not exists idx_ai_json_cache_expires_at on app.ai_json_cache (expires_at);"
     )
 
+
+def ensure_match_tables() -> None:
+    if not POOL:
+        return
+    db_execute("create schema if not exists app;")
+    # Top-K lists written by app.services.match_materializer; `matches` is best first.
+    db_execute(
+        """
+        create table if not exists app.enterprise_need_matches (
+          need_id uuid primary key references app.enterprise_needs(id) on delete cascade,
+          matches jsonb not null default '[]'::jsonb,
+          talents_evaluated integer not null default 0,
+          computed_at timestamptz not null default timezone('utc', now())
+        );
+        """
+    )
+    db_execute(
+        """
+        create table if not exists app.talent_need_matches (
+          flow_id uuid primary key references app.trajectory_flows(id) on delete cascade,
+          matches jsonb not null default '[]'::jsonb,
+          needs_evaluated integer not null default 0,
+          computed_at timestamptz not null default timezone('utc', now())
+        );
+        """
+    )
+    # Expression indexes behind the candidate pushdown in matching_service.build_candidate_sql.
+    for column in ("main_task", "current_sector", "work_mode", "target_timeline"):
+        db_execute(
+            f"create index if not exists idx_trajectory_flows_onboarding_{column} "
+            f"on app.trajectory_flows ((onboarding->>'{column}'));"
+        )
+    db_execute(
+        """
+        create table if not exists app.match_refresh_queue (
+          kind text not null check (kind in ('need', 'flow', 'all')),
+          ref_id text not null,
+          enqueued_at timestamptz not null default timezone('utc', now()),
+          primary key (kind, ref_id)
+        );
+        """
+    )
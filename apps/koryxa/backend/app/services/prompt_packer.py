@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+_CHARS_PER_TOKEN_FALLBACK = 3.6
+_SHINGLE_SIZE = 5
+_OVERLAP_DUPLICATE_RATIO = 0.6
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_NON_SPACE_RE = re.compile(r"\S+")
+
+
+@lru_cache(maxsize=2)
+def _load_tokenizer(name: str) -> Any | None:
+    try:
+        from transformers import AutoTokenizer  # type: ignore
+
+        return AutoTokenizer.from_pretrained(name, local_files_only=settings.CHAT_TOKENIZER_LOCAL_ONLY)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("ChatLAYA tokenizer %s unavailable, using character estimate: %s", name, exc)
+        return None
+
+
+def _tokenizer() -> Any | None:
+    name = (settings.CHAT_TOKENIZER or "").strip()
+    if not name:
+        return None
+    return _load_tokenizer(name)
+
+
+def _count_tokens_uncached(text: str) -> int:
+    tokenizer = _tokenizer()
+    if tokenizer is not None:
+        try:
+            return len(tokenizer.encode(text, add_special_tokens=False))
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("ChatLAYA tokenizer encode failed: %s", exc)
+    return max(1, math.ceil(len(text) / _CHARS_PER_TOKEN_FALLBACK))
+
+
+_count_tokens_cached = lru_cache(maxsize=4096)(_count_tokens_uncached)
+
+
+def count_tokens(text: str | None) -> int:
+    if not text:
+        return 0
+    return _count_tokens_cached(text)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut `text` on a word boundary so that it fits in `budget` tokens.
+
+    The kept part is a prefix of the original string, so newlines and list formatting
+    survive. Binary-search probes are counted without the cache so the many large
+    prefixes do not evict the entries worth keeping.
+    """
+    if budget <= 0 or not text:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+    word_ends = [match.end() for match in _NON_SPACE_RE.finditer(text)]
+    low, high = 0, len(word_ends)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if _count_tokens_uncached(text[: word_ends[mid - 1]] + " ...") <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return (text[: word_ends[low - 1]] + " ...") if low else ""
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < _SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[index : index + _SHINGLE_SIZE]) for index in range(len(words) - _SHINGLE_SIZE + 1)}
+
+
+def _is_overlapping(shingles: set[tuple[str, ...]], kept: list[set[tuple[str, ...]]]) -> bool:
+    if not shingles:
+        return True
+    for other in kept:
+        if not other:
+            continue
+        shared = len(shingles & other)
+        if shared and shared / min(len(shingles), len(other)) >= _OVERLAP_DUPLICATE_RATIO:
+            return True
+    return False
+
+
+def pack_chunks(
+    chunks: list[dict[str, Any]],
+    token_budget: int,
+    max_chunks: int = 3,
+) -> tuple[list[dict[str, Any]], int]:
+    """Greedily keep the best-ranked chunks that fit in `token_budget`.
+
+    Chunks are taken in rank order; a chunk mostly contained in an already kept one is
+    dropped, and a chunk that does not fit is skipped so smaller lower-ranked ones can
+    still use the remaining budget. The first chunk is truncated rather than dropped.
+    Returns the kept chunks and the tokens they use.
+    """
+    selected: list[dict[str, Any]] = []
+    kept_shingles: list[set[tuple[str, ...]]] = []
+    used = 0
+    for chunk in chunks:
+        if len(selected) >= max_chunks or used >= token_budget:
+            break
+        text = str(chunk.get("text") or "").strip()
+        if not text:
+            continue
+        shingles = _shingles(text)
+        if _is_overlapping(shingles, kept_shingles):
+            continue
+        cost = count_tokens(text)
+        if used + cost > token_budget:
+            if selected:
+                continue
+            text = truncate_to_tokens(text, token_budget)
+            if not text:
+                continue
+            cost = count_tokens(text)
+        used += cost
+        kept_shingles.append(shingles)
+        selected.append(
+            {
+                "doc_id": chunk.get("doc_id"),
+                "score": chunk.get("score"),
+                "text": text,
+                "meta": chunk.get("meta") or {},
+            }
+        )
+    return selected, used
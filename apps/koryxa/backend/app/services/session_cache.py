@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core.config import settings
+from app.services.postgres_async import async_pg_pool_ready, db_execute
+from app.services.postgres_bootstrap import connect_pg
+
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "koryxa_auth_invalidate"
+_LISTEN_POLL_S = 5.0
+_RECONNECT_BACKOFF_MAX_S = 60.0
+
+
+@dataclass
+class _CachedSession:
+    session: dict[str, Any]
+    user: dict[str, Any]
+    user_id: str
+    expires_at: float
+
+
+class SessionCache:
+    """Bounded map from session token hash to the authenticated (session, user) pair.
+
+    Entries live for `ttl_s` at most and never past the session expiry. Logout, password
+    and role changes are broadcast on a Postgres NOTIFY channel so every worker drops the
+    affected entries; while the listener is not connected the cache is bypassed, since
+    invalidations could be missed.
+    """
+
+    def __init__(self, *, ttl_s: float, max_entries: int) -> None:
+        self._ttl_s = ttl_s
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, _CachedSession] = OrderedDict()
+        self._by_user: dict[str, set[str]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.stats: dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def serving(self) -> bool:
+        return self._listening.is_set()
+
+    @property
+    def generation(self) -> int:
+        """Read before loading a session from the database and hand back to `put`."""
+        return self._generation
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": entries,
+            "listening": self.serving,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+    def get(self, token_hash: str) -> tuple[dict[str, Any], dict[str, Any]] | None:
+        if not self.serving:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            if entry.expires_at <= now:
+                self._drop(token_hash)
+                self.stats["evictions"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(token_hash)
+            self.stats["hits"] += 1
+            # Handlers update `current` in place; keep the cached record untouched.
+            return dict(entry.session), dict(entry.user)
+
+    def put(self, token_hash: str, session: dict[str, Any], user: dict[str, Any], *, generation: int) -> None:
+        if not self.serving:
+            return
+        expires_at = time.monotonic() + self._ttl_s
+        session_expiry = session.get("expires_at")
+        if isinstance(session_expiry, datetime):
+            if session_expiry.tzinfo is None:
+                session_expiry = session_expiry.replace(tzinfo=timezone.utc)
+            remaining = (session_expiry - datetime.now(timezone.utc)).total_seconds()
+            expires_at = min(expires_at, time.monotonic() + remaining)
+        user_id = str(session.get("user_id") or user.get("id") or "")
+        with self._lock:
+            # An invalidation landed while the caller was reading the database: the rows it
+            # read may already be stale.
+            if generation != self._generation:
+                return
+            self._drop(token_hash)
+            self._entries[token_hash] = _CachedSession(dict(session), dict(user), user_id, expires_at)
+            self._by_user.setdefault(user_id, set()).add(token_hash)
+            while len(self._entries) > self._max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.stats["evictions"] += 1
+
+    def invalidate_token(self, token_hash: str) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._drop(token_hash):
+                self.stats["invalidations"] += 1
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for token_hash in list(self._by_user.get(user_id, ())):
+                if self._drop(token_hash):
+                    self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, token_hash: str) -> bool:
+        entry = self._entries.pop(token_hash, None)
+        if entry is None:
+            return False
+        hashes = self._by_user.get(entry.user_id)
+        if hashes is not None:
+            hashes.discard(token_hash)
+            if not hashes:
+                del self._by_user[entry.user_id]
+        return True
+
+    def _apply(self, payload: str) -> None:
+        kind, _, value = payload.partition(":")
+        if kind == "token" and value:
+            self.invalidate_token(value)
+        elif kind == "user" and value:
+            self.invalidate_user(value)
+        else:
+            logger.warning("Ignoring malformed auth invalidation payload: %r", payload)
+
+    def start_listener(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="auth-session-listener", daemon=True)
+        self._thread.start()
+
+    def stop_listener(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=_LISTEN_POLL_S + 1)
+
+    def _listen_forever(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = connect_pg()
+                if conn is None:
+                    return
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"listen {INVALIDATION_CHANNEL};")
+                # Anything cached before LISTEN took effect may have missed a notification.
+                self.clear()
+                self._listening.set()
+                backoff = 1.0
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], _LISTEN_POLL_S) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._apply(conn.notifies.pop(0).payload)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Auth session listener disconnected: %s", exc)
+            finally:
+                self._listening.clear()
+                self.clear()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:  # noqa: BLE001
+                        pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, _RECONNECT_BACKOFF_MAX_S)
+
+
+_CACHE: SessionCache | None = None
+
+
+def get_session_cache() -> SessionCache | None:
+    return _CACHE
+
+
+def start_session_cache() -> None:
+    global _CACHE
+    if not settings.AUTH_SESSION_CACHE_ENABLED or not async_pg_pool_ready() or _CACHE is not None:
+        return
+    _CACHE = SessionCache(
+        ttl_s=settings.AUTH_SESSION_CACHE_TTL_S,
+        max_entries=settings.AUTH_SESSION_CACHE_MAX_ENTRIES,
+    )
+    _CACHE.start_listener()
+
+
+def stop_session_cache() -> None:
+    global _CACHE
+    if _CACHE is not None:
+        _CACHE.stop_listener()
+        _CACHE = None
+
+
+def session_cache_stats() -> dict[str, Any]:
+    return _CACHE.snapshot() if _CACHE is not None else {}
+
+
+async def _publish(payload: str) -> None:
+    if _CACHE is not None:
+        _CACHE._apply(payload)
+    if not async_pg_pool_ready():
+        return
+    try:
+        await db_execute("select pg_notify(%s, %s);", (INVALIDATION_CHANNEL, payload))
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Auth invalidation notify failed for %s: %s", payload, exc)
+
+
+async def publish_token_invalidation(token_hash: str) -> None:
+    await _publish(f"token:{token_hash}")
+
+
+async def publish_user_invalidation(user_id: str) -> None:
+    await _publish(f"user:{user_id}")
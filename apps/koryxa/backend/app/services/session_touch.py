@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core.config import settings
+from app.repositories.auth_pg import touch_sessions
+from app.services.postgres_async import async_pg_pool_ready
+from app.services.postgres_bootstrap import db_execute as db_execute_sync, pg_pool_ready
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionTouchBuffer:
+    """Coalesces `last_seen_at` updates into one batched write per flush.
+
+    A session is queued at most once per `interval_s`; requests in between only bump a
+    counter. Pending touches are written by `flush`, which the periodic task and shutdown
+    call; rows that fail to flush are kept for the next attempt.
+    """
+
+    def __init__(self, *, interval_s: float) -> None:
+        self._interval_s = interval_s
+        self._pending: dict[str, datetime] = {}
+        self._last_queued: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats: dict[str, int] = {
+            "touches": 0,
+            "writes_avoided": 0,
+            "rows_flushed": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+        }
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {**self.stats, "pending": pending}
+
+    def record(self, session_id: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.stats["touches"] += 1
+            last = self._last_queued.get(session_id)
+            if last is not None and now - last < self._interval_s:
+                self.stats["writes_avoided"] += 1
+                return
+            self._last_queued[session_id] = now
+            self._pending[session_id] = datetime.now(timezone.utc)
+
+    async def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            horizon = time.monotonic() - self._interval_s
+            self._last_queued = {key: at for key, at in self._last_queued.items() if at > horizon}
+        if not batch:
+            return 0
+        try:
+            await touch_sessions(list(batch.items()))
+        except Exception as exc:  # noqa: BLE001
+            with self._lock:
+                for session_id, seen_at in batch.items():
+                    self._pending.setdefault(session_id, seen_at)
+                self.stats["flush_failures"] += 1
+            logger.warning("Session touch flush failed (%d sessions): %s", len(batch), exc)
+            return 0
+        with self._lock:
+            self.stats["flushes"] += 1
+            self.stats["rows_flushed"] += len(batch)
+        return len(batch)
+
+
+_BUFFER: SessionTouchBuffer | None = None
+_FLUSH_TASK: asyncio.Task | None = None
+_DROP_LOG_EVERY_S = 60.0
+_UNBUFFERED_STATS: dict[str, int] = {"direct_writes": 0, "direct_failures": 0, "dropped": 0}
+_last_drop_log = 0.0
+
+
+def _touch_session_sync(session_id: str, seen_at: datetime) -> None:
+    db_execute_sync(
+        "update app.sessions set last_seen_at = %s where id = %s::uuid and last_seen_at < %s;",
+        (seen_at, session_id, seen_at),
+    )
+
+
+async def record_session_touch(session_id: str) -> None:
+    """Queue a touch, or write it directly when the buffer is not running."""
+    global _last_drop_log
+    if _BUFFER is not None:
+        _BUFFER.record(session_id)
+        return
+    # Without the buffer every touch is written, as before batching existed.
+    seen_at = datetime.now(timezone.utc)
+    try:
+        if async_pg_pool_ready():
+            await touch_sessions([(session_id, seen_at)])
+        elif pg_pool_ready():
+            await asyncio.to_thread(_touch_session_sync, session_id, seen_at)
+        else:
+            _UNBUFFERED_STATS["dropped"] += 1
+            now = time.monotonic()
+            if now - _last_drop_log >= _DROP_LOG_EVERY_S:
+                _last_drop_log = now
+                logger.warning(
+                    "Session touch dropped: no Postgres pool available (%d dropped so far)",
+                    _UNBUFFERED_STATS["dropped"],
+                )
+            return
+        _UNBUFFERED_STATS["direct_writes"] += 1
+    except Exception as exc:  # noqa: BLE001
+        _UNBUFFERED_STATS["direct_failures"] += 1
+        logger.warning("Direct session touch failed for %s: %s", session_id, exc)
+
+
+async def _flush_forever(buffer: SessionTouchBuffer) -> None:
+    while True:
+        await asyncio.sleep(settings.SESSION_TOUCH_FLUSH_S)
+        await buffer.flush()
+
+
+def start_session_touch_buffer() -> None:
+    global _BUFFER, _FLUSH_TASK
+    if not async_pg_pool_ready() or _BUFFER is not None:
+        return
+    _BUFFER = SessionTouchBuffer(interval_s=settings.SESSION_TOUCH_INTERVAL_S)
+    _FLUSH_TASK = asyncio.get_running_loop().create_task(_flush_forever(_BUFFER))
+
+
+async def stop_session_touch_buffer() -> None:
+    global _BUFFER, _FLUSH_TASK
+    task, _FLUSH_TASK = _FLUSH_TASK, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    buffer, _BUFFER = _BUFFER, None
+    if buffer is not None:
+        flushed = await buffer.flush()
+        logger.info("Session touch buffer flushed %d sessions on shutdown", flushed)
+
+
+def session_touch_stats() -> dict[str, Any]:
+    stats = _BUFFER.snapshot() if _BUFFER is not None else {"buffered": False}
+    return {**stats, **_UNBUFFERED_STATS}
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import threading
+from typing import Iterable
+
+
+def normalize_skill(value: object) -> str:
+    return str(value).strip().lower()
+
+
+class SkillVocabulary:
+    """Interns normalized skill strings to small integer ids.
+
+    Sets of skills become Python int bitsets (bit i set for skill id i), so overlap
+    scoring is an AND/OR and two popcounts instead of building and intersecting sets of
+    strings. Ids are process-local and never reused; the vocabulary only grows with the
+    distinct skills seen.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def intern(self, skill: object) -> int:
+        # Blank entries are kept (as ""), like the set-based Jaccard they replace.
+        name = normalize_skill(skill)
+        found = self._ids.get(name)
+        if found is not None:
+            return found
+        with self._lock:
+            return self._ids.setdefault(name, len(self._ids))
+
+    def ids(self, skills: Iterable[object] | None) -> set[int]:
+        out: set[int] = set()
+        for skill in skills or ():
+            out.add(self.intern(skill))
+        return out
+
+    def bitset(self, skills: Iterable[object] | None) -> int:
+        bits = 0
+        for skill_id in self.ids(skills):
+            bits |= 1 << skill_id
+        return bits
+
+
+def jaccard_bits(a: int, b: int) -> float:
+    """Jaccard similarity of two skill bitsets; 0.0 when both are empty."""
+    union = (a | b).bit_count()
+    if not union:
+        return 0.0
+    return (a & b).bit_count() / union
+
+
+SKILLS = SkillVocabulary()
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import heapq
+import logging
+import select
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from psycopg2.extras import RealDictCursor
+
+from app.core.config import settings
+from app.services.postgres_async import async_pg_pool_ready, db_execute
+from app.services.postgres_bootstrap import connect_pg
+
+
+logger = logging.getLogger(__name__)
+
+TALENT_CHANNEL = "koryxa_talent_index"
+_LISTEN_POLL_S = 5.0
+_RECONNECT_BACKOFF_MAX_S = 60.0
+_LOAD_BATCH = 2000
+
+# Only the onboarding/diagnostic fields used for scoring and for the match card.
+TALENT_COLUMNS_SQL = """
+    id::text as id,
+    user_id::text as user_id,
+    onboarding->>'current_sector' as current_sector,
+    onboarding->>'main_task' as main_task,
+    onboarding->>'work_mode' as work_mode,
+    onboarding->>'target_timeline' as target_timeline,
+    onboarding->'target_roles' as target_roles,
+    onboarding->'existing_skills' as existing_skills,
+    onboarding->>'ai_maturity' as ai_maturity,
+    onboarding->>'goal_type' as goal_type,
+    diagnostic->>'recommended_role' as recommended_role,
+    diagnostic->>'profile_label' as profile_label,
+    created_at
+"""
+TALENT_WHERE_SQL = "onboarding is not null and onboarding <> '{}'::jsonb"
+
+
+def talent_flow_from_row(row: dict[str, Any]) -> dict[str, Any]:
+    """Rebuild the flow shape `_score_match` and `_serialize_talent` expect."""
+    return {
+        "_id": row["id"],
+        "user_id": row.get("user_id"),
+        "onboarding": {
+            "current_sector": row.get("current_sector") or "",
+            "main_task": row.get("main_task") or "",
+            "work_mode": row.get("work_mode") or "",
+            "target_timeline": row.get("target_timeline") or "",
+            "target_roles": row.get("target_roles") or [],
+            "existing_skills": row.get("existing_skills") or [],
+            "ai_maturity": row.get("ai_maturity"),
+            "goal_type": row.get("goal_type"),
+        },
+        "diagnostic": {
+            "recommended_role": row.get("recommended_role"),
+            "profile_label": row.get("profile_label"),
+        },
+        "created_at": row.get("created_at"),
+    }
+
+
+class Vocabulary:
+    """Interns feature strings to small integers; 0 is reserved for "missing"."""
+
+    def __init__(self) -> None:
+        self._codes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def code(self, value: str | None) -> int:
+        if not value:
+            return 0
+        found = self._codes.get(value)
+        if found is not None:
+            return found
+        with self._lock:
+            return self._codes.setdefault(value, len(self._codes) + 1)
+
+    def lookup(self, value: str | None) -> int:
+        """Code of an already interned value, without interning it (0 when unknown)."""
+        return self._codes.get(value, 0) if value else 0
+
+    def items(self) -> list[tuple[str, int]]:
+        return list(self._codes.items())
+
+
+@dataclass(frozen=True)
+class TalentFeatures:
+    mission: int
+    domain: int
+    mode: int
+    timeline: int
+
+
+@dataclass(frozen=True)
+class NeedQuery:
+    """Per-axis scores of a need, keyed by talent feature code.
+
+    Built by the matching service from its scoring rules, so the index stays agnostic
+    of the weights and the taxonomy; a talent absent from every map scores 0.
+    """
+
+    mission: dict[int, float]
+    domain: dict[int, float]
+    mode: dict[int, float]
+    timeline: dict[int, float]
+
+    def upper_bound_without(self, *axes: str) -> float:
+        """Best score reachable by a talent matching none of `axes`."""
+        return sum(max(getattr(self, axis).values(), default=0.0) for axis in ("mission", "domain", "mode", "timeline") if axis not in axes)
+
+
+class TalentIndex:
+    """Resident feature index over onboarded trajectory flows.
+
+    Each flow is encoded once into integer-coded mission/domain/mode/timeline features
+    with one inverted bucket per axis value, so a need only scores the talents sharing
+    a compatible value on some axis instead of every onboarded flow. It is loaded after
+    LISTEN on TALENT_CHANNEL takes effect and then kept current from the flow ids
+    published on writes; while the listener is down `serving` is false and callers scan
+    Postgres instead.
+    """
+
+    AXES = ("mission", "domain", "mode", "timeline")
+
+    def __init__(self) -> None:
+        self.vocab = Vocabulary()
+        self._features: dict[str, TalentFeatures] = {}
+        self._flows: dict[str, dict[str, Any]] = {}
+        self._buckets: dict[str, dict[int, set[str]]] = {axis: {} for axis in self.AXES}
+        self._lock = threading.RLock()
+        self._listening = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loaded_at: float | None = None
+        self._last_load_ms: float | None = None
+        self.stats: dict[str, int] = {"queries": 0, "scored": 0, "refreshes": 0, "removals": 0}
+
+    @property
+    def serving(self) -> bool:
+        return self._listening.is_set()
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def __contains__(self, flow_id: object) -> bool:
+        return flow_id in self._features
+
+    def snapshot(self) -> dict[str, Any]:
+        queries = self.stats["queries"]
+        return {
+            **self.stats,
+            "talents": len(self._features),
+            "vocabulary": len(self.vocab),
+            "listening": self.serving,
+            "loaded_age_s": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "last_load_ms": self._last_load_ms,
+            "avg_scored_per_query": round(self.stats["scored"] / queries, 1) if queries else 0.0,
+        }
+
+    def encode(self, flow: dict[str, Any]) -> TalentFeatures:
+        onboarding = flow.get("onboarding") or {}
+        return TalentFeatures(
+            mission=self.vocab.code(onboarding.get("main_task")),
+            domain=self.vocab.code(onboarding.get("current_sector")),
+            mode=self.vocab.code(onboarding.get("work_mode")),
+            timeline=self.vocab.code(onboarding.get("target_timeline")),
+        )
+
+    def upsert(self, flow: dict[str, Any]) -> None:
+        flow_id = str(flow["_id"])
+        features = self.encode(flow)
+        with self._lock:
+            self._unlink(flow_id)
+            self._features[flow_id] = features
+            self._flows[flow_id] = flow
+            for axis in self.AXES:
+                code = getattr(features, axis)
+                if code:
+                    self._buckets[axis].setdefault(code, set()).add(flow_id)
+
+    def remove(self, flow_id: str) -> None:
+        with self._lock:
+            if self._unlink(flow_id):
+                self.stats["removals"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._features.clear()
+            self._flows.clear()
+            for buckets in self._buckets.values():
+                buckets.clear()
+
+    def _unlink(self, flow_id: str) -> bool:
+        features = self._features.pop(flow_id, None)
+        self._flows.pop(flow_id, None)
+        if features is None:
+            return False
+        for axis in self.AXES:
+            code = getattr(features, axis)
+            bucket = self._buckets[axis].get(code)
+            if bucket is not None:
+                bucket.discard(flow_id)
+                if not bucket:
+                    del self._buckets[axis][code]
+        return True
+
+    def entries(self, flow_ids: Iterable[str] | None = None) -> list[tuple[dict[str, Any], TalentFeatures]]:
+        """Consistent copy of the (flow, features) pairs, all or only `flow_ids`, for batch scoring."""
+        with self._lock:
+            ids = self._features.keys() if flow_ids is None else [i for i in flow_ids if i in self._features]
+            return [(self._flows[flow_id], self._features[flow_id]) for flow_id in ids]
+
+    def candidates(self, query: NeedQuery, *, min_score: float) -> set[str]:
+        """Flow ids that can reach `min_score`.
+
+        Mission and domain buckets are always walked. Talents matching neither can only
+        score on mode and timeline, so those buckets are walked only when that remainder
+        can still reach `min_score`; with a non-positive threshold every talent
+        qualifies.
+        """
+        with self._lock:
+            if min_score <= 0:
+                return set(self._features)
+            axes = ["mission", "domain"]
+            if query.upper_bound_without("mission", "domain") >= min_score:
+                axes += ["mode", "timeline"]
+            found: set[str] = set()
+            for axis in axes:
+                buckets = self._buckets[axis]
+                for code, score in getattr(query, axis).items():
+                    if score > 0 and code in buckets:
+                        found |= buckets[code]
+            return found
+
+    def score(self, query: NeedQuery, features: TalentFeatures) -> float:
+        return (
+            query.mission.get(features.mission, 0.0)
+            + query.domain.get(features.domain, 0.0)
+            + query.mode.get(features.mode, 0.0)
+            + query.timeline.get(features.timeline, 0.0)
+        )
+
+    def top_matches(self, query: NeedQuery, *, limit: int, min_score: float) -> tuple[list[tuple[float, dict[str, Any]]], int]:
+        """Best `limit` (score, flow) pairs at or above `min_score`, and how many were scored."""
+        with self._lock:
+            ids = self.candidates(query, min_score=min_score)
+            scored = ((self.score(query, self._features[flow_id]), flow_id) for flow_id in ids)
+            top = heapq.nlargest(limit, (item for item in scored if item[0] >= min_score), key=lambda item: item[0])
+            result = [(score, self._flows[flow_id]) for score, flow_id in top]
+        self.stats["queries"] += 1
+        self.stats["scored"] += len(ids)
+        return result, len(ids)
+
+    def load(self, conn: Any) -> int:
+        """Replace the index content with every onboarded flow, streamed in batches."""
+        started = time.perf_counter()
+        fresh = TalentIndex()
+        fresh.vocab = self.vocab
+        count = 0
+        with conn.cursor(name="koryxa_talent_index", cursor_factory=RealDictCursor) as cur:
+            cur.itersize = _LOAD_BATCH
+            cur.execute(f"select {TALENT_COLUMNS_SQL} from app.trajectory_flows where {TALENT_WHERE_SQL};")
+            for row in cur:
+                fresh.upsert(talent_flow_from_row(dict(row)))
+                count += 1
+        conn.rollback()
+        with self._lock:
+            self._features, self._flows, self._buckets = fresh._features, fresh._flows, fresh._buckets
+        self._loaded_at = time.monotonic()
+        self._last_load_ms = round((time.perf_counter() - started) * 1000, 1)
+        return count
+
+    def refresh(self, conn: Any, flow_ids: Iterable[str]) -> None:
+        ids = sorted(set(flow_ids))
+        if not ids:
+            return
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                f"select {TALENT_COLUMNS_SQL} from app.trajectory_flows where id = any(%s::uuid[]) and {TALENT_WHERE_SQL};",
+                (ids,),
+            )
+            rows = {row["id"]: dict(row) for row in cur.fetchall()}
+        for flow_id in ids:
+            row = rows.get(flow_id)
+            if row is None:
+                self.remove(flow_id)
+            else:
+                self.upsert(talent_flow_from_row(row))
+        self.stats["refreshes"] += len(ids)
+
+    def start_listener(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="talent-index-listener", daemon=True)
+        self._thread.start()
+
+    def stop_listener(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=_LISTEN_POLL_S + 1)
+
+    def _listen_forever(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            loader = None
+            try:
+                conn = connect_pg()
+                loader = connect_pg()
+                if conn is None or loader is None:
+                    return
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"listen {TALENT_CHANNEL};")
+                # Load only once LISTEN is in effect, so no change falls in between.
+                count = self.load(loader)
+                loader.close()
+                loader = None
+                logger.info("Talent index loaded %s flows in %sms", count, self._last_load_ms)
+                self._listening.set()
+                backoff = 1.0
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], _LISTEN_POLL_S) == ([], [], []):
+                        continue
+                    conn.poll()
+                    changed: set[str] = set()
+                    while conn.notifies:
+                        changed.add(conn.notifies.pop(0).payload)
+                    self.refresh(conn, changed)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Talent index listener disconnected: %s", exc)
+            finally:
+                self._listening.clear()
+                for handle in (conn, loader):
+                    if handle is not None:
+                        try:
+                            handle.close()
+                        except Exception:  # noqa: BLE001
+                            pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, _RECONNECT_BACKOFF_MAX_S)
+
+
+_INDEX: TalentIndex | None = None
+
+
+def get_talent_index() -> TalentIndex | None:
+    return _INDEX
+
+
+def start_talent_index() -> None:
+    global _INDEX
+    if not settings.TALENT_INDEX_ENABLED or not async_pg_pool_ready() or _INDEX is not None:
+        return
+    _INDEX = TalentIndex()
+    _INDEX.start_listener()
+
+
+def stop_talent_index() -> None:
+    global _INDEX
+    if _INDEX is not None:
+        _INDEX.stop_listener()
+        _INDEX = None
+
+
+def talent_index_stats() -> dict[str, Any]:
+    return _INDEX.snapshot() if _INDEX is not None else {}
+
+
+async def publish_talent_change(flow_id: str) -> None:
+    """Tell every worker's index to reload one flow; sent after the write commits."""
+    if not flow_id or not async_pg_pool_ready():
+        return
+    try:
+        await db_execute("select pg_notify(%s, %s);", (TALENT_CHANNEL, flow_id))
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Talent index notify failed for %s: %s", flow_id, exc)
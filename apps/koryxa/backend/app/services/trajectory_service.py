@@ -14,6 +14,14 @@ from app.services.ai_json import generate_structured_json
 
 logger = logging.getLogger(__name__)
 
+# Template version of the blueprint prompt (see generate_structured_json).
+BLUEPRINT_PROMPT_VERSION = "1"
+_BLUEPRINT_SCHEMA = {
+    "diagnostic": dict,
+    "progress_plan": dict,
+    "opportunity_targets": list,
+}
+
 VALIDATION_LEVEL_ORDER = {
     "initial": 0,
     "building": 1,
@@ -1349,7 +1357,12 @@ Regles imperatives:
 - Pas de texte hors JSON.
 """.strip()
 
-    generated = await generate_structured_json(prompt)
+    generated = await generate_structured_json(
+        prompt,
+        cache_namespace="trajectory_blueprint",
+        template_version=BLUEPRINT_PROMPT_VERSION,
+        schema=_BLUEPRINT_SCHEMA,
+    )
     if not generated:
         raise BlueprintAIGenerationError(
             "L'IA Blueprint n'a pas produit de reponse JSON exploitable. Aucun fallback n'est autorise."
@@ -5,6 +5,9 @@ import os
 import time
 
 from app.services.alerts_v1 import generate_notifications_now, worker_tick
+from app.services.match_materializer import run_match_refresh
+from app.services.partition_maintenance import run_partition_maintenance
+from app.services.postgres_bootstrap import ensure_match_tables, init_pg_pool
 
 
 logger = logging.getLogger("innovaplus-worker")
@@ -15,8 +18,18 @@ def main() -> int:
     tick_s = float(os.environ.get("WORKER_TICK_S", "3"))
     gen_every_s = float(os.environ.get("WORKER_GENERATE_EVERY_S", "60"))
     batch = int(os.environ.get("WORKER_BATCH", "50"))
+    partition_every_s = float(os.environ.get("WORKER_PARTITION_EVERY_S", "3600"))
+    match_every_s = float(os.environ.get("WORKER_MATCH_EVERY_S", "5"))
+    match_full_every_s = float(os.environ.get("WORKER_MATCH_FULL_EVERY_S", "86400"))
 
+    init_pg_pool()
+    try:
+        ensure_match_tables()
+    except Exception:
+        logger.exception("ensure match tables failed")
     last_gen = 0.0
+    last_partition = 0.0
+    last_match = 0.0
     logger.info("worker started tick_s=%s gen_every_s=%s batch=%s", tick_s, gen_every_s, batch)
 
     while True:
@@ -29,6 +42,23 @@ def main() -> int:
                 logger.exception("generate failed")
             last_gen = now
 
+        if now - last_partition >= partition_every_s:
+            try:
+                stats = run_partition_maintenance()
+                logger.info("partition maintenance %s", stats)
+            except Exception:
+                logger.exception("partition maintenance failed")
+            last_partition = now
+
+        if now - last_match >= match_every_s:
+            try:
+                stats = run_match_refresh(full_every_s=match_full_every_s)
+                if stats:
+                    logger.info("match refresh %s", stats)
+            except Exception:
+                logger.exception("match refresh failed")
+            last_match = now
+
         try:
             stats = worker_tick(batch=batch)
             if stats.get("processed"):
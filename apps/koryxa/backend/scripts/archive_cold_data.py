@@ -0,0 +1,109 @@
+"""Archive cold rows to compressed JSON lines files, verify them, and read them back.
+
+`export` streams rows older than --before from the Postgres sources (notification
+events, sent notifications, chat messages), the data_logging Mongo collections and any
+chat partition detached by retention. Each archive is re-read and checked against its
+manifest (row count and sha256) before anything is removed; rows are only deleted, and
+detached partitions dropped, with --delete.
+
+Usage:
+  cd apps/koryxa/backend
+  python -m scripts.archive_cold_data export --before 2025-10-01 --out /var/backups/koryxa [--source NAME ...] [--delete]
+  python -m scripts.archive_cold_data verify /var/backups/koryxa/notifications_before_20251001_....manifest.json
+  python -m scripts.archive_cold_data read /var/backups/koryxa/notifications_before_20251001_....jsonl.zst [--limit 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from itertools import islice
+
+from app.services.archival import (
+    MONGO_SOURCES,
+    PG_SOURCES,
+    archive_detached_partition,
+    archive_mongo_collection,
+    archive_pg_source,
+    detached_partitions,
+    iter_archive,
+    verify_archive,
+)
+
+
+async def _export(args: argparse.Namespace) -> int:
+    cutoff = datetime.fromisoformat(args.before).replace(tzinfo=timezone.utc)
+    wanted = set(args.source or [])
+    results: dict[str, object] = {}
+
+    for source in PG_SOURCES:
+        if not wanted or source.name in wanted:
+            results[source.name] = archive_pg_source(source, cutoff=cutoff, out_dir=args.out, delete=args.delete)
+
+    if not wanted or "detached_partitions" in wanted:
+        for qualified in detached_partitions():
+            results[qualified] = archive_detached_partition(qualified, out_dir=args.out, drop=args.delete)
+
+    mongo_sources = [name for name in MONGO_SOURCES if not wanted or name in wanted]
+    if mongo_sources:
+        from app.db.mongo import close_mongo_connection, connect_to_mongo, get_db_instance
+
+        await connect_to_mongo()
+        try:
+            for name in mongo_sources:
+                results[name] = await archive_mongo_collection(
+                    get_db_instance(), name, cutoff=cutoff, out_dir=args.out, delete=args.delete
+                )
+        finally:
+            await close_mongo_connection()
+
+    print(json.dumps(results, indent=2, default=str))
+    return 0
+
+
+def _verify(args: argparse.Namespace) -> int:
+    manifest = verify_archive(args.manifest)
+    print(f"ok {manifest['path']}: {manifest['rows']} rows, sha256 {manifest['sha256']}")
+    return 0
+
+
+def _read(args: argparse.Namespace) -> int:
+    for row in islice(iter_archive(args.path), args.limit):
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m scripts.archive_cold_data")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export")
+    export.add_argument("--before", required=True, help="ISO date; rows older than this are archived (UTC)")
+    export.add_argument("--out", required=True, help="directory or fsspec URL, e.g. s3://bucket/koryxa")
+    export.add_argument(
+        "--source",
+        action="append",
+        choices=[s.name for s in PG_SOURCES] + list(MONGO_SOURCES) + ["detached_partitions"],
+    )
+    export.add_argument("--delete", action="store_true", help="delete archived rows once verified")
+
+    verify = commands.add_parser("verify")
+    verify.add_argument("manifest")
+
+    read = commands.add_parser("read")
+    read.add_argument("path")
+    read.add_argument("--limit", type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        return asyncio.run(_export(args))
+    if args.command == "verify":
+        return _verify(args)
+    return _read(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
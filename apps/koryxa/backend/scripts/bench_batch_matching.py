@@ -0,0 +1,99 @@
+"""Compare the scalar `_score_match` path with the NumPy batch scorer.
+
+Builds a synthetic catalogue of needs and onboarded talents from the shared taxonomy
+(plus some free-text and missing values), computes the top matches of every need both
+ways, checks that the scores agree and prints the timings. No database is needed.
+
+Usage:
+  cd apps/koryxa/backend
+  python -m scripts.bench_batch_matching [needs] [talents] [limit]
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from app.services.batch_matching import TalentArrays, batch_top_matches
+from app.services.matching_service import URGENCY_TIMELINE_COMPAT, _score_match
+from app.services.talent_index import TalentIndex
+from app.services.taxonomy import COLLAB_MODE_IDS, DOMAIN_IDS, MISSION_TYPE_IDS
+
+
+NEEDS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+TALENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+LIMIT = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+MIN_SCORE = 0.10
+SCALAR_SAMPLE = 50  # the scalar path is timed on a sample of needs and extrapolated
+
+DOMAINS = sorted(DOMAIN_IDS) + ["", "autre secteur"]
+MISSIONS = sorted(MISSION_TYPE_IDS) + ["", "autre tâche"]
+MODES = sorted(COLLAB_MODE_IDS) + [""]
+TIMELINES = ["3 mois", "6 mois", "1 an", "À mon rythme", ""]
+PREFERENCES = ["Mission courte", "mission longue", "remote", "en équipe", "retainer", "", "au cas par cas"]
+
+
+def _catalogue(rnd: random.Random) -> tuple[list[dict], list[dict]]:
+    needs = [
+        {
+            "_id": f"need-{i}",
+            "domain": rnd.choice(DOMAINS),
+            "treatment_preference": rnd.choice(PREFERENCES),
+            "urgency": rnd.choice(list(URGENCY_TIMELINE_COMPAT) + [""]),
+        }
+        for i in range(NEEDS)
+    ]
+    talents = [
+        {
+            "_id": f"flow-{i}",
+            "onboarding": {
+                "current_sector": rnd.choice(DOMAINS),
+                "main_task": rnd.choice(MISSIONS),
+                "work_mode": rnd.choice(MODES),
+                "target_timeline": rnd.choice(TIMELINES),
+            },
+        }
+        for i in range(TALENTS)
+    ]
+    return needs, talents
+
+
+def _scalar_top(need: dict, talents: list[dict]) -> list[float]:
+    scored = [score for score in (_score_match(need, flow) for flow in talents) if score >= MIN_SCORE]
+    scored.sort(reverse=True)
+    return scored[:LIMIT]
+
+
+def main() -> None:
+    needs, talents = _catalogue(random.Random(42))
+    index = TalentIndex()
+
+    started = time.perf_counter()
+    arrays = TalentArrays.from_entries((flow, index.encode(flow)) for flow in talents)
+    encode_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = batch_top_matches(needs, arrays, index.vocab, limit=LIMIT, min_score=MIN_SCORE)
+    batch_s = time.perf_counter() - started
+
+    sample = needs[:SCALAR_SAMPLE]
+    started = time.perf_counter()
+    scalar = [_scalar_top(need, talents) for need in sample]
+    scalar_s = (time.perf_counter() - started) * len(needs) / len(sample)
+
+    # Ties may pick different talents; the score lists must match exactly.
+    mismatches = sum(1 for want, got in zip(scalar, batch) if want != [score for score, _ in got])
+
+    print(f"{NEEDS} needs x {TALENTS} talents, top {LIMIT}, min_score {MIN_SCORE}")
+    print(f"  encode talents : {encode_s * 1000:9.1f} ms")
+    print(f"  batch (numpy)  : {batch_s * 1000:9.1f} ms")
+    print(f"  scalar (est.)  : {scalar_s * 1000:9.1f} ms  ({len(sample)} needs timed)")
+    print(f"  speedup        : {scalar_s / batch_s:9.1f}x")
+    print(f"  mismatches     : {mismatches}/{len(sample)}")
+    if mismatches:
+        raise SystemExit("batch and scalar scores disagree")
+
+
+if __name__ == "__main__":
+    main()
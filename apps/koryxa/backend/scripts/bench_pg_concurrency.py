@@ -0,0 +1,67 @@
+"""Compare request throughput of the sync and async Postgres helpers under concurrency.
+
+Each simulated request runs one query that takes QUERY_MS on the server. The sync
+helpers are called straight from a coroutine, as the route handlers used to, so they
+serialise on the event loop; the async pool is measured at several sizes.
+
+Usage:
+  cd apps/koryxa/backend
+  DATABASE_URL=postgresql://... python -m scripts.bench_pg_concurrency [requests] [query_ms]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import time
+
+from app.services import postgres_async, postgres_bootstrap
+
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+QUERY_MS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+POOL_SIZES = (1, 5, 10, 20)
+SQL = "select pg_sleep(%s) as slept;"
+
+
+async def _sync_request() -> None:
+    postgres_bootstrap.db_fetchone(SQL, (QUERY_MS / 1000,))
+
+
+async def _async_request() -> None:
+    await postgres_async.db_fetchone(SQL, (QUERY_MS / 1000,))
+
+
+async def _run(label: str, request) -> None:
+    await request()  # warm a connection outside the measurement
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<18} {REQUESTS / elapsed:8.1f} req/s  ({elapsed:.2f}s for {REQUESTS} requests)")
+
+
+async def main() -> None:
+    print(f"{REQUESTS} concurrent requests, {QUERY_MS} ms per query")
+
+    os.environ["PGPOOL_MAX"] = str(max(POOL_SIZES))
+    postgres_bootstrap.init_pg_pool()
+    if not postgres_bootstrap.pg_pool_ready():
+        raise SystemExit("DATABASE_URL is not set or unreachable")
+    try:
+        await _run("sync helpers", _sync_request)
+    finally:
+        postgres_bootstrap.close_pg_pool()
+
+    for size in POOL_SIZES:
+        os.environ["PG_ASYNC_POOL_MIN"] = str(size)
+        os.environ["PG_ASYNC_POOL_MAX"] = str(size)
+        await postgres_async.init_async_pg_pool()
+        try:
+            await _run(f"async pool={size}", _async_request)
+        finally:
+            await postgres_async.close_async_pg_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""Check read-replica routing against two local Postgres instances.
+
+The two instances do not need to replicate: each gets a probe table holding its own
+label, so every read shows which pool served it. A standalone instance reports zero
+lag, and lag above the threshold is forced through the router.
+
+Usage:
+  cd apps/koryxa/backend
+  DATABASE_URL=postgresql://localhost:5432/postgres?sslmode=disable \\
+  DATABASE_REPLICA_URL=postgresql://localhost:5433/postgres?sslmode=disable \\
+  python -m scripts.check_pg_replica_routing
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import psycopg2
+
+from app.services import postgres_async, postgres_bootstrap
+from app.services.pg_routing import ROUTER, begin_route_state, replica_dsn, reset_route_state
+
+
+PROBE_TABLE = "public.koryxa_routing_probe"
+PROBE_SQL = f"select label from {PROBE_TABLE} limit 1;"
+FAILURES: list[str] = []
+
+
+def _seed(dsn: str, label: str | None) -> None:
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"drop table if exists {PROBE_TABLE};")
+        if label is not None:
+            cur.execute(f"create table {PROBE_TABLE} (label text not null);")
+            cur.execute(f"insert into {PROBE_TABLE}(label) values (%s);", (label,))
+    conn.close()
+
+
+def _expect(case: str, served_by: str | None, expected: str) -> None:
+    ok = served_by == expected
+    print(f"{'ok  ' if ok else 'FAIL'} {case}: served by {served_by}, expected {expected}")
+    if not ok:
+        FAILURES.append(case)
+
+
+def _sync_read() -> str | None:
+    row = postgres_bootstrap.db_fetchone_read(PROBE_SQL)
+    return row["label"] if row else None
+
+
+async def _async_read() -> str | None:
+    row = await postgres_async.db_fetchone_read(PROBE_SQL)
+    return row["label"] if row else None
+
+
+def _check_sync() -> None:
+    _expect("sync read, no request state", _sync_read(), "replica")
+
+    state, token = begin_route_state(pinned=False)
+    try:
+        postgres_bootstrap.db_execute(f"update {PROBE_TABLE} set label = label;")
+        _expect("sync read after a write in the same request", _sync_read(), "primary")
+        print(f"{'ok  ' if state.wrote else 'FAIL'} write flags the request for the pin cookie")
+        if not state.wrote:
+            FAILURES.append("pin cookie flag")
+    finally:
+        reset_route_state(token)
+
+    _, token = begin_route_state(pinned=True)
+    try:
+        _expect("sync read with pin cookie", _sync_read(), "primary")
+    finally:
+        reset_route_state(token)
+
+    ROUTER.record_lag(ROUTER.max_lag_s + 1)
+    _expect("sync read while replica lags", _sync_read(), "primary")
+
+
+async def _check_async() -> None:
+    await postgres_async.init_async_pg_pool()
+    try:
+        _expect("async read, no request state", await _async_read(), "replica")
+
+        _, token = begin_route_state(pinned=False)
+        try:
+            await postgres_async.db_execute(f"update {PROBE_TABLE} set label = label;")
+            _expect("async read after a write in the same request", await _async_read(), "primary")
+        finally:
+            reset_route_state(token)
+
+        ROUTER.record_lag(ROUTER.max_lag_s + 1)
+        _expect("async read while replica lags", await _async_read(), "primary")
+    finally:
+        await postgres_async.close_async_pg_pool()
+
+
+def _wait_for_lag_sample() -> None:
+    ROUTER.record_lag(None)
+    deadline = time.monotonic() + ROUTER.lag_check_s * 3
+    while time.monotonic() < deadline and not ROUTER.stats()["replica_fresh"]:
+        time.sleep(0.1)
+
+
+def main() -> None:
+    primary_dsn = postgres_bootstrap._resolve_database_url()
+    if not primary_dsn or not replica_dsn():
+        raise SystemExit("DATABASE_URL and DATABASE_REPLICA_URL must both be set")
+    _seed(primary_dsn, "primary")
+    _seed(replica_dsn(), "replica")
+    postgres_bootstrap.init_pg_pool()
+    try:
+        _wait_for_lag_sample()
+        _check_sync()
+        _wait_for_lag_sample()
+        asyncio.run(_check_async())
+        print(json.dumps(ROUTER.stats(), indent=2))
+    finally:
+        postgres_bootstrap.close_pg_pool()
+        _seed(primary_dsn, None)
+        _seed(replica_dsn(), None)
+    if FAILURES:
+        raise SystemExit(f"{len(FAILURES)} routing check(s) failed")
+
+
+if __name__ == "__main__":
+    main()
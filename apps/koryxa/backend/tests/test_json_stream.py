@@ -0,0 +1,38 @@
+import pytest
+
+from app.core.ai import StopGeneration
+from app.services.json_stream import JsonObjectStream
+
+
+def _feed(stream: JsonObjectStream, text: str, size: int = 7) -> bool:
+    for start in range(0, len(text), size):
+        try:
+            stream.feed(text[start:start + size])
+        except StopGeneration:
+            return True
+    return False
+
+
+def test_prose_with_braces_then_fenced_json_block():
+    text = 'Format attendu {titre, score} :\n```json\n{"titre": "A", "score": 3}\n```'
+    stream = JsonObjectStream(schema={"titre": str, "score": int})
+
+    assert _feed(stream, text)
+    assert stream.result == {"titre": "A", "score": 3}
+    assert stream.skipped == 1
+
+
+def test_coerces_scalars_and_stops_after_object():
+    stream = JsonObjectStream(schema={"score": int, "ok": bool})
+
+    assert _feed(stream, 'Voici : {"score": "72", "ok": "true", "tags": ["a", "b"]} fin')
+    assert stream.result == {"score": 72, "ok": True, "tags": ["a", "b"]}
+    with pytest.raises(StopGeneration):
+        stream.feed("encore")
+
+
+def test_unbalanced_output_leaves_result_empty():
+    stream = JsonObjectStream()
+
+    assert not _feed(stream, '{"titre": "A", "score": ')
+    assert stream.result is None
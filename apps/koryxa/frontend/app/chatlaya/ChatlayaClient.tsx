@@ -370,6 +370,8 @@ function ChatlayaContent({ initialAutonomousHost = false }: { initialAutonomousH
   const [streaming, setStreaming] = useState(false);
   const [conversationsLoading, setConversationsLoading] = useState(true);
   const [messagesLoading, setMessagesLoading] = useState(false);
+  const [olderPage, setOlderPage] = useState<{ conversationId: string; cursor: string } | null>(null);
+  const [olderLoading, setOlderLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [accessMode, setAccessMode] = useState<"guest" | "user" | null>(null);
   const [founderAuthRequired, setFounderAuthRequired] = useState(false);
@@ -389,6 +391,8 @@ function ChatlayaContent({ initialAutonomousHost = false }: { initialAutonomousH
   const typewriterTimerRef = useRef<number | null>(null);
   const typewriterDrainWaitersRef = useRef<Array<() => void>>([]);
   const autonomousFounderBootRef = useRef(false);
+  const activeConversationRef = useRef<string | null>(null);
+  const restoreScrollHeightRef = useRef<number | null>(null);
 
   function focusComposer(preventScroll = false) {
     const composer = composerRef.current;
@@ -604,17 +608,51 @@ function ChatlayaContent({ initialAutonomousHost = false }: { initialAutonomousH
       }
       setError(null);
       setMessages(Array.isArray(data?.items) ? data.items : []);
+      // The API returns the latest page; older pages load when scrolling to the top.
+      setOlderPage(data?.next_cursor ? { conversationId, cursor: data.next_cursor } : null);
       // Auto-redirect: founder conversations always open as workspace, not chat
       const conv = conversations.find((c) => c.conversation_id === conversationId);
       setFounderWorkspaceVisible(conv?.assistant_mode === "launch_structure_sell" && !!user);
     } catch (err) {
       setError(err instanceof Error ? err.message : "Erreur inattendue.");
       setMessages([]);
+      setOlderPage(null);
     } finally {
       setMessagesLoading(false);
     }
   }
 
+  async function loadOlderMessages() {
+    const page = olderPage;
+    if (!page || olderLoading || page.conversationId !== selectedConversationId) return;
+    setOlderLoading(true);
+    try {
+      const response = await fetch(
+        apiUrl(
+          `/chatlaya/messages?conversation_id=${encodeURIComponent(page.conversationId)}&cursor=${encodeURIComponent(page.cursor)}`,
+        ),
+        { cache: "no-store", credentials: "include" },
+      );
+      if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data?.detail || "Impossible de récupérer les messages précédents.");
+      }
+      const data = await response.json().catch(() => ({}));
+      if (activeConversationRef.current !== page.conversationId) return;
+      const older: ChatMessage[] = Array.isArray(data?.items) ? data.items : [];
+      restoreScrollHeightRef.current = messagesViewportRef.current?.scrollHeight ?? null;
+      setMessages((current) => {
+        const known = new Set(current.map((item) => item.id));
+        return [...older.filter((item) => !known.has(item.id)), ...current];
+      });
+      setOlderPage(data?.next_cursor ? { conversationId: page.conversationId, cursor: data.next_cursor } : null);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "Erreur inattendue.");
+    } finally {
+      setOlderLoading(false);
+    }
+  }
+
   useEffect(() => {
     if (bootstrappedRef.current) return;
     if (isAutonomousHost && authLoading) return;
@@ -633,6 +671,8 @@ function ChatlayaContent({ initialAutonomousHost = false }: { initialAutonomousH
   }, []);
 
   useEffect(() => {
+    activeConversationRef.current = selectedConversationId;
+    setOlderPage(null);
     if (!selectedConversationId) {
       setMessages([]);
       return;
@@ -645,6 +685,13 @@ function ChatlayaContent({ initialAutonomousHost = false }: { initialAutonomousH
   useEffect(() => {
     const viewport = messagesViewportRef.current;
     if (!viewport) return;
+    const previousHeight = restoreScrollHeightRef.current;
+    if (previousHeight !== null) {
+      // Older messages were prepended: keep the same messages in view.
+      restoreScrollHeightRef.current = null;
+      viewport.scrollTop += viewport.scrollHeight - previousHeight;
+      return;
+    }
     viewport.scrollTo({ top: viewport.scrollHeight, behavior: streaming ? "auto" : "smooth" });
   }, [messages.length, latestMessageContent, streaming]);
 
@@ -1285,6 +1332,9 @@ function ChatlayaContent({ initialAutonomousHost = false }: { initialAutonomousH
         {/* Messages viewport */}
         <div
           ref={messagesViewportRef}
+          onScroll={(event) => {
+            if (event.currentTarget.scrollTop < 120) void loadOlderMessages();
+          }}
           className="sidebar-nav min-h-0 flex-1 overflow-y-auto overscroll-y-contain touch-pan-y px-4 py-5 [scrollbar-gutter:stable] [-webkit-overflow-scrolling:touch] sm:px-5"
         >
           {founderAuthRequired ? (
@@ -1357,6 +1407,9 @@ function ChatlayaContent({ initialAutonomousHost = false }: { initialAutonomousH
             </div>
           ) : (
             <div className="mx-auto flex w-full max-w-3xl flex-col gap-4">
+              {olderLoading ? (
+                <p className="text-center text-xs text-slate-400">Chargement des messages précédents…</p>
+              ) : null}
               {messages.map((message) => {
                 const isUser = message.role === "user";
                 const isCopied = copiedId === message.id;
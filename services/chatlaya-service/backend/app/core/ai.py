@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import hashlib
 import json
 import logging
+import socket
+import threading
 import urllib.request
 from typing import Any, Callable, Dict, List, Optional, Sequence
 
@@ -16,6 +20,102 @@ SYSTEM_PROMPT = (
 
 logger = logging.getLogger(__name__)
 FALLBACK_REPLY = "Je rencontre un probleme technique pour le moment. Merci de reessayer plus tard."
+ORPHAN_GRACE_SECONDS = 2.0
+
+_GENERATION_STATS: dict[str, int] = {
+    "started": 0,
+    "completed": 0,
+    "cancelled_timeout": 0,
+    "cancelled_client": 0,
+    "orphaned": 0,
+    "running_after_cancel": 0,
+}
+
+
+class GenerationCancelled(RuntimeError):
+    pass
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared between the event loop and a provider worker thread.
+
+    Providers register abort callbacks (e.g. shutting down the upstream socket) so a blocked
+    read returns immediately instead of waiting for the provider to finish generating.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as exc:  # noqa: BLE001
+                logger.debug("Generation abort callback failed: %s", exc)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def _unregister() -> None:
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+
+                return _unregister
+        callback()
+        return lambda: None
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise GenerationCancelled(f"Generation cancelled ({self.reason})")
+
+
+def _abort_http_response(response: Any) -> None:
+    # Shutting the connection down unblocks a pending recv() in the worker thread and
+    # makes Ollama / the gateway see the disconnect, which stops generation upstream.
+    # The socket is reached through the public `fileno()`: shutdown() on a duplicate
+    # descriptor acts on the shared connection. If the response no longer exposes one,
+    # fall back to `close()`, which takes effect once the worker's read returns.
+    try:
+        sock = socket.fromfd(response.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+    except (AttributeError, OSError, ValueError):
+        try:
+            response.close()
+        except Exception:  # noqa: BLE001
+            pass
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+def _watch_response(response: Any, cancel_token: "CancelToken | None") -> Callable[[], None]:
+    if cancel_token is None:
+        return lambda: None
+    return cancel_token.on_cancel(lambda: _abort_http_response(response))
+
+
+def generation_stats() -> dict[str, int]:
+    return dict(_GENERATION_STATS)
 
 
 def _hash_to_float32(seed: bytes) -> float:
@@ -113,6 +213,7 @@ def _call_ollama_generate(
     timeout: int,
     max_new_tokens: int | None = None,
     on_token: Optional[Callable[[str], None]] = None,
+    cancel_token: CancelToken | None = None,
 ) -> str:
     base_url = (settings.OLLAMA_BASE_URL or "http://127.0.0.1:11434").rstrip("/")
     url = f"{base_url}/api/generate"
@@ -122,6 +223,7 @@ def _call_ollama_generate(
         "raw": True,
         "prompt": prompt,
         "stream": bool(on_token),
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE,
         "options": {
             "temperature": 0.4,
             "top_p": 0.9,
@@ -137,26 +239,38 @@ def _call_ollama_generate(
         method="POST",
     )
 
+    if cancel_token:
+        cancel_token.raise_if_cancelled()
     with urllib.request.urlopen(request, timeout=timeout) as response:
-        if on_token:
-            chunks: list[str] = []
-            for raw_line in response:
-                line = raw_line.decode("utf-8", errors="replace").strip()
-                if not line:
-                    continue
-                parsed = json.loads(line)
-                token = str(parsed.get("response") or "")
-                if token:
-                    chunks.append(token)
-                    on_token(token)
-                if parsed.get("done"):
-                    break
-            text = "".join(chunks).strip()
-            if not text:
-                raise RuntimeError("Ollama returned an empty streamed response")
-            return text
+        unwatch = _watch_response(response, cancel_token)
+        try:
+            if on_token:
+                chunks: list[str] = []
+                for raw_line in response:
+                    if cancel_token:
+                        cancel_token.raise_if_cancelled()
+                    line = raw_line.decode("utf-8", errors="replace").strip()
+                    if not line:
+                        continue
+                    parsed = json.loads(line)
+                    token = str(parsed.get("response") or "")
+                    if token:
+                        chunks.append(token)
+                        on_token(token)
+                    if parsed.get("done"):
+                        break
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                text = "".join(chunks).strip()
+                if not text:
+                    raise RuntimeError("Ollama returned an empty streamed response")
+                return text
 
-        body = response.read().decode("utf-8")
+            body = response.read().decode("utf-8")
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+        finally:
+            unwatch()
 
     parsed = json.loads(body)
     text = (parsed.get("response") or "").strip()
@@ -169,6 +283,7 @@ def _call_ai_gateway_chat(
     timeout: int | None = None,
     max_new_tokens: int | None = None,
     on_token: Optional[Callable[[str], None]] = None,
+    cancel_token: CancelToken | None = None,
 ) -> str:
     base_url = (settings.AI_GATEWAY_BASE_URL or "").rstrip("/")
     api_key = settings.AI_GATEWAY_API_KEY
@@ -218,43 +333,56 @@ def _call_ai_gateway_chat(
             or ""
         )
 
+    if cancel_token:
+        cancel_token.raise_if_cancelled()
     try:
         with urllib.request.urlopen(
             req,
             timeout=timeout or settings.AI_GATEWAY_TIMEOUT_SECONDS,
         ) as resp:
-            if on_token:
-                chunks: list[str] = []
-                for raw_line in resp:
-                    line = raw_line.decode("utf-8", errors="replace").strip()
-                    if not line:
-                        continue
-                    if line.startswith("data:"):
-                        line = line[5:].strip()
-                    if line == "[DONE]":
-                        break
-                    try:
-                        parsed_line = json.loads(line)
-                    except json.JSONDecodeError:
-                        token = line
-                    else:
-                        token = _extract_stream_token(parsed_line)
-                    if token:
-                        chunks.append(token)
-                        on_token(token)
-                streamed_text = "".join(chunks).strip()
-                if streamed_text:
-                    return streamed_text
-
-            raw = resp.read().decode("utf-8", errors="replace")
+            unwatch = _watch_response(resp, cancel_token)
+            try:
+                if on_token:
+                    chunks: list[str] = []
+                    for raw_line in resp:
+                        if cancel_token:
+                            cancel_token.raise_if_cancelled()
+                        line = raw_line.decode("utf-8", errors="replace").strip()
+                        if not line:
+                            continue
+                        if line.startswith("data:"):
+                            line = line[5:].strip()
+                        if line == "[DONE]":
+                            break
+                        try:
+                            parsed_line = json.loads(line)
+                        except json.JSONDecodeError:
+                            token = line
+                        else:
+                            token = _extract_stream_token(parsed_line)
+                        if token:
+                            chunks.append(token)
+                            on_token(token)
+                    if cancel_token:
+                        cancel_token.raise_if_cancelled()
+                    streamed_text = "".join(chunks).strip()
+                    if streamed_text:
+                        return streamed_text
+
+                raw = resp.read().decode("utf-8", errors="replace")
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+            finally:
+                unwatch()
     except urllib.error.HTTPError as exc:
-        if on_token:
+        if on_token and not (cancel_token and cancel_token.cancelled):
             logger.warning("AI gateway streaming failed with HTTP %s, retrying without stream", exc.code)
             return _call_ai_gateway_chat(
                 prompt=prompt,
                 timeout=timeout,
                 max_new_tokens=max_new_tokens,
                 on_token=None,
+                cancel_token=cancel_token,
             )
         body = exc.read().decode("utf-8", errors="replace")
         raise RuntimeError(f"AI gateway HTTP {exc.code}: {body[:500]}") from exc
@@ -280,6 +408,29 @@ def _call_ai_gateway_chat(
     return str(response).strip()
 
 
+def warm_up_provider() -> None:
+    """Load the Ollama chat model ahead of the first turn and pin it for `OLLAMA_KEEP_ALIVE`."""
+    provider_name = (settings.CHAT_PROVIDER or settings.LLM_PROVIDER or "").lower()
+    if provider_name != "ollama" or not settings.OLLAMA_KEEP_ALIVE:
+        return
+    base_url = (settings.OLLAMA_BASE_URL or "http://127.0.0.1:11434").rstrip("/")
+    payload = {
+        "model": settings.CHAT_MODEL or settings.LLM_MODEL or "chatlaya-gemma4-e4b",
+        "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+    }
+    request = urllib.request.Request(
+        f"{base_url}/api/generate",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=settings.LLM_TIMEOUT) as response:
+            response.read()
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Ollama warm-up failed: %s", exc)
+
+
 def generate_answer(
     prompt: str,
     provider: str | None = None,
@@ -290,6 +441,7 @@ def generate_answer(
     context: str | None = None,
     rag_sources: Optional[List[Dict[str, Any]]] = None,
     on_token: Optional[Callable[[str], None]] = None,
+    cancel_token: CancelToken | None = None,
 ) -> str:
     _ = (max_new_tokens, context, rag_sources)
     provider_name = (provider or settings.CHAT_PROVIDER or settings.LLM_PROVIDER or "echo").lower()
@@ -311,6 +463,7 @@ def generate_answer(
             timeout=timeout or settings.AI_GATEWAY_TIMEOUT_SECONDS,
             max_new_tokens=max_new_tokens,
             on_token=on_token,
+            cancel_token=cancel_token,
         )
 
     if provider_name == "ollama":
@@ -329,11 +482,16 @@ def generate_answer(
                 timeout=timeout or settings.LLM_TIMEOUT,
                 max_new_tokens=max_new_tokens,
                 on_token=on_token,
+                cancel_token=cancel_token,
             )
             if text and on_token and provider_name != "ollama":
                 on_token(text)
             return text
+        except GenerationCancelled:
+            raise
         except Exception as exc:  # noqa: BLE001
+            if cancel_token and cancel_token.cancelled:
+                raise GenerationCancelled(f"Ollama generation cancelled ({cancel_token.reason})") from exc
             logger.warning("Ollama chat failed, returning explicit error: %s", exc)
             raise RuntimeError(f"Ollama failed: {exc}") from exc
 
@@ -348,15 +506,21 @@ def generate_answer(
                         (msg["content"] for msg in reversed(history) if msg.get("role") == "user"),
                         effective_prompt,
                     )
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
                 resp = client.chat(
                     model=mdl,
                     message=last_user,
                     preamble=SYSTEM_PROMPT,
                 )
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
                 text = getattr(resp, "text", None) or str(resp)
                 if text and on_token:
                     on_token(text)
                 return text
+            except GenerationCancelled:
+                raise
             except Exception as exc:  # noqa: BLE001
                 logger.warning("Cohere chat failed, returning explicit error: %s", exc)
                 raise RuntimeError(f"Cohere failed: {exc}") from exc
@@ -378,6 +542,77 @@ def generate_answer(
     return FALLBACK_REPLY
 
 
+def _track_orphan(future: "asyncio.Future[str]", cancel_token: CancelToken) -> None:
+    if future.done():
+        return
+    _GENERATION_STATS["running_after_cancel"] += 1
+    loop = asyncio.get_running_loop()
+
+    def _check_orphan() -> None:
+        if not future.done():
+            _GENERATION_STATS["orphaned"] += 1
+            logger.warning(
+                "Generation still running %.1fs after cancellation (%s)",
+                ORPHAN_GRACE_SECONDS,
+                cancel_token.reason,
+            )
+
+    handle = loop.call_later(ORPHAN_GRACE_SECONDS, _check_orphan)
+
+    def _on_done(done: "asyncio.Future[str]") -> None:
+        _GENERATION_STATS["running_after_cancel"] -= 1
+        handle.cancel()
+        if not done.cancelled():
+            done.exception()
+
+    future.add_done_callback(_on_done)
+
+
+async def generate_answer_async(
+    prompt: str,
+    provider: str | None = None,
+    model: str | None = None,
+    timeout: int | None = None,
+    max_new_tokens: int | None = None,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Run `generate_answer` in a worker thread and abort the provider request on timeout or cancellation."""
+    cancel_token = CancelToken()
+    effective_timeout = timeout or settings.LLM_TIMEOUT
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        None,
+        functools.partial(
+            generate_answer,
+            prompt,
+            provider,
+            model,
+            effective_timeout,
+            max_new_tokens,
+            None,
+            None,
+            None,
+            on_token,
+            cancel_token=cancel_token,
+        ),
+    )
+    _GENERATION_STATS["started"] += 1
+    try:
+        text = await asyncio.wait_for(asyncio.shield(future), timeout=effective_timeout)
+    except asyncio.TimeoutError:
+        _GENERATION_STATS["cancelled_timeout"] += 1
+        cancel_token.cancel("timeout")
+        _track_orphan(future, cancel_token)
+        raise
+    except asyncio.CancelledError:
+        _GENERATION_STATS["cancelled_client"] += 1
+        cancel_token.cancel("client")
+        _track_orphan(future, cancel_token)
+        raise
+    _GENERATION_STATS["completed"] += 1
+    return text
+
+
 def detect_embed_dim() -> int:
     try:
         vector = embed_texts(["dimension_probe"], dim=None)[0]
@@ -19,7 +19,31 @@ class Settings(BaseSettings):
     LLM_MODEL: str | None = None
     LLM_TIMEOUT: int = 30
     LLM_MAX_NEW_TOKENS: int = 280
+    CHAT_STREAM_FLUSH_BYTES: int = 96
+    CHAT_STREAM_FLUSH_INTERVAL_MS: int = 40
+    CHAT_STREAM_MAX_PENDING_FRAMES: int = 256
+    CHATLAYA_WRITE_BEHIND_ENABLED: bool = True
+    CHATLAYA_WRITE_BEHIND_FLUSH_MS: int = 100
+    CHATLAYA_WRITE_BEHIND_BATCH_SIZE: int = 50
+    CHATLAYA_WRITE_BEHIND_MAX_PENDING: int = 1000
+    CHAT_HISTORY_TOKEN_BUDGET: int = 700
+    CHAT_SUMMARY_ENABLED: bool = True
+    CHAT_SUMMARY_KEEP_RECENT: int = 6
+    CHAT_SUMMARY_FOLD_BATCH: int = 6
+    CHAT_SUMMARY_MAX_CHARS: int = 1200
+    CHAT_SUMMARY_TIMEOUT_S: int = 30
+    CHAT_CONTEXT_WINDOW: int = 8192
+    CHAT_PROMPT_SYSTEM_RESERVE: int = 1200
+    CHAT_WEB_CONTEXT_MAX_TOKENS: int = 500
+    CHAT_PRODUCT_CONTEXT_MAX_TOKENS: int = 400
+    CHAT_TOKENIZER: str | None = None
+    CHAT_TOKENIZER_LOCAL_ONLY: bool = True
+    CHAT_ANSWER_CACHE_MODES: str = "launch_structure_sell"
+    CHAT_ANSWER_CACHE_SIMILARITY: float = 0.9
+    CHAT_ANSWER_CACHE_TTL_S: int = 86400
+    CHAT_ANSWER_CACHE_MAX_ENTRIES: int = 2000
     OLLAMA_BASE_URL: str = "http://127.0.0.1:11434"
+    OLLAMA_KEEP_ALIVE: str = "30m"
     AI_GATEWAY_BASE_URL: str | None = None
     AI_GATEWAY_API_KEY: str | None = None
     AI_GATEWAY_TIMEOUT_SECONDS: int = 120
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 
 from pathlib import Path
@@ -13,9 +14,11 @@ load_dotenv(BASE_DIR / '.env')
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.ai import warm_up_provider
 from app.core.config import settings
 from app.routers.chatlaya import router as chatlaya_router
 from app.routers.health import router as health_router
+from app.services.chatlaya_write_behind import start_message_writer, stop_message_writer
 from app.services.postgres_bootstrap import close_pool, db_configured, init_pool
 
 
@@ -51,14 +54,17 @@ async def chatlaya_options(path: str) -> dict[str, bool]:
 
 @app.on_event("startup")
 async def on_startup() -> None:
+    asyncio.get_running_loop().run_in_executor(None, warm_up_provider)
     if not db_configured():
         logger.info("chatlaya-service startup without DATABASE_URL; DB pool not initialized")
         return
-    await init_pool()
+    if await init_pool() is not None:
+        await start_message_writer()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await stop_message_writer()
     await close_pool()
 
 
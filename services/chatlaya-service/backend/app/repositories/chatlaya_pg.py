@@ -130,10 +130,19 @@ async def list_conversations(
     user_id: str | None,
     guest_id: str | None,
     limit: int,
-    offset: int,
+    before: tuple[datetime, str] | None = None,
+    offset: int = 0,
 ) -> list[dict[str, Any]]:
+    """Most recently updated conversations first, continuing after the `before` key.
+
+    `offset` only serves the deprecated `?page=` parameter of the conversations route.
+    """
     pool = _get_pool_or_raise()
     where_sql, params = _owner_where_clause(user_id=user_id, guest_id=guest_id)
+    keyset_sql = ""
+    if before is not None:
+        keyset_sql = f"and (updated_at, id) < (${len(params) + 1}::timestamptz, ${len(params) + 2}::uuid)"
+        params = (*params, *before)
     async with pool.acquire() as conn:
         rows = await conn.fetch(
             f"""
@@ -141,7 +150,8 @@ async def list_conversations(
         from app.chatlaya_conversations
         where {where_sql}
           and archived = false
-        order by updated_at desc
+          {keyset_sql}
+        order by updated_at desc, id desc
         limit ${len(params) + 1} offset ${len(params) + 2};
         """,
             *params,
@@ -162,7 +172,8 @@ async def get_conversation(
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
             f"""
-        select id::text as id, guest_id, user_id::text as user_id, title, assistant_mode, archived, created_at, updated_at
+        select id::text as id, guest_id, user_id::text as user_id, title, assistant_mode, archived, created_at, updated_at,
+               summary, summary_until
         from app.chatlaya_conversations
         where id = $1::uuid
           and {where_sql}
@@ -305,18 +316,130 @@ async def create_message(
     return _normalize_message(_record_to_dict(row)) or {}
 
 
-async def list_messages(*, conversation_id: str) -> list[dict[str, Any]]:
+async def create_message_and_touch_conversation(
+    *,
+    conversation_id: str,
+    role: str,
+    content: str,
+    user_id: str | None,
+    guest_id: str | None,
+    meta: dict[str, Any] | None,
+    title: str,
+    created_at: datetime,
+    message_id: str | None = None,
+) -> dict[str, Any]:
     pool = _get_pool_or_raise()
+    message_id = message_id or str(uuid4())
     async with pool.acquire() as conn:
-        rows = await conn.fetch(
+        row = await conn.fetchrow(
             """
+        with inserted as (
+          insert into app.chatlaya_messages(
+            id, conversation_id, guest_id, user_id, role, content, meta, created_at
+          )
+          values ($1::uuid, $2::uuid, $3, $4::uuid, $5, $6, $7::jsonb, $8)
+          returning id::text as id, conversation_id::text as conversation_id, guest_id, user_id::text as user_id, role, content, meta, created_at
+        ), touched as (
+          update app.chatlaya_conversations
+          set title = $9,
+              updated_at = $8
+          where id = $2::uuid
+          returning id
+        )
+        select inserted.* from inserted;
+        """,
+            message_id,
+            conversation_id,
+            guest_id,
+            user_id,
+            role,
+            content,
+            json.dumps(meta or {}, default=str),
+            created_at,
+            title,
+        )
+    return _normalize_message(_record_to_dict(row)) or {}
+
+
+async def insert_messages_batch(messages: list[dict[str, Any]]) -> None:
+    if not messages:
+        return
+    pool = _get_pool_or_raise()
+    async with pool.acquire() as conn:
+        await conn.execute(
+            """
+        with batch as (
+          select *
+          from unnest(
+            $1::uuid[], $2::uuid[], $3::text[], $4::uuid[], $5::text[], $6::text[], $7::jsonb[], $8::timestamptz[], $9::text[]
+          ) as t(id, conversation_id, guest_id, user_id, role, content, meta, created_at, title)
+        ), inserted as (
+          insert into app.chatlaya_messages(
+            id, conversation_id, guest_id, user_id, role, content, meta, created_at
+          )
+          select id, conversation_id, guest_id, user_id, role, content, meta, created_at
+          from batch
+          on conflict do nothing
+          returning conversation_id
+        )
+        update app.chatlaya_conversations c
+        set title = latest.title,
+            updated_at = latest.created_at
+        from (
+          select distinct on (conversation_id) conversation_id, title, created_at
+          from batch
+          order by conversation_id, created_at desc
+        ) latest
+        where c.id = latest.conversation_id
+          and c.updated_at < latest.created_at;
+        """,
+            [item["id"] for item in messages],
+            [item["conversation_id"] for item in messages],
+            [item.get("guest_id") for item in messages],
+            [item.get("user_id") for item in messages],
+            [item["role"] for item in messages],
+            [item["content"] for item in messages],
+            [json.dumps(item.get("meta") or {}, default=str) for item in messages],
+            [item["created_at"] for item in messages],
+            [item["title"] for item in messages],
+        )
+
+
+async def list_messages(
+    *,
+    conversation_id: str,
+    limit: int,
+    before: tuple[datetime, str] | None = None,
+) -> list[dict[str, Any]]:
+    """The `limit` latest messages older than the `before` key, in chronological order.
+
+    Messages are partitioned by month on created_at: the conversation's creation (less a
+    day for clock skew) bounds the scan from below and the keyset from above, so only
+    the partitions in between are read.
+    """
+    pool = _get_pool_or_raise()
+    params: tuple[Any, ...] = (conversation_id,)
+    keyset_sql = ""
+    if before is not None:
+        keyset_sql = "and (created_at, id) < ($2::timestamptz, $3::uuid)"
+        params = (*params, *before)
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            f"""
         select id::text as id, conversation_id::text as conversation_id, guest_id, user_id::text as user_id, role, content, meta, created_at
         from app.chatlaya_messages
         where conversation_id = $1::uuid
-        order by created_at asc;
+          and created_at >= (
+            select c.created_at - interval '1 day' from app.chatlaya_conversations c where c.id = $1::uuid
+          )
+          {keyset_sql}
+        order by created_at desc, id desc
+        limit ${len(params) + 1};
         """,
-            conversation_id,
+            *params,
+            limit,
         )
+    rows.reverse()
     return [_normalize_message(_record_to_dict(row)) for row in rows if row]
 
 
@@ -328,6 +451,9 @@ async def list_recent_messages(*, conversation_id: str, limit: int) -> list[dict
         select id::text as id, conversation_id::text as conversation_id, guest_id, user_id::text as user_id, role, content, meta, created_at
         from app.chatlaya_messages
         where conversation_id = $1::uuid
+          and created_at >= (
+            select c.created_at - interval '1 day' from app.chatlaya_conversations c where c.id = $1::uuid
+          )
         order by created_at desc
         limit $2;
         """,
@@ -338,6 +464,57 @@ async def list_recent_messages(*, conversation_id: str, limit: int) -> list[dict
     return [_normalize_message(_record_to_dict(row)) for row in rows if row]
 
 
+async def list_messages_after(
+    *,
+    conversation_id: str,
+    after: datetime | None,
+    limit: int,
+) -> list[dict[str, Any]]:
+    pool = _get_pool_or_raise()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+        select id::text as id, conversation_id::text as conversation_id, guest_id, user_id::text as user_id, role, content, meta, created_at
+        from app.chatlaya_messages
+        where conversation_id = $1::uuid
+          and created_at >= (
+            select c.created_at - interval '1 day' from app.chatlaya_conversations c where c.id = $1::uuid
+          )
+          and ($2::timestamptz is null or created_at > $2::timestamptz)
+        order by created_at asc
+        limit $3;
+        """,
+            conversation_id,
+            after,
+            limit,
+        )
+    return [_normalize_message(_record_to_dict(row)) for row in rows if row]
+
+
+async def update_conversation_summary(
+    *,
+    conversation_id: str,
+    summary: str,
+    summary_until: datetime,
+) -> bool:
+    pool = _get_pool_or_raise()
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(
+            """
+        update app.chatlaya_conversations
+        set summary = $1,
+            summary_until = $2
+        where id = $3::uuid
+          and (summary_until is null or summary_until < $2)
+        returning id::text as id;
+        """,
+            summary,
+            summary_until,
+            conversation_id,
+        )
+    return bool(row)
+
+
 async def create_problem_report(
     *,
     user_id: str | None,
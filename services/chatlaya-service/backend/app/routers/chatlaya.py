@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import asyncio
+import base64
 import threading
 import time
 from datetime import datetime, timezone
@@ -16,7 +17,7 @@ from app.deps.auth import get_current_user_optional
 from app.repositories.chatlaya_pg import (
     archive_conversation as archive_conversation_pg,
     create_conversation as create_conversation_pg,
-    create_message,
+    create_message_and_touch_conversation,
     create_problem_report as create_problem_report_pg,
     get_conversation,
     get_latest_active_conversation,
@@ -24,7 +25,6 @@ from app.repositories.chatlaya_pg import (
     list_conversations as list_conversations_pg,
     list_messages as list_messages_pg,
     list_recent_messages,
-    touch_conversation,
     update_conversation_mode,
 )
 from app.schemas.chatlaya import (
@@ -45,35 +45,24 @@ from app.schemas.chatlaya import (
     PROBLEM_REPORT_ZONE_TYPES,
 )
 from app.services.chatlaya_context import build_chatlaya_product_context
+from app.services.chatlaya_memory import schedule_summary_refresh
 from app.services.chatlaya_specialist import CHATLAYA_MODE_GENERAL, coerce_assistant_mode
 from app.services.chatlaya_service import generate_chat_reply
+from app.services.chatlaya_stream import TokenStreamBridge, split_for_stream
+from app.services.chatlaya_write_behind import merge_pending_messages, save_assistant_message
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/chatlaya", tags=["chatlaya"])
 
 DEFAULT_CONVERSATION_TITLE = "Nouvelle conversation"
+MESSAGES_PAGE_SIZE = 50
 GUEST_MESSAGE_LIMIT = 12
 GUEST_MESSAGE_WINDOW_S = 60 * 10
 _GUEST_CHAT_BUCKETS: dict[str, list[float]] = {}
 _GUEST_CHAT_LOCK = threading.Lock()
 
 
-def _stream_chunks(text: str, size: int = 24) -> list[str]:
-    chunks: list[str] = []
-    current = ""
-    for part in text.split(" "):
-        next_value = f"{current} {part}".strip()
-        if len(next_value) >= size and current:
-            chunks.append(current + " ")
-            current = part
-        else:
-            current = next_value
-    if current:
-        chunks.append(current)
-    return chunks
-
-
 def _serialize_conversation(doc: dict) -> ConversationResponse:
     return ConversationResponse(
         conversation_id=str(doc["_id"]),
@@ -131,6 +120,22 @@ def _parse_optional_uuid(value: str | None, field_label: str) -> str | None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{field_label} invalide") from exc
 
 
+def _encode_cursor(at: datetime, row_id: str) -> str:
+    raw = f"{at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str | None) -> tuple[datetime, str] | None:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(at), str(UUID(row_id))
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Curseur invalide") from exc
+
+
 def _problem_report_categories() -> ProblemReportCategoriesResponse:
     return ProblemReportCategoriesResponse(
         domains=[ProblemReportCategoryItem(**item) for item in PROBLEM_REPORT_DOMAINS],
@@ -178,21 +183,34 @@ async def start_session(
 async def list_conversations(
     request: Request,
     response: Response,
-    page: int = Query(default=1, ge=1),
+    cursor: str | None = Query(default=None),
+    page: int | None = Query(default=None, ge=1, deprecated=True),
     limit: int = Query(default=20, ge=1, le=100),
     current: dict | None = Depends(get_current_user_optional),
 ):
     guest_id = get_guest_id(request) if current else ensure_guest_id(request, response)
-    skip = (page - 1) * limit
+    before = _decode_cursor(cursor)
+    # `page` (OFFSET paging) is kept for older clients; it is ignored when a cursor is sent.
+    offset = (page - 1) * limit if page and before is None else 0
     owner = _owner_filter(current, guest_id)
     rows = await list_conversations_pg(
         user_id=owner.get("user_id"),
         guest_id=owner.get("guest_id"),
-        limit=limit,
-        offset=skip,
+        limit=limit + 1,
+        before=before,
+        offset=offset,
     )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
     items: List[ConversationResponse] = [_serialize_conversation(doc) for doc in rows]
-    return ConversationListResponse(items=items, page=page, limit=limit)
+    return ConversationListResponse(
+        items=items,
+        page=page if page and before is None else 1,
+        limit=limit,
+        next_cursor=next_cursor,
+    )
 
 
 @router.post("/conversations", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
@@ -263,6 +281,8 @@ async def list_messages(
     request: Request,
     response: Response,
     conversation_id: str = Query(..., alias="conversation_id"),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(default=MESSAGES_PAGE_SIZE, ge=1, le=200),
     current: dict | None = Depends(get_current_user_optional),
 ):
     guest_id = get_guest_id(request) if current else ensure_guest_id(request, response)
@@ -276,10 +296,18 @@ async def list_messages(
     if not conversation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation introuvable")
 
-    items: List[ChatMessageItem] = [
-        _serialize_message(doc) for doc in await list_messages_pg(conversation_id=conv_id)
-    ]
-    return MessagesResponse(items=items)
+    # Pages walk backwards from the newest message; each page is returned oldest first.
+    before = _decode_cursor(cursor)
+    rows = await list_messages_pg(conversation_id=conv_id, limit=limit + 1, before=before)
+    if before is None:
+        # Messages still queued in the write-behind buffer are always the newest ones.
+        rows = merge_pending_messages(conv_id, rows, limit=limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[-limit:]
+        next_cursor = _encode_cursor(rows[0]["created_at"], rows[0]["id"])
+    items: List[ChatMessageItem] = [_serialize_message(doc) for doc in rows]
+    return MessagesResponse(items=items, next_cursor=next_cursor)
 
 
 @router.get("/problem-report-categories", response_model=ProblemReportCategoriesResponse)
@@ -374,25 +402,30 @@ async def post_message(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation introuvable")
 
     now = datetime.now(timezone.utc)
-    await create_message(
+    title = conversation.get("title") or DEFAULT_CONVERSATION_TITLE
+    if title == DEFAULT_CONVERSATION_TITLE:
+        snippet = payload.message.strip().replace("\n", " ")
+        if snippet:
+            title = snippet[:80]
+    await create_message_and_touch_conversation(
         conversation_id=conv_id,
         role="user",
         content=payload.message,
         user_id=owner.get("user_id"),
         guest_id=owner.get("guest_id"),
         meta={},
+        title=title,
         created_at=now,
     )
 
-    title = conversation.get("title") or DEFAULT_CONVERSATION_TITLE
-    if title == DEFAULT_CONVERSATION_TITLE:
-        snippet = payload.message.strip().replace("\n", " ")
-        if snippet:
-            title = snippet[:80]
-    await touch_conversation(conversation_id=conv_id, title=title, updated_at=now)
-
-    history_docs = await list_recent_messages(conversation_id=conv_id, limit=12)
-    history_docs = history_docs[-8:]
+    history_docs = merge_pending_messages(
+        conv_id,
+        await list_recent_messages(conversation_id=conv_id, limit=12),
+        limit=12,
+    )
+    summary_until = conversation.get("summary_until")
+    if summary_until:
+        history_docs = [doc for doc in history_docs if doc.get("created_at") and doc["created_at"] > summary_until]
     chat_history = [
         {"role": doc.get("role", "assistant"), "content": doc.get("content", "")}
         for doc in history_docs
@@ -405,18 +438,19 @@ async def post_message(
         product_context = ""
     assistant_mode = coerce_assistant_mode(conversation.get("assistant_mode"))
     async def event_generator():
-        queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
-        loop = asyncio.get_running_loop()
-        streamed_any = False
-
-        def on_token(token: str) -> None:
-            if not token:
-                return
-            if len(token) > 160:
-                for chunk in _stream_chunks(token):
-                    loop.call_soon_threadsafe(queue.put_nowait, ("token", chunk))
-                return
-            loop.call_soon_threadsafe(queue.put_nowait, ("token", token))
+        bridge = TokenStreamBridge(asyncio.get_running_loop())
+
+        async def persist_reply(reply: str, rag_sources: list[dict[str, Any]]) -> None:
+            saved = await save_assistant_message(
+                conversation_id=conv_id,
+                content=reply,
+                user_id=owner.get("user_id"),
+                guest_id=owner.get("guest_id"),
+                meta={"rag_sources": rag_sources} if rag_sources else {},
+                title=title,
+                created_at=datetime.now(timezone.utc),
+            )
+            schedule_summary_refresh(conversation, unflushed=[saved])
 
         async def run_generation() -> None:
             try:
@@ -425,47 +459,42 @@ async def post_message(
                     chat_history,
                     product_context=product_context,
                     assistant_mode=assistant_mode,
-                    on_token=on_token,
-                )
-                assistant_now = datetime.now(timezone.utc)
-                await create_message(
-                    conversation_id=conv_id,
-                    role="assistant",
-                    content=reply,
-                    user_id=owner.get("user_id"),
-                    guest_id=owner.get("guest_id"),
-                    meta={"rag_sources": rag_sources} if rag_sources else {},
-                    created_at=assistant_now,
-                )
-                await touch_conversation(
-                    conversation_id=conv_id,
-                    title=title,
-                    updated_at=assistant_now,
+                    on_token=bridge.push,
+                    conversation_summary=str(conversation.get("summary") or ""),
                 )
-                await queue.put(("complete", reply))
+                # A returned reply is complete (a mid-stream disconnect raises instead), so
+                # it is kept even if the client has left meanwhile; shielded because the
+                # generator's finally cancels this task on disconnect.
+                await asyncio.shield(persist_reply(reply, rag_sources))
+                if bridge.closed:
+                    return
+                await bridge.finish("complete", reply)
             except Exception as exc:  # noqa: BLE001
+                if bridge.closed:
+                    logger.info("ChatLAYA stream closed by client before generation finished")
+                    return
                 logger.exception("ChatLAYA streaming generation failed: %s", exc)
-                await queue.put(("error", "Erreur de génération. Réessayez dans un instant."))
+                await bridge.finish("error", "Erreur de génération. Réessayez dans un instant.")
 
         task = asyncio.create_task(run_generation())
         try:
-            while True:
-                event, data = await queue.get()
+            async for event, data in bridge.frames():
                 if event == "token":
-                    streamed_any = True
                     yield {"event": "token", "data": data}
                     continue
                 if event == "complete":
-                    if not streamed_any:
-                        for chunk in _stream_chunks(data):
+                    if not bridge.streamed_any:
+                        for chunk in split_for_stream(data):
                             yield {"event": "token", "data": chunk}
-                            await asyncio.sleep(0.015)
                     yield {"event": "done", "data": "done"}
                     break
                 if event == "error":
                     yield {"event": "error", "data": data}
                     break
         finally:
+            # sse-starlette cancels this generator when the client disconnects; closing the
+            # bridge makes the provider thread stop on its next token instead of running on.
+            bridge.close()
             if not task.done():
                 task.cancel()
 
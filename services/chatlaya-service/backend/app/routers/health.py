@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from typing import Any
+
 from fastapi import APIRouter
 
+from app.core.ai import generation_stats
+from app.services.chatlaya_answer_cache import answer_cache_stats
 from app.services.postgres_bootstrap import db_configured
 
 
@@ -9,9 +13,11 @@ router = APIRouter()
 
 
 @router.get("/health")
-def health() -> dict[str, str | bool]:
+def health() -> dict[str, Any]:
     return {
         "status": "ok",
         "service": "chatlaya-service",
         "db_configured": db_configured(),
+        "generations": generation_stats(),
+        "answer_cache": answer_cache_stats(),
     }
@@ -79,8 +79,10 @@ class ConversationResponse(BaseModel):
 
 class ConversationListResponse(BaseModel):
     items: List[ConversationResponse]
-    page: int
+    # Deprecated: echoes the legacy `?page=` parameter; page with `next_cursor` instead.
+    page: int = 1
     limit: int
+    next_cursor: str | None = None
 
 
 class ChatMessagePayload(BaseModel):
@@ -101,6 +103,7 @@ class ChatMessageItem(BaseModel):
 
 class MessagesResponse(BaseModel):
     items: List[ChatMessageItem]
+    next_cursor: str | None = None
 
 
 class ProblemReportCategoryItem(BaseModel):
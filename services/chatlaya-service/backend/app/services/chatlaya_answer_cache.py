@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from app.core.config import settings
+from app.services.chatlaya_specialist import (
+    CHATLAYA_MODE_LAUNCH_STRUCTURE_SELL,
+    _chunks_path,
+    _tokenize,
+)
+from app.services.postgres_bootstrap import get_pool
+
+
+logger = logging.getLogger(__name__)
+
+_VECTOR_BUCKETS = 1 << 14
+_CORPUS_VERSION_CHECK_S = 60.0
+_STEM_SUFFIXES = ("ement", "ation", "euse", "ion", "ent", "ez", "er", "e")
+
+
+@dataclass
+class _CachedAnswer:
+    vector: dict[int, float]
+    question: str
+    answer: str
+    chunk_fingerprint: tuple[str, ...]
+    context_key: str
+    corpus_version: str
+    expires_at: float
+
+
+def _stem(token: str) -> str:
+    if token.endswith("s") and len(token) > 4:
+        token = token[:-1]
+    for suffix in _STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[: -len(suffix)]
+    return token
+
+
+def question_vector(text: str) -> dict[int, float]:
+    """L2-normalised hashed bag of tokens and bigrams, comparable with a sparse dot product.
+
+    The runtime does not call an embedding provider for specialist questions, so
+    paraphrase matching relies on the same normalisation and stopwords as retrieval.
+    """
+    tokens = [_stem(token) for token in _tokenize(text)]
+    features = list(tokens) + [f"{left} {right}" for left, right in zip(tokens, tokens[1:])]
+    counts: dict[int, float] = {}
+    for feature in features:
+        bucket = zlib.crc32(feature.encode("utf-8")) % _VECTOR_BUCKETS
+        counts[bucket] = counts.get(bucket, 0.0) + (1.0 if " " not in feature else 0.5)
+    norm = math.sqrt(sum(weight * weight for weight in counts.values()))
+    if not norm:
+        return {}
+    return {bucket: weight / norm for bucket, weight in counts.items()}
+
+
+def _cosine(left: dict[int, float], right: dict[int, float]) -> float:
+    if len(left) > len(right):
+        left, right = right, left
+    return sum(weight * right.get(bucket, 0.0) for bucket, weight in left.items())
+
+
+def chunk_fingerprint(chunks: list[dict[str, Any]]) -> tuple[str, ...]:
+    return tuple(
+        f"{chunk.get('doc_id') or ''}:{hashlib.sha1(str(chunk.get('text') or '').encode('utf-8')).hexdigest()[:12]}"
+        for chunk in chunks
+    )
+
+
+def prompt_context_key(summary: str, history: list[dict[str, Any]], product_context: str) -> str:
+    """Digest of the conversation-specific prompt inputs; empty when the prompt has none."""
+    if not (summary or history or product_context):
+        return ""
+    material = json.dumps(
+        {
+            "summary": summary,
+            "history": [[item.get("role"), item.get("content")] for item in history],
+            "product": product_context,
+        },
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """Per-mode in-process store of generated answers looked up by question similarity.
+
+    An entry is served only if its question is similar enough, it has not expired, it was
+    generated against the current corpus version and retrieval returned the same chunks.
+    Nothing is stored or served without chunks: an empty fingerprint would match every
+    other empty one. Entries are also keyed on `prompt_context_key`, so an answer written
+    with a conversation's summary, history or product context is only served to a prompt
+    carrying the same context. First turns (no context) share answers across users; later
+    turns mostly hit on repeated or regenerated questions within the same conversation,
+    so expect the hit rate to follow the share of first-turn questions.
+    """
+
+    def __init__(self, *, threshold: float, ttl_s: float, max_entries: int) -> None:
+        self._threshold = threshold
+        self._ttl_s = ttl_s
+        self._max_entries = max(1, max_entries)
+        self._entries: dict[str, OrderedDict[int, _CachedAnswer]] = {}
+        self._next_id = 0
+        self._corpus_version = ""
+        self._corpus_checked_at = 0.0
+        self.stats: dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "stale_chunks": 0,
+            "stores": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def snapshot(self) -> dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": sum(len(entries) for entries in self._entries.values()),
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "corpus_version": self._corpus_version,
+        }
+
+    async def refresh_corpus_version(self) -> str:
+        now = time.monotonic()
+        if self._corpus_version and now - self._corpus_checked_at < _CORPUS_VERSION_CHECK_S:
+            return self._corpus_version
+        self._corpus_checked_at = now
+        version = await _load_corpus_version()
+        if self._corpus_version and version != self._corpus_version:
+            dropped = sum(len(entries) for entries in self._entries.values())
+            self._entries.clear()
+            self.stats["invalidations"] += dropped
+            logger.info("ChatLAYA answer cache cleared after corpus change (%d entries)", dropped)
+        self._corpus_version = version
+        return version
+
+    def lookup(
+        self, assistant_mode: str, question: str, chunks: list[dict[str, Any]], context_key: str = ""
+    ) -> str | None:
+        entries = self._entries.get(assistant_mode)
+        vector = question_vector(question)
+        if not entries or not vector or not chunks:
+            self.stats["misses"] += 1
+            return None
+        now = time.monotonic()
+        best_id, best_score = None, 0.0
+        for entry_id, entry in list(entries.items()):
+            if entry.expires_at <= now or entry.corpus_version != self._corpus_version:
+                del entries[entry_id]
+                self.stats["evictions"] += 1
+                continue
+            if entry.context_key != context_key:
+                continue
+            score = _cosine(vector, entry.vector)
+            if score > best_score:
+                best_id, best_score = entry_id, score
+        if best_id is None or best_score < self._threshold:
+            self.stats["misses"] += 1
+            return None
+        entry = entries[best_id]
+        if entry.chunk_fingerprint != chunk_fingerprint(chunks):
+            self.stats["stale_chunks"] += 1
+            self.stats["misses"] += 1
+            return None
+        entries.move_to_end(best_id)
+        self.stats["hits"] += 1
+        logger.debug("ChatLAYA answer cache hit %.3f for %r (cached %r)", best_score, question[:80], entry.question[:80])
+        return entry.answer
+
+    def store(
+        self, assistant_mode: str, question: str, chunks: list[dict[str, Any]], answer: str, context_key: str = ""
+    ) -> None:
+        vector = question_vector(question)
+        if not vector or not chunks or not answer.strip():
+            return
+        entries = self._entries.setdefault(assistant_mode, OrderedDict())
+        self._next_id += 1
+        entries[self._next_id] = _CachedAnswer(
+            vector=vector,
+            question=question,
+            answer=answer,
+            chunk_fingerprint=chunk_fingerprint(chunks),
+            context_key=context_key,
+            corpus_version=self._corpus_version,
+            expires_at=time.monotonic() + self._ttl_s,
+        )
+        self.stats["stores"] += 1
+        while len(entries) > self._max_entries:
+            entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+
+async def _load_corpus_version() -> str:
+    pool = get_pool()
+    if pool is not None:
+        corpus = settings.CHATLAYA_SPECIALIST_FILTER_VALUE or CHATLAYA_MODE_LAUNCH_STRUCTURE_SELL
+        try:
+            async with pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    """
+                    select count(*) as documents,
+                           coalesce(sum(chunk_count), 0) as chunks,
+                           max(updated_at) as updated_at
+                    from app.rag_documents
+                    where coalesce(metadata->>'corpus', '') = $1;
+                    """,
+                    corpus,
+                )
+            if row is not None:
+                return f"db:{row['documents']}:{row['chunks']}:{row['updated_at']}"
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("ChatLAYA corpus version lookup failed: %s", exc)
+    try:
+        stat = _chunks_path().stat()
+        return f"file:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        return "none"
+
+
+_CACHE: SemanticAnswerCache | None = None
+
+
+def answer_cache_enabled(assistant_mode: str) -> bool:
+    modes = {mode.strip() for mode in (settings.CHAT_ANSWER_CACHE_MODES or "").split(",") if mode.strip()}
+    return assistant_mode in modes
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = SemanticAnswerCache(
+            threshold=settings.CHAT_ANSWER_CACHE_SIMILARITY,
+            ttl_s=settings.CHAT_ANSWER_CACHE_TTL_S,
+            max_entries=settings.CHAT_ANSWER_CACHE_MAX_ENTRIES,
+        )
+    return _CACHE
+
+
+def answer_cache_stats() -> dict[str, Any]:
+    return get_answer_cache().snapshot() if _CACHE is not None else {}
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any
+
+from app.core.ai import generate_answer_async
+from app.core.config import settings
+from app.repositories.chatlaya_pg import list_messages_after, update_conversation_summary
+from app.services.prompt_packer import count_tokens, truncate_to_tokens
+
+
+logger = logging.getLogger(__name__)
+
+_SUMMARY_FETCH_LIMIT = 60
+_SUMMARY_MAX_NEW_TOKENS = 320
+_REFRESHING: set[str] = set()
+_BACKGROUND_TASKS: set[asyncio.Task[None]] = set()
+
+
+def select_history_window(history: list[dict[str, Any]], token_budget: int | None = None) -> list[dict[str, Any]]:
+    """Keep the most recent turns that fit in `token_budget`, clipping a single oversized turn."""
+    budget = max(1, int(token_budget or settings.CHAT_HISTORY_TOKEN_BUDGET))
+    per_message_cap = max(1, budget // 2)
+    selected: list[dict[str, Any]] = []
+    used = 0
+    for item in reversed(history or []):
+        content = str(item.get("content") or "").strip()
+        if not content:
+            continue
+        cost = count_tokens(content)
+        if cost > per_message_cap:
+            content = truncate_to_tokens(content, per_message_cap)
+            cost = count_tokens(content)
+        if used + cost > budget:
+            break
+        used += cost
+        selected.append({**item, "content": content})
+    selected.reverse()
+    return selected
+
+
+def _render_turns(messages: list[dict[str, Any]]) -> str:
+    lines: list[str] = []
+    for item in messages:
+        role = "Utilisateur" if item.get("role") == "user" else "ChatLAYA"
+        content = " ".join(str(item.get("content") or "").split())
+        if content:
+            lines.append(f"- {role}: {content}")
+    return "\n".join(lines)
+
+
+def _build_summary_prompt(previous_summary: str, messages: list[dict[str, Any]]) -> str:
+    max_words = max(40, settings.CHAT_SUMMARY_MAX_CHARS // 7)
+    return (
+        "Tu mets a jour la memoire d'une conversation entre un utilisateur et ChatLAYA.\n"
+        "Fusionne le resume existant et les nouveaux echanges en un seul resume factuel, en francais.\n"
+        "Garde uniquement : le projet ou besoin de l'utilisateur, les faits et chiffres donnes, "
+        "les decisions prises, les questions encore ouvertes.\n"
+        f"Pas de formule de politesse, pas de liste de conseils, {max_words} mots maximum.\n\n"
+        f"Resume existant :\n{previous_summary or '(vide)'}\n\n"
+        f"Nouveaux echanges :\n{_render_turns(messages)}\n\n"
+        "Resume mis a jour :"
+    )
+
+
+def _extractive_summary(previous_summary: str, messages: list[dict[str, Any]]) -> str:
+    lines = [line for line in (previous_summary or "").splitlines() if line.strip()]
+    for item in messages:
+        if item.get("role") != "user":
+            continue
+        content = " ".join(str(item.get("content") or "").split())
+        if content:
+            lines.append(f"- Utilisateur: {content[:200]}")
+    return _clip_summary("\n".join(lines), keep_tail=True)
+
+
+def _clip_summary(text: str, keep_tail: bool = False) -> str:
+    limit = max(1, settings.CHAT_SUMMARY_MAX_CHARS)
+    cleaned = (text or "").strip()
+    if len(cleaned) <= limit:
+        return cleaned
+    return cleaned[-limit:].lstrip() if keep_tail else cleaned[:limit].rstrip()
+
+
+async def _summarize(previous_summary: str, messages: list[dict[str, Any]]) -> str:
+    provider = (settings.CHAT_PROVIDER or settings.LLM_PROVIDER or "echo").lower()
+    if provider == "echo":
+        return _extractive_summary(previous_summary, messages)
+    prompt = _build_summary_prompt(previous_summary, messages)
+    timeout_s = max(5, int(settings.CHAT_SUMMARY_TIMEOUT_S))
+    try:
+        text = await generate_answer_async(
+            prompt,
+            provider,
+            settings.CHAT_MODEL or settings.LLM_MODEL,
+            timeout_s,
+            _SUMMARY_MAX_NEW_TOKENS,
+        )
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("ChatLAYA summary generation failed, using extractive summary: %s", exc)
+        return _extractive_summary(previous_summary, messages)
+    text = (text or "").strip()
+    if not text:
+        return _extractive_summary(previous_summary, messages)
+    return _clip_summary(text)
+
+
+async def refresh_conversation_summary(
+    conversation_id: str,
+    previous_summary: str,
+    summary_until: datetime | None,
+    unflushed: list[dict[str, Any]] | None = None,
+) -> None:
+    """Fold the turns older than the recent window into the summary, in batches.
+
+    Nothing happens until at least `CHAT_SUMMARY_FOLD_BATCH` messages sit outside the
+    window, so the extra LLM call runs once every few turns rather than on every one.
+    `unflushed` carries messages that may still be in the write-behind queue.
+    """
+    keep_recent = max(1, settings.CHAT_SUMMARY_KEEP_RECENT)
+    fold_batch = max(1, settings.CHAT_SUMMARY_FOLD_BATCH)
+    messages = await list_messages_after(
+        conversation_id=conversation_id,
+        after=summary_until,
+        limit=_SUMMARY_FETCH_LIMIT,
+    )
+    known_ids = {item.get("id") for item in messages}
+    extra = [item for item in unflushed or () if item.get("id") not in known_ids]
+    if extra:
+        messages = sorted(messages + extra, key=lambda item: item["created_at"])
+    if len(messages) < keep_recent + fold_batch:
+        return
+    to_fold = messages[:-keep_recent]
+    summary = await _summarize(previous_summary, to_fold)
+    await update_conversation_summary(
+        conversation_id=conversation_id,
+        summary=summary,
+        summary_until=to_fold[-1]["created_at"],
+    )
+
+
+def schedule_summary_refresh(
+    conversation: dict[str, Any],
+    unflushed: list[dict[str, Any]] | None = None,
+) -> None:
+    """Fold turns that fell out of the recent window into the stored summary, off the request path.
+
+    Pass the messages just saved for this turn as `unflushed`: with write-behind they may
+    not be committed yet when the refresh reads the thread.
+    """
+    if not settings.CHAT_SUMMARY_ENABLED:
+        return
+    conversation_id = str(conversation.get("id") or "")
+    if not conversation_id or conversation_id in _REFRESHING:
+        return
+    _REFRESHING.add(conversation_id)
+
+    async def _run() -> None:
+        try:
+            await refresh_conversation_summary(
+                conversation_id,
+                str(conversation.get("summary") or ""),
+                conversation.get("summary_until"),
+                unflushed,
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("ChatLAYA summary refresh failed for %s: %s", conversation_id, exc)
+        finally:
+            _REFRESHING.discard(conversation_id)
+
+    task = asyncio.create_task(_run())
+    _BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_BACKGROUND_TASKS.discard)
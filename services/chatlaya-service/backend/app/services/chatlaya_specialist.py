@@ -10,6 +10,7 @@ from typing import Any
 
 from app.core.ai import embed_texts
 from app.core.config import settings
+from app.services.phrase_matcher import PhraseMatcher
 from app.services.postgres_bootstrap import get_pool
 
 
@@ -282,31 +283,35 @@ def _build_query_phrases(tokens: tuple[str, ...]) -> tuple[str, ...]:
     return tuple(dict.fromkeys(phrases))
 
 
-def _matches_rule(query_normalized: str, query_token_set: set[str], values: tuple[str, ...]) -> bool:
-    for value in values:
-        normalized_value = _normalize_text(value)
-        if not normalized_value:
-            continue
-        if " " in normalized_value:
-            if normalized_value in query_normalized:
-                return True
-            continue
-        if normalized_value in query_token_set:
-            return True
-    return False
+def _compile_intent_matcher() -> PhraseMatcher:
+    phrases: list[tuple[str, int]] = []
+    for index, rule in enumerate(_INTENT_RULES):
+        for trigger in rule["triggers"]:
+            normalized = _normalize_text(trigger)
+            # Single-word triggers are compared with query tokens, which drop short words and stopwords.
+            if not normalized or (" " not in normalized and not _tokenize(normalized)):
+                continue
+            phrases.append((normalized, index))
+    return PhraseMatcher(phrases)
+
+
+_INTENT_MATCHER = _compile_intent_matcher()
 
 
 def _expand_query(query: str) -> tuple[set[str], tuple[str, ...], tuple[str, ...]]:
     query_normalized = _normalize_text(query)
     query_tokens = _tokenize(query)
-    query_token_set = set(query_tokens)
-    expansion_tokens: set[str] = set(query_token_set)
+    expansion_tokens: set[str] = set(query_tokens)
     expansion_phrases: list[str] = []
     matched_intents: list[str] = []
 
-    for rule in _INTENT_RULES:
-        if not _matches_rule(query_normalized, query_token_set, rule["triggers"]):
-            continue
+    matched_rules = {
+        hit.label
+        for hit in _INTENT_MATCHER.find(query_normalized)
+        if " " in hit.phrase or hit.is_word(query_normalized)
+    }
+    for index in sorted(matched_rules):
+        rule = _INTENT_RULES[index]
         matched_intents.extend(rule["name"])
         expansion_tokens.update(_tokenize(" ".join(rule["expansions"])))
         expansion_phrases.extend(rule["priority_phrases"])
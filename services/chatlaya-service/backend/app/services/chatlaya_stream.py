@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import AsyncIterator
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+_PRODUCER_WAIT_SLICE_S = 0.25
+
+
+class StreamClosedError(RuntimeError):
+    pass
+
+
+class TokenStreamBridge:
+    """Bridge provider tokens (pushed from a worker thread) to an SSE event generator.
+
+    Tokens go through a bounded queue: when the client reads slowly the queue fills
+    and the provider thread blocks, so backpressure reaches the upstream connection.
+    `close()` makes the next `push()` raise `StreamClosedError`, which aborts the
+    provider read loop instead of letting it run to completion.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        flush_bytes: int | None = None,
+        flush_interval_s: float | None = None,
+        max_pending: int | None = None,
+    ) -> None:
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        if max_pending is None:
+            max_pending = settings.CHAT_STREAM_MAX_PENDING_FRAMES
+        if flush_bytes is None:
+            flush_bytes = settings.CHAT_STREAM_FLUSH_BYTES
+        if flush_interval_s is None:
+            flush_interval_s = settings.CHAT_STREAM_FLUSH_INTERVAL_MS / 1000
+        self._queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue(maxsize=max(1, int(max_pending)))
+        self._flush_bytes = max(1, int(flush_bytes))
+        self._flush_interval_s = max(0.0, float(flush_interval_s))
+        self._closed = threading.Event()
+        self.streamed_any = False
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def push(self, token: str) -> None:
+        if not token:
+            return
+        self._put("token", token)
+
+    async def finish(self, event: str, data: str) -> None:
+        if self.closed:
+            return
+        await self._queue.put((event, data))
+
+    def _put(self, event: str, data: str) -> None:
+        if self.closed:
+            raise StreamClosedError("ChatLAYA stream closed by client")
+        if threading.get_ident() == self._loop_thread_id:
+            self._queue.put_nowait((event, data))
+            return
+        future = asyncio.run_coroutine_threadsafe(self._queue.put((event, data)), self._loop)
+        while True:
+            try:
+                future.result(timeout=_PRODUCER_WAIT_SLICE_S)
+                return
+            except concurrent.futures.TimeoutError:
+                if self.closed:
+                    future.cancel()
+                    raise StreamClosedError("ChatLAYA stream closed by client") from None
+
+    async def frames(self) -> AsyncIterator[tuple[str, str]]:
+        """Yield coalesced (event, data) frames until a terminal event is received.
+
+        The first token is flushed immediately so time-to-first-token is not delayed;
+        later tokens are merged until `flush_bytes` is reached or the time window ends.
+        """
+        first = True
+        pending: tuple[str, str] | None = None
+        while not self.closed:
+            event, data = pending or await self._queue.get()
+            pending = None
+            if event != "token":
+                yield event, data
+                return
+
+            parts = [data]
+            size = len(data.encode("utf-8"))
+            if not first:
+                deadline = self._loop.time() + self._flush_interval_s
+                while size < self._flush_bytes:
+                    remaining = deadline - self._loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        next_event, next_data = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    if next_event != "token":
+                        pending = (next_event, next_data)
+                        break
+                    parts.append(next_data)
+                    size += len(next_data.encode("utf-8"))
+            first = False
+            self.streamed_any = True
+            yield "token", "".join(parts)
+
+
+def split_for_stream(text: str, size: int | None = None) -> list[str]:
+    """Split an already complete reply into word-aligned frames of about `size` bytes."""
+    limit = max(1, int(size or settings.CHAT_STREAM_FLUSH_BYTES))
+    chunks: list[str] = []
+    current = ""
+    for part in text.split(" "):
+        next_value = f"{current} {part}" if current else part
+        if len(next_value.encode("utf-8")) >= limit and current:
+            chunks.append(current + " ")
+            current = part
+        else:
+            current = next_value
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any
+from uuid import uuid4
+
+from app.core.config import settings
+from app.repositories.chatlaya_pg import create_message_and_touch_conversation, insert_messages_batch
+
+
+logger = logging.getLogger(__name__)
+
+
+_RETRY_LIMIT = 5
+_RETRY_BASE_DELAY_S = 0.5
+_RETRY_MAX_DELAY_S = 10.0
+_DRAIN_LOG_EVERY_S = 5.0
+
+
+class MessageWriteBehind:
+    """Batch assistant-message inserts (and the matching conversation touch) off the request path.
+
+    Messages stay visible through `pending_messages()` until their batch is committed, so
+    history reads issued right after a turn still see the assistant reply. That view is
+    per process: with several workers, a read served by another worker only sees the
+    reply once it is flushed (normally within one flush interval).
+
+    A row that fails to insert is retried with exponential backoff, then written once
+    more through the unbatched path before it is given up; the batch insert ignores rows
+    that already exist, so retrying after an ambiguous failure is safe. `stop()` drains
+    the queue and pending retries completely instead of cancelling.
+    """
+
+    def __init__(self, *, flush_interval_s: float, batch_size: int, max_pending: int) -> None:
+        self._flush_interval_s = max(0.01, flush_interval_s)
+        self._batch_size = max(1, batch_size)
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=max(1, max_pending))
+        self._pending: dict[str, list[dict[str, Any]]] = {}
+        self._retries: list[tuple[float, dict[str, Any]]] = []
+        self._attempts: dict[str, int] = {}
+        self._task: asyncio.Task[None] | None = None
+        self._stopping = False
+        self.stats: dict[str, int] = {
+            "enqueued": 0,
+            "flushed": 0,
+            "batches": 0,
+            "direct_writes": 0,
+            "retried": 0,
+            "failed": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="chatlaya-message-write-behind")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        task, self._task = self._task, None
+        if task is None:
+            return
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=_DRAIN_LOG_EVERY_S)
+            if done:
+                break
+            logger.warning(
+                "ChatLAYA write-behind still draining: %d queued, %d awaiting retry",
+                self._queue.qsize(),
+                len(self._retries),
+            )
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("ChatLAYA write-behind loop failed: %s", task.exception())
+        # Anything the loop left behind (only if it failed) is written synchronously.
+        leftovers = [message for _, message in self._retries]
+        self._retries = []
+        while not self._queue.empty():
+            leftovers.append(self._queue.get_nowait())
+        for message in leftovers:
+            await self._give_up_or_write(message)
+
+    def pending_messages(self, conversation_id: str) -> list[dict[str, Any]]:
+        return list(self._pending.get(conversation_id, ()))
+
+    async def enqueue(self, message: dict[str, Any]) -> None:
+        if not self.running or self._stopping:
+            await self._write_direct(message)
+            return
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning("ChatLAYA write-behind queue full; writing message %s directly", message["id"])
+            await self._write_direct(message)
+            return
+        self._pending.setdefault(message["conversation_id"], []).append(message)
+        self.stats["enqueued"] += 1
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not (self._stopping and self._queue.empty() and not self._retries):
+            batch = self._due_retries(loop.time())
+            if not batch:
+                try:
+                    batch = [await asyncio.wait_for(self._queue.get(), timeout=self._flush_interval_s)]
+                except asyncio.TimeoutError:
+                    continue
+            deadline = loop.time() + self._flush_interval_s
+            while len(batch) < self._batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    def _due_retries(self, now: float) -> list[dict[str, Any]]:
+        due = [message for at, message in self._retries if at <= now][: self._batch_size]
+        if due:
+            due_ids = {message["id"] for message in due}
+            self._retries = [(at, message) for at, message in self._retries if message["id"] not in due_ids]
+        return due
+
+    async def _flush(self, batch: list[dict[str, Any]]) -> None:
+        try:
+            await insert_messages_batch(batch)
+            self.stats["batches"] += 1
+            written, failed = batch, []
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("ChatLAYA write-behind batch of %d failed, retrying one by one: %s", len(batch), exc)
+            written, failed = [], []
+            for message in batch:
+                try:
+                    await insert_messages_batch([message])
+                    written.append(message)
+                except Exception as row_exc:  # noqa: BLE001
+                    failed.append((message, row_exc))
+        self.stats["flushed"] += len(written)
+        for message in written:
+            self._settle(message)
+        for message, row_exc in failed:
+            await self._retry_later(message, row_exc)
+
+    async def _retry_later(self, message: dict[str, Any], exc: Exception) -> None:
+        attempts = self._attempts.get(message["id"], 0) + 1
+        if attempts > _RETRY_LIMIT:
+            await self._give_up_or_write(message)
+            return
+        self._attempts[message["id"]] = attempts
+        delay = min(_RETRY_MAX_DELAY_S, _RETRY_BASE_DELAY_S * 2 ** (attempts - 1))
+        self._retries.append((asyncio.get_running_loop().time() + delay, message))
+        self.stats["retried"] += 1
+        logger.warning(
+            "ChatLAYA write-behind message %s failed (attempt %d/%d), retrying in %.1fs: %s",
+            message["id"],
+            attempts,
+            _RETRY_LIMIT,
+            delay,
+            exc,
+        )
+
+    async def _give_up_or_write(self, message: dict[str, Any]) -> None:
+        # Last resort: one synchronous write through the unbatched path.
+        try:
+            await self._write_direct(message)
+        except Exception as exc:  # noqa: BLE001
+            self.stats["failed"] += 1
+            logger.error(
+                "ChatLAYA write-behind dropped message %s of conversation %s after %d attempts: %s",
+                message["id"],
+                message["conversation_id"],
+                self._attempts.get(message["id"], 0) + 1,
+                exc,
+            )
+        finally:
+            self._settle(message)
+
+    def _settle(self, message: dict[str, Any]) -> None:
+        self._attempts.pop(message["id"], None)
+        pending = self._pending.get(message["conversation_id"])
+        if not pending:
+            return
+        try:
+            pending.remove(message)
+        except ValueError:
+            pass
+        if not pending:
+            self._pending.pop(message["conversation_id"], None)
+
+    async def _write_direct(self, message: dict[str, Any]) -> None:
+        self.stats["direct_writes"] += 1
+        await _write_message_direct(message)
+
+
+async def _write_message_direct(message: dict[str, Any]) -> None:
+    await create_message_and_touch_conversation(
+        conversation_id=message["conversation_id"],
+        role=message["role"],
+        content=message["content"],
+        user_id=message.get("user_id"),
+        guest_id=message.get("guest_id"),
+        meta=message.get("meta"),
+        title=message["title"],
+        created_at=message["created_at"],
+        message_id=message["id"],
+    )
+
+
+_WRITER: MessageWriteBehind | None = None
+
+
+def get_message_writer() -> MessageWriteBehind | None:
+    return _WRITER
+
+
+async def start_message_writer() -> None:
+    global _WRITER
+    if not settings.CHATLAYA_WRITE_BEHIND_ENABLED:
+        return
+    if _WRITER is None:
+        _WRITER = MessageWriteBehind(
+            flush_interval_s=settings.CHATLAYA_WRITE_BEHIND_FLUSH_MS / 1000,
+            batch_size=settings.CHATLAYA_WRITE_BEHIND_BATCH_SIZE,
+            max_pending=settings.CHATLAYA_WRITE_BEHIND_MAX_PENDING,
+        )
+    _WRITER.start()
+
+
+async def stop_message_writer() -> None:
+    if _WRITER is None:
+        return
+    await _WRITER.stop()
+
+
+async def save_assistant_message(
+    *,
+    conversation_id: str,
+    content: str,
+    user_id: str | None,
+    guest_id: str | None,
+    meta: dict[str, Any] | None,
+    title: str,
+    created_at: datetime,
+) -> dict[str, Any]:
+    message = {
+        "id": str(uuid4()),
+        "conversation_id": conversation_id,
+        "guest_id": guest_id,
+        "user_id": user_id,
+        "role": "assistant",
+        "content": content,
+        "meta": meta or {},
+        "created_at": created_at,
+        "title": title,
+    }
+    message["_id"] = message["id"]
+    if _WRITER is None:
+        await _write_message_direct(message)
+    else:
+        await _WRITER.enqueue(message)
+    return message
+
+
+def merge_pending_messages(
+    conversation_id: str,
+    rows: list[dict[str, Any]],
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """Add this process's not-yet-flushed replies to `rows`.
+
+    Only covers the current process: another worker's queued replies are not visible
+    here until that worker flushes them.
+    """
+    pending = _WRITER.pending_messages(conversation_id) if _WRITER is not None else []
+    if not pending:
+        return rows
+    known_ids = {row.get("id") for row in rows}
+    merged = rows + [message for message in pending if message["id"] not in known_ids]
+    merged.sort(key=lambda row: row.get("created_at"))
+    if limit is not None:
+        merged = merged[-limit:]
+    return merged
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from typing import Hashable, Iterable
+
+
+@dataclass(frozen=True)
+class PhraseHit:
+    start: int
+    end: int
+    phrase: str
+    label: Hashable
+
+    def is_word(self, text: str) -> bool:
+        """True when the hit is bounded by spaces or the ends of `text`."""
+        return (self.start == 0 or text[self.start - 1] == " ") and (self.end == len(text) or text[self.end] == " ")
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over labelled phrases.
+
+    Built once from every phrase table; `find` reports all occurrences of all phrases in a
+    single left-to-right pass, so the cost of a scan depends on the text length and the
+    number of hits, not on how many phrases were compiled.
+    """
+
+    def __init__(self, phrases: Iterable[tuple[str, Hashable]]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[int]] = [[]]
+        self._patterns: list[tuple[str, Hashable]] = []
+        seen: set[tuple[str, Hashable]] = set()
+        for phrase, label in phrases:
+            if not phrase or (phrase, label) in seen:
+                continue
+            seen.add((phrase, label))
+            self._add(phrase, label)
+        self._build_failure_links()
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def _add(self, phrase: str, label: Hashable) -> None:
+        state = 0
+        for char in phrase:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._out[state].append(len(self._patterns))
+        self._patterns.append((phrase, label))
+
+    def _build_failure_links(self) -> None:
+        queue: deque[int] = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def find(self, text: str) -> list[PhraseHit]:
+        hits: list[PhraseHit] = []
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self._patterns
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in out[state]:
+                phrase, label = patterns[pattern_id]
+                end = index + 1
+                hits.append(PhraseHit(end - len(phrase), end, phrase, label))
+        return hits
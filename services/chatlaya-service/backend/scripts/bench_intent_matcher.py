@@ -0,0 +1,69 @@
+"""Compare per-message phrase matching cost as the rule tables grow.
+
+Usage:
+  cd services/chatlaya-service/backend
+  python -m scripts.bench_intent_matcher
+"""
+
+from __future__ import annotations
+
+import random
+import string
+import time
+
+from app.services.chatlaya_service import _classify_message_kind, _normalize_text, detect_politeness_intent
+from app.services.chatlaya_specialist import _expand_query
+from app.services.phrase_matcher import PhraseMatcher
+
+
+MESSAGES = [
+    "Bonjour, je veux lancer une activite de transformation de mangues a Lome",
+    "Comment fixer le prix de mon offre de formation pour les PME ?",
+    "Quelle est la prochaine etape de ma trajectoire apres le diagnostic ?",
+    "Merci beaucoup pour ta reponse",
+    "Je cherche a structurer mon business plan et trouver mes premiers clients",
+]
+ROUNDS = 2000
+
+
+def _random_phrase(rng: random.Random) -> str:
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(rng.randint(1, 3))]
+    return " ".join(words)
+
+
+def _per_message_us(func, messages: list[str], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            func(message)
+    return (time.perf_counter() - started) / (rounds * len(messages)) * 1_000_000
+
+
+def main() -> None:
+    rng = random.Random(7)
+    messages = [_normalize_text(message) for message in MESSAGES]
+    print(f"{'rules':>7} {'substring scan (us)':>20} {'automaton (us)':>15}")
+    for size in (50, 500, 5000):
+        phrases = [_random_phrase(rng) for _ in range(size)]
+        matcher = PhraseMatcher((phrase, "rule") for phrase in phrases)
+
+        def naive(text: str) -> bool:
+            return any(phrase in text for phrase in phrases)
+
+        naive_us = _per_message_us(naive, messages, max(10, ROUNDS * 50 // size))
+        automaton_us = _per_message_us(matcher.find, messages, ROUNDS)
+        print(f"{size:>7} {naive_us:>20.1f} {automaton_us:>15.1f}")
+
+    # The real tables, end to end (scan caches are keyed on text, so vary the input).
+    variants = [f"{message} {index}" for index in range(ROUNDS) for message in MESSAGES]
+
+    def classify(message: str) -> None:
+        detect_politeness_intent(message)
+        _classify_message_kind(message)
+        _expand_query(message)
+
+    print(f"classification + expansion per message: {_per_message_us(classify, variants, 1):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
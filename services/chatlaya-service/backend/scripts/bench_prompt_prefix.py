@@ -0,0 +1,120 @@
+"""Measure prompt prefill across conversation turns against a local Ollama stand-in.
+
+The stand-in mimics Ollama's prompt cache: a request only pays prefill for the part of
+the prompt that differs from the previous prompt sent for the same model, and a model
+without keep_alive is reloaded on every request.
+
+Usage:
+  cd services/chatlaya-service/backend
+  python -m scripts.bench_prompt_prefix
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.ai import _call_ollama_generate
+from app.core.config import settings
+from app.services.chatlaya_service import _build_generation_prompt, _classify_message_kind, _static_prompt_prefix
+from app.services.chatlaya_specialist import CHATLAYA_MODE_GENERAL
+
+
+PREFILL_SECONDS_PER_TOKEN = 0.0004
+MODEL_LOAD_SECONDS = 0.3
+PRODUCT_CONTEXT = "Utilisateur connecte, plan Pro, trajectoire en cours : diagnostic termine, 2 preuves deposees."
+TURNS = [
+    "Comment fonctionne le module Trajectoire sur KORYXA ?",
+    "Et que se passe-t-il apres le diagnostic ?",
+    "Combien de preuves faut-il pour ameliorer mon score ?",
+    "Quelles opportunites deviennent visibles ensuite ?",
+    "Que dois-je faire en premier cette semaine ?",
+]
+
+
+class _StandInState:
+    def __init__(self) -> None:
+        self.last_prompt: dict[str, str] = {}
+        self.loaded_until: dict[str, float] = {}
+        self.uncached_tokens = 0
+
+
+def _standin_handler(state: _StandInState) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args: object) -> None:
+            return
+
+        def do_POST(self) -> None:  # noqa: N802
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            model = payload["model"]
+            prompt = payload.get("prompt") or ""
+            now = time.monotonic()
+            if state.loaded_until.get(model, 0.0) < now:
+                time.sleep(MODEL_LOAD_SECONDS)
+                state.last_prompt.pop(model, None)
+            previous = state.last_prompt.get(model, "")
+            shared = len(os.path.commonprefix([previous, prompt]))
+            state.uncached_tokens = max(0, len(prompt) - shared) // 4
+            time.sleep(state.uncached_tokens * PREFILL_SECONDS_PER_TOKEN)
+            state.last_prompt[model] = prompt
+            keep_alive = str(payload.get("keep_alive") or "0")
+            state.loaded_until[model] = time.monotonic() + (0.0 if keep_alive in {"0", "0s"} else 3600.0)
+            body = json.dumps({"response": "ok", "done": True, "prompt_eval_count": state.uncached_tokens}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def _conversation_prompts(static_first: bool) -> list[str]:
+    prompts: list[str] = []
+    history: list[dict[str, str]] = []
+    for message in TURNS:
+        kind = _classify_message_kind(message)
+        prompt = _build_generation_prompt(message, history, "", PRODUCT_CONTEXT, kind, CHATLAYA_MODE_GENERAL)
+        if not static_first:
+            # Per-turn content ahead of the instructions, as prompts were laid out before.
+            static = _static_prompt_prefix(kind, CHATLAYA_MODE_GENERAL)
+            variable, _, user_message = prompt[len(static) + 2 :].rpartition("\n\nMessage utilisateur :\n")
+            prompt = f"{variable}\n\n{static}\n\nMessage utilisateur :\n{user_message}"
+        prompts.append(prompt)
+        history += [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": "Voici les etapes principales pour avancer sur ce point."},
+        ]
+    return prompts
+
+
+def _run(label: str, prompts: list[str], keep_alive: str, state: _StandInState) -> None:
+    settings.OLLAMA_KEEP_ALIVE = keep_alive
+    state.last_prompt.clear()
+    state.loaded_until.clear()
+    print(f"\n{label} (keep_alive={keep_alive})")
+    for turn, prompt in enumerate(prompts, 1):
+        started = time.perf_counter()
+        _call_ollama_generate(prompt, "bench-model", timeout=30)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"  turn {turn}: prompt ~{len(prompt) // 4:>4} tok, prefilled {state.uncached_tokens:>4} tok, {elapsed_ms:7.1f} ms")
+
+
+def main() -> None:
+    state = _StandInState()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _standin_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.OLLAMA_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        _run("per-turn content first", _conversation_prompts(static_first=False), "30m", state)
+        _run("static prefix first", _conversation_prompts(static_first=True), "0", state)
+        _run("static prefix first", _conversation_prompts(static_first=True), "30m", state)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
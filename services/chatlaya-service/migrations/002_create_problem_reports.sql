@@ -13,7 +13,9 @@ create table if not exists app.problem_reports (
   id uuid primary key default gen_random_uuid(),
   user_id uuid null references app.auth_users(id) on delete set null,
   conversation_id uuid null references app.chatlaya_conversations(id) on delete set null,
-  message_id uuid null references app.chatlaya_messages(id) on delete set null,
+  -- Plain reference: app.chatlaya_messages is partitioned on created_at (see 005), so
+  -- there is no unique constraint on id alone for a foreign key to point at.
+  message_id uuid null,
   country text not null,
   region text null,
   city text null,
@@ -0,0 +1,14 @@
+-- ChatLAYA rolling conversation summary migration draft
+-- -----------------------------------------------------
+-- This migration is NOT executed automatically.
+-- Current production applies the same columns through ensure_chatlaya_tables() in the monolith.
+
+begin;
+
+alter table app.chatlaya_conversations
+  add column if not exists summary text not null default '';
+
+alter table app.chatlaya_conversations
+  add column if not exists summary_until timestamptz null;
+
+commit;
@@ -0,0 +1,25 @@
+-- ChatLAYA keyset pagination indexes migration draft
+-- --------------------------------------------------
+-- This migration is NOT executed automatically.
+-- Current production applies the same indexes through ensure_chatlaya_tables() in the monolith.
+-- Conversations are paged on (updated_at, id) and messages on (created_at, id); the id
+-- column breaks ties between rows written in the same microsecond.
+
+begin;
+
+create index if not exists idx_chatlaya_conversations_user_updated_at_id
+  on app.chatlaya_conversations (user_id, updated_at desc, id desc)
+  where archived = false;
+
+create index if not exists idx_chatlaya_conversations_guest_updated_at_id
+  on app.chatlaya_conversations (guest_id, updated_at desc, id desc)
+  where archived = false;
+
+create index if not exists idx_chatlaya_messages_conversation_created_at_id
+  on app.chatlaya_messages (conversation_id, created_at, id);
+
+drop index if exists app.idx_chatlaya_conversations_user_updated_at;
+drop index if exists app.idx_chatlaya_conversations_guest_updated_at;
+drop index if exists app.idx_chatlaya_messages_conversation_created_at;
+
+commit;
@@ -0,0 +1,82 @@
+-- ChatLAYA monthly message partitioning migration draft
+-- ------------------------------------------------------
+-- This migration is NOT executed automatically.
+-- It must be reviewed and validated before any application on a real database.
+-- New databases get a partitioned app.chatlaya_messages from ensure_chatlaya_tables();
+-- this draft converts an existing plain table in place.
+--
+-- The existing rows become one legacy partition covering everything before the
+-- current month, so no data is rewritten. Monthly partitions are created from the
+-- current month on; app.services.partition_maintenance keeps creating them ahead and
+-- detaches partitions older than CHATLAYA_MESSAGES_RETENTION_MONTHS.
+--
+-- The legacy partition is a single range (MINVALUE -> the month this runs in), so
+-- retention treats it as one unit: it is detached only once that whole range is older
+-- than CHATLAYA_MESSAGES_RETENTION_MONTHS, i.e. its oldest rows outlive the window by
+-- up to the age of the data at conversion time. Delete or archive old legacy rows by
+-- hand if that matters for a given database.
+--
+-- A partitioned table's primary key must include the partition key, so it becomes
+-- (id, created_at) and app.problem_reports.message_id can no longer be a foreign key.
+-- It stays as a plain reference; 002 no longer declares that foreign key, the drop
+-- below covers databases where an older 002 already created it.
+
+begin;
+
+alter table if exists app.problem_reports
+  drop constraint if exists problem_reports_message_id_fkey;
+
+alter table app.chatlaya_messages rename to chatlaya_messages_legacy;
+alter index app.chatlaya_messages_pkey rename to chatlaya_messages_legacy_pkey;
+alter index if exists app.idx_chatlaya_messages_conversation_created_at_id
+  rename to idx_chatlaya_messages_legacy_conversation_created_at_id;
+
+create table app.chatlaya_messages (
+  id uuid not null,
+  conversation_id uuid not null references app.chatlaya_conversations(id) on delete cascade,
+  guest_id text,
+  user_id uuid references app.auth_users(id) on delete cascade,
+  role text not null,
+  content text not null,
+  meta jsonb not null default '{}'::jsonb,
+  created_at timestamptz not null default timezone('utc', now()),
+  constraint chatlaya_messages_pkey primary key (id, created_at),
+  constraint chatlaya_messages_role_check check (role in ('user', 'assistant'))
+) partition by range (created_at);
+
+create index idx_chatlaya_messages_conversation_created_at_id
+  on app.chatlaya_messages (conversation_id, created_at, id);
+
+do $$
+declare
+  current_month timestamptz := date_trunc('month', timezone('utc', now())) at time zone 'utc';
+  month_start timestamptz;
+begin
+  -- ATTACH skips its own scan when a valid check constraint already proves the range,
+  -- but adding that constraint scans the legacy rows instead: the scan moves here, it
+  -- does not go away, and it runs while the rename above holds ACCESS EXCLUSIVE, so
+  -- chat reads and writes block for a full pass over the table. NOT VALID + VALIDATE
+  -- would not help inside this transaction, and the constraint cannot be validated
+  -- ahead of time on the live table because every new message falls outside the
+  -- range. Schedule this migration in a maintenance window sized to that scan.
+  execute format(
+    'alter table app.chatlaya_messages_legacy add constraint chatlaya_messages_legacy_range check (created_at < %L)',
+    current_month
+  );
+  execute format(
+    'alter table app.chatlaya_messages attach partition app.chatlaya_messages_legacy for values from (minvalue) to (%L)',
+    current_month
+  );
+  for i in 0..3 loop
+    month_start := current_month + make_interval(months => i);
+    execute format(
+      'create table if not exists app.chatlaya_messages_p%s partition of app.chatlaya_messages for values from (%L) to (%L)',
+      to_char(month_start at time zone 'utc', 'YYYYMM'),
+      month_start,
+      month_start + interval '1 month'
+    );
+  end loop;
+end
+$$;
+
+commit;
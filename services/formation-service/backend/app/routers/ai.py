@@ -6,6 +6,7 @@ from typing import Optional
 
 from app.database import supabase
 from app.middleware.auth import get_current_user
+from app.services.json_stream import JsonObjectStream
 from app.services.llm import generate_text
 
 router = APIRouter()
@@ -126,7 +127,11 @@ Génère un JSON valide UNIQUEMENT, sans texte avant ou après, avec ce format e
 Les questions doivent tester la compréhension réelle. La bonne réponse doit être dans "answer" (A, B, C ou D).
 JSON:"""
 
-    raw = generate_text(prompt, max_tokens=1200, temperature=0.2)
+    stream = JsonObjectStream(schema={"questions": list})
+    raw = generate_text(prompt, max_tokens=1200, temperature=0.2, on_token=stream.feed)
+    if stream.result is not None:
+        return stream.result
+
     # Extraire le JSON même si du texte parasite est présent
     start = raw.find("{")
     end   = raw.rfind("}") + 1
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import json
-from typing import Optional
+from typing import Callable, Optional
 
 import cohere
 import httpx
@@ -10,6 +10,34 @@ from fastapi import HTTPException
 from app.config import settings
 
 
+class StopGeneration(Exception):
+    """Raised by an `on_token` callback that has everything it needs; ends the stream early."""
+
+
+def _emit_stream_token(token: str, chunks: list[str], on_token: Callable[[str], None]) -> bool:
+    """Record `token` and forward it; False once the callback asked to stop."""
+    chunks.append(token)
+    try:
+        on_token(token)
+    except StopGeneration:
+        return False
+    return True
+
+
+def _gateway_stream_token(line: str) -> str:
+    try:
+        parsed = json.loads(line)
+    except json.JSONDecodeError:
+        return line
+    if isinstance(parsed.get("choices"), list) and parsed["choices"]:
+        choice = parsed["choices"][0]
+        if isinstance(choice, dict):
+            delta = choice.get("delta") or {}
+            message = choice.get("message") or {}
+            return str(delta.get("content") or message.get("content") or choice.get("text") or "")
+    return str(parsed.get("token") or parsed.get("content") or parsed.get("text") or parsed.get("response") or "")
+
+
 def _resolve_provider() -> str:
     provider = (settings.CHAT_PROVIDER or settings.LLM_PROVIDER or "cohere").strip().lower()
     if provider in {"gateway", "koryxa_gateway"}:
@@ -21,7 +49,13 @@ def _resolve_model() -> str:
     return (settings.CHAT_MODEL or settings.LLM_MODEL or "").strip()
 
 
-def _call_ai_gateway(prompt: str, *, max_tokens: Optional[int] = None, temperature: float = 0.3) -> str:
+def _call_ai_gateway(
+    prompt: str,
+    *,
+    max_tokens: Optional[int] = None,
+    temperature: float = 0.3,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
     base_url = (settings.AI_GATEWAY_BASE_URL or "").rstrip("/")
     api_key = (settings.AI_GATEWAY_API_KEY or "").strip()
 
@@ -40,17 +74,44 @@ def _call_ai_gateway(prompt: str, *, max_tokens: Optional[int] = None, temperatu
         "temperature": temperature,
         "max_tokens": max_tokens or settings.LLM_MAX_NEW_TOKENS,
     }
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "X-API-Key": api_key,
+        "Content-Type": "application/json",
+    }
+
+    if on_token:
+        chunks: list[str] = []
+        try:
+            with httpx.Client(timeout=settings.AI_GATEWAY_TIMEOUT_SECONDS) as client:
+                with client.stream("POST", f"{base_url}/v1/chat", json={**payload, "stream": True}, headers=headers) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines():
+                        line = line.strip()
+                        if line.startswith("data:"):
+                            line = line[5:].strip()
+                        if not line:
+                            continue
+                        if line == "[DONE]":
+                            break
+                        token = _gateway_stream_token(line)
+                        if token and not _emit_stream_token(token, chunks, on_token):
+                            break
+        except httpx.HTTPStatusError as exc:
+            raise HTTPException(status_code=502, detail=f"AI gateway HTTP {exc.response.status_code}") from exc
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=503, detail=f"AI gateway indisponible: {exc}") from exc
+        final = "".join(chunks).strip()
+        if not final:
+            raise HTTPException(status_code=502, detail="Réponse AI gateway vide.")
+        return final
 
     try:
         with httpx.Client(timeout=settings.AI_GATEWAY_TIMEOUT_SECONDS) as client:
             response = client.post(
                 f"{base_url}/v1/chat",
                 json=payload,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "X-API-Key": api_key,
-                    "Content-Type": "application/json",
-                },
+                headers=headers,
             )
             response.raise_for_status()
     except httpx.HTTPStatusError as exc:
@@ -77,13 +138,44 @@ def _call_ai_gateway(prompt: str, *, max_tokens: Optional[int] = None, temperatu
     return final
 
 
-def _call_cohere(prompt: str, *, max_tokens: Optional[int] = None, temperature: float = 0.3) -> str:
+def _call_cohere(
+    prompt: str,
+    *,
+    max_tokens: Optional[int] = None,
+    temperature: float = 0.3,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
     if not settings.COHERE_API_KEY:
         raise HTTPException(status_code=503, detail="Clé API Cohere non configurée.")
 
     client = cohere.Client(settings.COHERE_API_KEY)
     model = _resolve_model() or "command-r"
 
+    if on_token:
+        chunks: list[str] = []
+        try:
+            stream = client.generate_stream(
+                model=model,
+                prompt=prompt,
+                max_tokens=max_tokens or settings.LLM_MAX_NEW_TOKENS,
+                temperature=temperature,
+            )
+            try:
+                for event in stream:
+                    if getattr(event, "event_type", None) != "text-generation":
+                        continue
+                    token = getattr(event, "text", "") or ""
+                    if token and not _emit_stream_token(token, chunks, on_token):
+                        break
+            finally:
+                stream.close()
+        except Exception as exc:  # noqa: BLE001
+            raise HTTPException(status_code=502, detail=f"Cohere indisponible: {exc}") from exc
+        final = "".join(chunks).strip()
+        if not final:
+            raise HTTPException(status_code=502, detail="Réponse Cohere vide.")
+        return final
+
     try:
         response = client.generate(
             model=model,
@@ -100,10 +192,16 @@ def _call_cohere(prompt: str, *, max_tokens: Optional[int] = None, temperature:
     return generations[0].text.strip()
 
 
-def generate_text(prompt: str, *, max_tokens: Optional[int] = None, temperature: float = 0.3) -> str:
+def generate_text(
+    prompt: str,
+    *,
+    max_tokens: Optional[int] = None,
+    temperature: float = 0.3,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> str:
     provider = _resolve_provider()
     if provider == "ai_gateway":
-        return _call_ai_gateway(prompt, max_tokens=max_tokens, temperature=temperature)
+        return _call_ai_gateway(prompt, max_tokens=max_tokens, temperature=temperature, on_token=on_token)
     if provider == "cohere":
-        return _call_cohere(prompt, max_tokens=max_tokens, temperature=temperature)
+        return _call_cohere(prompt, max_tokens=max_tokens, temperature=temperature, on_token=on_token)
     raise HTTPException(status_code=503, detail=f"Provider IA non supporté: {provider}")
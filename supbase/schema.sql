@@ -109,9 +109,13 @@ create table if not exists app.login_otps (
   intent text not null default 'login',
   expires_at timestamptz not null,
   consumed_at timestamptz null,
+  attempts int not null default 0,
   created_at timestamptz not null default timezone('utc', now())
 );
 
+alter table app.login_otps
+add column if not exists attempts int not null default 0;
+
 create index if not exists login_otps_email_created_idx on app.login_otps (lower(email), created_at desc);
 
 create table if not exists app.trajectory_flows (